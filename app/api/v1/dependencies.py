@@ -1,9 +1,12 @@
-from fastapi import Depends
+from fastapi import Request
 from app.db.dynamo import DynamoDB
 from app.services.medications import MedicationService
 
-def get_db() -> DynamoDB:
-    return DynamoDB()
+# Both are created once by the application lifespan (see app.main) and
+# shared by every request; tests can swap them with dependency_overrides
 
-def get_medication_service(db: DynamoDB = Depends(get_db)) -> MedicationService:
-    return MedicationService(db) 
\ No newline at end of file
+def get_db(request: Request) -> DynamoDB:
+    return request.app.state.db
+
+def get_medication_service(request: Request) -> MedicationService:
+    return request.app.state.medication_service
@@ -0,0 +1,27 @@
+from typing import Any
+from fastapi import Response
+from pydantic import BaseModel
+from pydantic_core import to_json
+from app import metrics
+
+class ModelResponse(Response):
+    """JSON response serialized straight from pydantic models by pydantic-core.
+
+    A route that returns one skips FastAPI's re-validation of the result
+    against ``response_model`` (and, on FastAPI releases without a JSON
+    fast path, the ``jsonable_encoder`` / ``json.dumps`` round trip); the
+    model is written to JSON bytes in one pass. Keep ``response_model`` on
+    the route for the OpenAPI schema. ``exclude_unset`` leaves out fields
+    of ``content`` (a single model) that were never set.
+    """
+    media_type = "application/json"
+
+    def __init__(self, content: Any, exclude_unset: bool = False, **kwargs):
+        self.exclude_unset = exclude_unset
+        super().__init__(content, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        with metrics.span("serialize"):
+            if self.exclude_unset and isinstance(content, BaseModel):
+                return content.__pydantic_serializer__.to_json(content, exclude_unset=True)
+            return to_json(content)
@@ -1,20 +1,109 @@
-from fastapi import APIRouter, Depends, HTTPException
+import logging
+from datetime import datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import AsyncIterator, List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
 from app.models.schemas import (
     InteractionCreate,
     InteractionResponse,
     InteractionCheckRequest,
     InteractionCheckResponse,
+    InteractionBatchCheckRequest,
+    InteractionBatchCheckResponse,
+    MedicationCreate,
+    MedicationFieldsListResponse,
     MedicationListResponse,
     MedicationResponse
 )
 from app.services.interactions import interaction_service
+from app.services.result_cache import CachedCheck, interaction_result_cache
 from app.auth.cognito import auth
-from app.services.medications import MedicationService
+from app.services.medications import CachedMedication, MedicationService, medication_cache
 from app.api.v1.dependencies import get_medication_service
+from app.api.v1.responses import ModelResponse
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
+NDJSON = "application/x-ndjson"
+
+def wants_ndjson(accept: Optional[str]) -> bool:
+    return accept is not None and NDJSON in accept
+
+def ndjson_response(records: AsyncIterator[BaseModel], exclude_unset: bool = False) -> StreamingResponse:
+    """Stream models as newline-delimited JSON, one line per record.
+
+    The status line has already gone out by the time a lookup can fail,
+    so a failure ends the stream with an ``{"error": ...}`` line.
+    """
+    async def lines():
+        try:
+            async for record in records:
+                yield record.model_dump_json(exclude_unset=exclude_unset) + "\n"
+        except Exception:
+            logger.exception("Streaming response failed")
+            yield '{"error": "Stream interrupted"}\n'
+    return StreamingResponse(lines(), media_type=NDJSON)
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """``fields=id,name`` as a list of names, or None when not given"""
+    if fields is None:
+        return None
+    return [field.strip() for field in fields.split(",") if field.strip()] or None
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches ``etag`` (weak comparison)"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+def cached_check_response(result: CachedCheck, if_none_match: Optional[str] = None) -> Response:
+    """The rendered check result, or 304 Not Modified if a GET's client already has it"""
+    headers = {
+        "ETag": result.etag,
+        "Cache-Control": "private, no-cache",
+        "X-Cache": "HIT" if result.hit else "MISS"
+    }
+    if etag_matches(if_none_match, result.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(result.body, media_type="application/json", headers=headers)
+
+def not_modified_since(if_modified_since: Optional[str], last_modified: Optional[datetime]) -> bool:
+    """Whether an If-Modified-Since header is at or after ``last_modified``"""
+    if not if_modified_since or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+    return last_modified <= since
+
+def medication_response(
+    entry: CachedMedication,
+    if_none_match: Optional[str],
+    if_modified_since: Optional[str]
+) -> Response:
+    """The cached medication, or 304 Not Modified if the client's copy is current"""
+    headers = {"ETag": entry.etag, "Cache-Control": "public, no-cache"}
+    if entry.last_modified is not None:
+        headers["Last-Modified"] = format_datetime(entry.last_modified, usegmt=True)
+    # If-Modified-Since only counts when there is no If-None-Match (RFC 9110)
+    if if_none_match is not None:
+        not_modified = etag_matches(if_none_match, entry.etag)
+    else:
+        not_modified = not_modified_since(if_modified_since, entry.last_modified)
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
+
 # Optional authentication for development
 async def get_optional_user(_: dict = Depends(auth.get_current_user)):
     return _
@@ -22,13 +111,69 @@ async def get_optional_user(_: dict = Depends(auth.get_current_user)):
 @router.post("/interactions/check", response_model=InteractionCheckResponse)
 async def check_interactions(
     request: InteractionCheckRequest,
-    _: dict = Depends(auth.get_current_user)
+    _: dict = Depends(auth.get_current_user),
+    accept: Optional[str] = Header(None)
 ):
-    interactions = await interaction_service.check_interactions(request.medications)
-    return InteractionCheckResponse(
-        interactions=interactions,
-        has_interactions=len(interactions) > 0
+    """Check a regimen; with ``Accept: application/x-ndjson`` each interaction
+    is streamed as its own line as soon as it is found.
+
+    Results are cached per regimen and carry an ETag. 304 Not Modified is
+    only for GET and HEAD, so revalidate through ``GET /interactions/check``.
+    """
+    if wants_ndjson(accept):
+        return ndjson_response(interaction_service.iter_interactions(request.medications))
+    result = await interaction_result_cache.check(request.medications, interaction_service.check_records)
+    return cached_check_response(result)
+
+@router.get("/interactions/check", response_model=InteractionCheckResponse)
+async def check_interactions_get(
+    medications: List[str] = Query(...),
+    _: dict = Depends(auth.get_current_user),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Check a regimen given as repeated ``medications`` query parameters,
+    for clients that revalidate with conditional GETs"""
+    try:
+        request = InteractionCheckRequest(medications=medications)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False, include_context=False))
+    result = await interaction_result_cache.check(request.medications, interaction_service.check_records)
+    return cached_check_response(result, if_none_match)
+
+@router.post("/interactions/check/batch", response_model=InteractionBatchCheckResponse)
+async def check_interactions_batch(
+    request: InteractionBatchCheckRequest,
+    _: dict = Depends(auth.get_current_user),
+    accept: Optional[str] = Header(None)
+):
+    """Check many regimens at once; pairs shared between them are looked up once.
+
+    With ``Accept: application/x-ndjson`` each regimen's result is streamed
+    as a line, in request order, as soon as its pairs are resolved.
+    """
+    if wants_ndjson(accept):
+        return ndjson_response(_stream_regimen_results(request))
+    results, unique_pairs = await interaction_service.check_interactions_batch(
+        [regimen.medications for regimen in request.regimens]
     )
+    return ModelResponse(InteractionBatchCheckResponse(
+        results=[
+            InteractionCheckResponse(
+                interactions=interactions,
+                has_interactions=len(interactions) > 0
+            )
+            for interactions in results
+        ],
+        unique_pairs=unique_pairs
+    ))
+
+async def _stream_regimen_results(request: InteractionBatchCheckRequest) -> AsyncIterator[InteractionCheckResponse]:
+    regimens = [regimen.medications for regimen in request.regimens]
+    async for _, interactions in interaction_service.iter_interactions_batch(regimens):
+        yield InteractionCheckResponse(
+            interactions=interactions,
+            has_interactions=len(interactions) > 0
+        )
 
 @router.post("/interactions/check/dev", response_model=InteractionCheckResponse)
 async def check_interactions_dev(
@@ -36,50 +181,117 @@ async def check_interactions_dev(
 ):
     """Development endpoint without authentication"""
     interactions = await interaction_service.check_interactions(request.medications)
-    return InteractionCheckResponse(
+    return ModelResponse(InteractionCheckResponse(
         interactions=interactions,
         has_interactions=len(interactions) > 0
-    )
+    ))
 
 @router.post("/interactions", response_model=InteractionResponse)
 async def create_interaction(
     interaction: InteractionCreate,
     _: dict = Depends(auth.get_current_user)
 ):
-    return await interaction_service.create_interaction(interaction)
+    return ModelResponse(await interaction_service.create_interaction(interaction))
+
+@router.get("/cache/stats")
+async def cache_stats(_: dict = Depends(auth.get_current_user)):
+    """Hit ratios of the interaction result, medication and token caches"""
+    return {
+        "interaction_results": interaction_result_cache.stats(),
+        "medications": medication_cache.stats(),
+        "tokens": auth.cache_stats()
+    }
 
 @router.get("/medications", response_model=MedicationListResponse)
 async def list_medications(
     search: str = None,
     page: int = 1,
     limit: int = 50,
-    medication_service: MedicationService = Depends(get_medication_service)
+    cursor: str = None,
+    fields: Optional[str] = None,
+    medication_service: MedicationService = Depends(get_medication_service),
+    accept: Optional[str] = Header(None)
 ):
-    """List medications with search and pagination"""
-    medications, total, has_more = await medication_service.list_medications(
-        search=search,
-        page=page,
-        limit=limit
-    )
+    """List medications with search and pagination.
+
+    Pass the previous response's ``next_cursor`` as ``cursor`` to fetch the next page.
+    With ``Accept: application/x-ndjson`` every medication from ``cursor`` on is
+    exported, one per line, reading ``limit`` items per page.
+    ``fields=id,name,generic_name`` reads and returns only those attributes
+    of each medication, plus ``id``.
+    """
+    field_names = parse_fields(fields)
+    if wants_ndjson(accept):
+        try:
+            medications = medication_service.iter_medications(search, limit, cursor, field_names)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return ndjson_response(medications, exclude_unset=field_names is not None)
+    try:
+        result = await medication_service.list_medications(
+            search=search,
+            page=page,
+            limit=limit,
+            cursor=cursor,
+            fields=field_names
+        )
+    except ValueError as e:
+        # InvalidCursor or unknown fields
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return MedicationListResponse(
-        items=medications,
-        total=total or len(medications),
+    response_class = MedicationFieldsListResponse if field_names else MedicationListResponse
+    return ModelResponse(response_class(
+        items=result.items,
+        total=result.total or len(result.items),
         page=page,
         limit=limit,
-        has_more=has_more
-    )
+        has_more=result.has_more,
+        next_cursor=result.next_cursor,
+        approximate_total=result.approximate_total
+    ), exclude_unset=field_names is not None)
+
+@router.post("/medications", response_model=MedicationResponse)
+async def create_medication(
+    medication: MedicationCreate,
+    _: dict = Depends(auth.get_current_user),
+    medication_service: MedicationService = Depends(get_medication_service)
+):
+    return ModelResponse(await medication_service.create_medication(medication))
+
+@router.get("/medications/by-name/{name}", response_model=List[MedicationResponse])
+async def find_medications_by_name(
+    name: str,
+    medication_service: MedicationService = Depends(get_medication_service)
+):
+    """Medications with exactly this name, ignoring case and spacing"""
+    return ModelResponse(await medication_service.find_by_name(name))
 
 @router.get("/medications/{medication_id}", response_model=MedicationResponse)
 async def get_medication(
     medication_id: str,
+    fields: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
     medication_service: MedicationService = Depends(get_medication_service)
 ):
-    """Get detailed medication info"""
-    medication = await medication_service.get_medication(medication_id)
+    """Get detailed medication info, or only ``fields`` of it.
+
+    The full medication carries ``ETag`` and ``Last-Modified`` and answers
+    matching ``If-None-Match`` or ``If-Modified-Since`` with 304.
+    """
+    field_names = parse_fields(fields)
+    try:
+        if field_names is None:
+            medication = await medication_service.get_medication_entry(medication_id)
+        else:
+            medication = await medication_service.get_medication(medication_id, field_names)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not medication:
         raise HTTPException(
             status_code=404,
             detail=f"Medication with ID {medication_id} not found"
         )
-    return medication 
\ No newline at end of file
+    if field_names is None:
+        return medication_response(medication, if_none_match, if_modified_since)
+    return ModelResponse(medication, exclude_unset=True) 
\ No newline at end of file
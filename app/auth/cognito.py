@@ -1,48 +1,100 @@
+import asyncio
+import hashlib
+import json
+import time
+import urllib.request
+from typing import Dict, Optional
 from fastapi import HTTPException, Security
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from jose import jwt, JWTError
-import boto3
+from jose import jwt, JWTError, ExpiredSignatureError
+from app import metrics
+from app.cache import TTLCache
 from app.config import settings
 
 security = HTTPBearer()
 
-# Create the Cognito client at module level
-cognito_client = boto3.client('cognito-idp', region_name=settings.AWS_REGION)
+# Unknown key IDs trigger a JWKS refetch at most this often, so forged
+# tokens cannot turn every request into a network call
+JWKS_MIN_REFETCH_SECONDS = 60
 
 class CognitoAuth:
+    """Verifies Cognito-issued JWTs locally against the user pool's JWKS.
+
+    Checks the RS256 signature, ``exp``, ``iss``, ``token_use`` and the app
+    client (``client_id`` for access tokens, ``aud`` for ID tokens). Signing
+    keys are cached and refetched when a token names an unknown ``kid``.
+
+    Verified claims are cached by token hash until the token's ``exp`` or
+    TOKEN_CACHE_MAX_TTL_SECONDS, whichever comes first, so replayed tokens
+    skip parsing and signature checks. ``revoke`` drops a token early.
+    """
+
     def __init__(self):
-        self.client = cognito_client
         self.user_pool_id = settings.COGNITO_USER_POOL_ID
         self.client_id = settings.COGNITO_CLIENT_ID
+        self.issuer = f"https://cognito-idp.{settings.AWS_REGION}.amazonaws.com/{self.user_pool_id}"
+        self.jwks_url = settings.COGNITO_JWKS_URL or f"{self.issuer}/.well-known/jwks.json"
+        self._keys: Dict[str, Dict] = {}
+        self._jwks_fetched_at: Optional[float] = None
+        self._jwks_lock = asyncio.Lock()
+        self.token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_SIZE)
+        # Hash of each revoked token -> when it would have expired. Never
+        # evicted for space: a dropped entry would make the token valid again
+        self._revoked: Dict[str, float] = {}
 
+    @metrics.timed("auth")
     async def validate_token(self, token: str = None) -> dict:
         if not token or (isinstance(token, str) and token.strip() == ""):
             raise HTTPException(
                 status_code=401,
                 detail="Not authenticated"
             )
+        token_hash = self._hash(token)
+        claims = self.token_cache.get(token_hash)
+        if claims is not None:
+            return dict(claims)
+        if self._is_revoked(token_hash):
+            raise HTTPException(
+                status_code=401,
+                detail="Token revoked"
+            )
         try:
-            response = self.client.get_user(AccessToken=token)
-            # Check for malformed attributes
-            for attr in response["UserAttributes"]:
-                if not isinstance(attr, dict) or "Name" not in attr or "Value" not in attr:
-                    raise HTTPException(
-                        status_code=400,
-                        detail="Malformed user attribute"
-                    )
-            user_attrs = {
-                attr["Name"]: attr["Value"]
-                for attr in response["UserAttributes"]
-            }
-            return user_attrs
-        except self.client.exceptions.NotAuthorizedException:
+            header = jwt.get_unverified_header(token)
+            key = await self._get_signing_key(header.get("kid"))
+            if key is None:
+                raise HTTPException(
+                    status_code=401,
+                    detail="Invalid token"
+                )
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=["RS256"],
+                issuer=self.issuer,
+                # aud and client_id are checked per token_use by _verify_client.
+                # ID tokens from the code flow carry at_hash, but no access
+                # token comes with them to check it against.
+                options={"verify_aud": False, "verify_at_hash": False}
+            )
+            self._verify_client(claims)
+            ttl = min(claims["exp"] - time.time(), settings.TOKEN_CACHE_MAX_TTL_SECONDS)
+            # A revoke may have landed while this token was being verified
+            if ttl > 0 and not self._is_revoked(token_hash):
+                self.token_cache.set(token_hash, claims, ttl=ttl)
+            return dict(claims)
+        except ExpiredSignatureError:
+            raise HTTPException(
+                status_code=401,
+                detail="Token expired"
+            )
+        except JWTError:
             raise HTTPException(
                 status_code=401,
                 detail="Invalid token"
             )
         except HTTPException:
             raise
-        except Exception as e:
+        except Exception:
             raise HTTPException(
                 status_code=401,
                 detail="Authentication failed"
@@ -53,5 +105,61 @@ class CognitoAuth:
             raise HTTPException(status_code=401, detail="Not authenticated")
         return await self.validate_token(credentials.credentials)
 
+    def revoke(self, token: str) -> None:
+        """Reject ``token`` from now on, even though its signature is still valid"""
+        token_hash = self._hash(token)
+        self.token_cache.invalidate(token_hash)
+        try:
+            ttl = jwt.get_unverified_claims(token)["exp"] - time.time()
+        except (JWTError, KeyError, TypeError):
+            ttl = settings.TOKEN_CACHE_MAX_TTL_SECONDS
+        if ttl > 0:
+            now = time.time()
+            # Revocations are rare; dropping the expired ones here keeps the set to live tokens
+            self._revoked = {revoked: until for revoked, until in self._revoked.items() if until > now}
+            self._revoked[token_hash] = now + ttl
+
+    def _is_revoked(self, token_hash: str) -> bool:
+        until = self._revoked.get(token_hash)
+        return until is not None and until > time.time()
+
+    def cache_stats(self) -> Dict[str, float]:
+        return self.token_cache.stats()
+
+    @staticmethod
+    def _hash(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def _verify_client(self, claims: dict) -> None:
+        token_use = claims.get("token_use")
+        if token_use == "access":
+            audience = claims.get("client_id")
+        elif token_use == "id":
+            audience = claims.get("aud")
+        else:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        if audience != self.client_id:
+            raise HTTPException(status_code=401, detail="Invalid token")
+
+    async def _get_signing_key(self, kid: Optional[str]) -> Optional[Dict]:
+        if kid in self._keys:
+            return self._keys[kid]
+        async with self._jwks_lock:
+            # Another request may have refreshed the keys while we waited
+            if kid in self._keys:
+                return self._keys[kid]
+            if (
+                self._jwks_fetched_at is None
+                or time.monotonic() - self._jwks_fetched_at >= JWKS_MIN_REFETCH_SECONDS
+            ):
+                jwks = await asyncio.to_thread(self._download_jwks)
+                self._keys = {key["kid"]: key for key in jwks.get("keys", [])}
+                self._jwks_fetched_at = time.monotonic()
+        return self._keys.get(kid)
+
+    def _download_jwks(self) -> Dict:
+        with urllib.request.urlopen(self.jwks_url, timeout=5) as response:
+            return json.load(response)
+
 auth = CognitoAuth()
-validate_token = auth.validate_token 
\ No newline at end of file
+validate_token = auth.validate_token
@@ -13,11 +13,74 @@ class Settings(BaseSettings):
     # AWS Settings
     AWS_REGION: str = os.getenv("AWS_REGION", "us-east-1")
     DYNAMODB_TABLE: str = os.getenv("DYNAMODB_TABLE", "matrixmeds-interactions")
+    # Medications table, keyed on id, and its GSI keyed on name_normalized
+    MEDICATIONS_TABLE: str = os.getenv("MEDICATIONS_TABLE", "matrixmeds-medications")
+    MEDICATIONS_NAME_INDEX: str = os.getenv("MEDICATIONS_NAME_INDEX", "name-index")
     DYNAMODB_ENDPOINT: str = os.getenv("DYNAMODB_ENDPOINT", "http://localhost:8000")  # For local testing
     
+    # DynamoDB client: HTTP connection pool (also the size of the worker thread pool) and timeouts in seconds
+    DYNAMODB_MAX_POOL_CONNECTIONS: int = int(os.getenv("DYNAMODB_MAX_POOL_CONNECTIONS", "50"))
+    DYNAMODB_CONNECT_TIMEOUT: float = float(os.getenv("DYNAMODB_CONNECT_TIMEOUT", "2"))
+    DYNAMODB_READ_TIMEOUT: float = float(os.getenv("DYNAMODB_READ_TIMEOUT", "5"))
+    DYNAMODB_CALL_TIMEOUT: float = float(os.getenv("DYNAMODB_CALL_TIMEOUT", "10"))
+    
+    # Concurrent identical GetItem/Query calls share one request to DynamoDB
+    DYNAMODB_COALESCE_READS: bool = os.getenv("DYNAMODB_COALESCE_READS", "true").lower() == "true"
+    
+    # Interaction lookup strategy: "query" (one Query per pair), "batch" (BatchGetItem)
+    # or "parallel" (one Query per pair, INTERACTION_LOOKUP_CONCURRENCY at a time)
+    INTERACTION_LOOKUP_MODE: str = os.getenv("INTERACTION_LOOKUP_MODE", "query")
+    INTERACTION_LOOKUP_CONCURRENCY: int = int(os.getenv("INTERACTION_LOOKUP_CONCURRENCY", "16"))
+    
+    # Most regimens accepted by one POST /interactions/check/batch request
+    INTERACTION_BATCH_MAX_REGIMENS: int = int(os.getenv("INTERACTION_BATCH_MAX_REGIMENS", "1000"))
+    
+    # In-memory interaction graph, loaded at startup and refreshed incrementally
+    INTERACTION_GRAPH_ENABLED: bool = os.getenv("INTERACTION_GRAPH_ENABLED", "false").lower() == "true"
+    INTERACTION_GRAPH_REFRESH_SECONDS: int = int(os.getenv("INTERACTION_GRAPH_REFRESH_SECONDS", "60"))
+    # Writers stamp updated_at with their own clocks, so each refresh re-scans this far behind its watermark
+    INTERACTION_GRAPH_REFRESH_LOOKBACK_SECONDS: float = float(os.getenv("INTERACTION_GRAPH_REFRESH_LOOKBACK_SECONDS", "30"))
+    
+    # Resolve brand names and sole active ingredients to generic names, from the catalog at startup
+    MEDICATION_SYNONYMS_ENABLED: bool = os.getenv("MEDICATION_SYNONYMS_ENABLED", "false").lower() == "true"
+    
+    # Check combination products through their active ingredients, indexed from the catalog at startup
+    INGREDIENT_EXPANSION_ENABLED: bool = os.getenv("INGREDIENT_EXPANSION_ENABLED", "false").lower() == "true"
+    
+    # In-memory trigram index serving GET /medications?search=
+    MEDICATION_SEARCH_INDEX_ENABLED: bool = os.getenv("MEDICATION_SEARCH_INDEX_ENABLED", "false").lower() == "true"
+    # Rebuilt from the catalog this often, to pick up medications created through other instances
+    MEDICATION_SEARCH_INDEX_REFRESH_SECONDS: int = int(os.getenv("MEDICATION_SEARCH_INDEX_REFRESH_SECONDS", "300"))
+    
+    # Cached /interactions/check results: memory (per instance), redis (shared by all instances) or none
+    INTERACTION_CACHE_BACKEND: str = os.getenv("INTERACTION_CACHE_BACKEND", "memory")
+    INTERACTION_CACHE_SIZE: int = int(os.getenv("INTERACTION_CACHE_SIZE", "10000"))
+    INTERACTION_CACHE_TTL_SECONDS: float = float(os.getenv("INTERACTION_CACHE_TTL_SECONDS", "300"))
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    
+    # Add a Server-Timing header breaking down each response's time; /metrics is served either way
+    SERVER_TIMING_ENABLED: bool = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+    
     # Cognito Settings
     COGNITO_USER_POOL_ID: str = os.getenv("COGNITO_USER_POOL_ID", "")
     COGNITO_CLIENT_ID: str = os.getenv("COGNITO_CLIENT_ID", "")
+    # Override the user pool's JWKS endpoint, e.g. for a local stand-in
+    COGNITO_JWKS_URL: str = os.getenv("COGNITO_JWKS_URL", "")
+    # Verified token claims, cached until exp or this many seconds
+    TOKEN_CACHE_SIZE: int = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+    TOKEN_CACHE_MAX_TTL_SECONDS: float = float(os.getenv("TOKEN_CACHE_MAX_TTL_SECONDS", "300"))
+    
+    # Cached medication list totals
+    COUNT_CACHE_TTL_SECONDS: float = float(os.getenv("COUNT_CACHE_TTL_SECONDS", "60"))
+    COUNT_CACHE_SIZE: int = int(os.getenv("COUNT_CACHE_SIZE", "1024"))
+    
+    # Cached GET /medications/{id} reads; IDs that were not found are cached for the shorter TTL
+    MEDICATION_CACHE_SIZE: int = int(os.getenv("MEDICATION_CACHE_SIZE", "10000"))
+    MEDICATION_CACHE_TTL_SECONDS: float = float(os.getenv("MEDICATION_CACHE_TTL_SECONDS", "300"))
+    MEDICATION_CACHE_NEGATIVE_TTL_SECONDS: float = float(os.getenv("MEDICATION_CACHE_NEGATIVE_TTL_SECONDS", "30"))
+    
+    # Key used to sign pagination cursors; set a real secret outside development
+    CURSOR_SECRET: str = os.getenv("CURSOR_SECRET", "matrixmeds-dev-cursor-secret")
     
     # CORS Settings
     # For local development, allow all origins. For production, restrict this list.
@@ -27,7 +90,6 @@ class Settings(BaseSettings):
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
     
     INTERACTIONS_TABLE: str = "interactions"
-    MEDICATIONS_TABLE: str = "medications"
     
     class Config:
         case_sensitive = True
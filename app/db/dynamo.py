@@ -1,31 +1,186 @@
-import boto3
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from botocore.exceptions import ClientError
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
+from app import metrics
 from app.config import settings
+from app.db.singleflight import SingleFlight, freeze
+
+# DynamoDB caps a single BatchGetItem request at 100 keys and a
+# BatchWriteItem request at 25 items
+BATCH_GET_CHUNK_SIZE = 100
+BATCH_WRITE_CHUNK_SIZE = 25
+BATCH_MAX_RETRIES = 5
+BATCH_BACKOFF_SECONDS = 0.05
+
+def projection_params(attributes: List[str], attribute_names: Optional[Dict] = None) -> Dict:
+    """ProjectionExpression for ``attributes`` and the attribute names it needs.
+
+    Every attribute goes behind a placeholder, since many (``name`` among
+    them) are DynamoDB reserved words. ``attribute_names`` already used by
+    other expressions of the request are kept.
+    """
+    placeholders = {f"#p{i}": attribute for i, attribute in enumerate(attributes)}
+    return {
+        "ProjectionExpression": ", ".join(placeholders),
+        "ExpressionAttributeNames": {**(attribute_names or {}), **placeholders}
+    }
 
 class DynamoDB:
-    def __init__(self):
+    """Async wrapper around a DynamoDB table.
+
+    The boto3 resource is built on first use rather than at import, so a
+    cold start that never touches DynamoDB (or has not yet) does not pay
+    for loading boto3 and its service model. Once built it is reused for
+    the life of the process. ``close`` releases the connection pool and
+    worker threads; a later call builds them again.
+
+    ``for_table`` gives a DynamoDB for another table that shares this one's
+    resource, connection pool and worker threads.
+    """
+
+    def __init__(self, table_name: Optional[str] = None, connection: Optional["DynamoDB"] = None):
+        self.table_name = table_name or settings.DYNAMODB_TABLE
+        # The instance that owns the resource and executor
+        self._connection = connection if connection is not None else self
+        self._dynamodb = None
+        self._table = None
+        self._table_resource = None
+        self._executor = None
+        self._resource_lock = threading.Lock()
+        self.call_timeout = settings.DYNAMODB_CALL_TIMEOUT
+        self.coalesce_reads = settings.DYNAMODB_COALESCE_READS
+        self.reads = SingleFlight()
+
+    def for_table(self, table_name: str) -> "DynamoDB":
+        return DynamoDB(table_name, connection=self._connection)
+
+    @property
+    def dynamodb(self):
+        if self._connection is not self:
+            return self._connection.dynamodb
+        if self._dynamodb is None:
+            # Calls run on worker threads, so two may race to build the resource
+            with self._resource_lock:
+                if self._dynamodb is None:
+                    self._dynamodb = self._create_resource()
+        return self._dynamodb
+
+    @property
+    def table(self):
+        dynamodb = self.dynamodb
+        # Rebuilt along with the resource after close
+        if self._table is None or self._table_resource is not dynamodb:
+            self._table = dynamodb.Table(self.table_name)
+            self._table_resource = dynamodb
+        return self._table
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._connection is not self:
+            return self._connection.executor
+        if self._executor is None:
+            with self._resource_lock:
+                if self._executor is None:
+                    # boto3 is blocking, so calls run on a pool sized to the HTTP connection pool
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=settings.DYNAMODB_MAX_POOL_CONNECTIONS,
+                        thread_name_prefix="dynamodb"
+                    )
+        return self._executor
+
+    @staticmethod
+    def _create_resource():
+        import boto3
+        from botocore.config import Config
+
         kwargs = {
             "region_name": settings.AWS_REGION,
+            "config": Config(
+                max_pool_connections=settings.DYNAMODB_MAX_POOL_CONNECTIONS,
+                tcp_keepalive=True,
+                connect_timeout=settings.DYNAMODB_CONNECT_TIMEOUT,
+                read_timeout=settings.DYNAMODB_READ_TIMEOUT,
+            ),
         }
         if settings.ENVIRONMENT == "test":
             kwargs["endpoint_url"] = settings.DYNAMODB_ENDPOINT
             kwargs["aws_access_key_id"] = "dummy"
             kwargs["aws_secret_access_key"] = "dummy"
-            
-        self.dynamodb = boto3.resource("dynamodb", **kwargs)
-        self.table = self.dynamodb.Table(settings.DYNAMODB_TABLE)
+        return boto3.resource("dynamodb", **kwargs)
+
+    async def _call(self, method: Callable, **kwargs) -> Dict:
+        """Run a blocking boto3 call on the executor, bounded by call_timeout.
+
+        Every call is counted and timed; calls made while serving a request
+        also ask DynamoDB for the capacity they consumed.
+        """
+        operation = getattr(method, "__name__", "DynamoDB")
+        if metrics.current_timings() is not None:
+            kwargs["ReturnConsumedCapacity"] = "TOTAL"
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        response = None
+        try:
+            response = await asyncio.wait_for(
+                loop.run_in_executor(self.executor, partial(method, **kwargs)),
+                timeout=self.call_timeout
+            )
+            return response
+        except asyncio.TimeoutError:
+            raise ClientError(
+                {"Error": {"Code": "RequestTimeout", "Message": f"No response within {self.call_timeout}s"}},
+                operation
+            )
+        finally:
+            consumed = response.get("ConsumedCapacity") if isinstance(response, dict) else None
+            metrics.record_dynamodb_call(operation, time.perf_counter() - start, consumed)
+
+    async def _read(self, method: Callable, **kwargs) -> Dict:
+        """``_call`` for reads; concurrent identical reads share one call.
+
+        A read that joins one already in flight can miss a write that
+        landed after that read was sent, as an eventually consistent read
+        could anyway.
+        """
+        if not self.coalesce_reads:
+            return await self._call(method, **kwargs)
+        operation = getattr(method, "__name__", "DynamoDB")
+        response, shared = await self.reads.do(
+            (operation, freeze(kwargs)),
+            lambda: self._call(method, **kwargs)
+        )
+        if shared:
+            metrics.DYNAMODB_COALESCED.inc(operation)
+        return response
 
-    async def get_item(self, key: Dict) -> Optional[Dict]:
+    def close(self) -> None:
+        if self._connection is not self:
+            self._connection.close()
+            return
+        with self._resource_lock:
+            executor, self._executor = self._executor, None
+            dynamodb, self._dynamodb = self._dynamodb, None
+            self._table = None
+        if executor is not None:
+            executor.shutdown(wait=False)
+        if dynamodb is not None:
+            dynamodb.meta.client.close()
+
+    async def get_item(self, key: Dict, projection: Optional[List[str]] = None) -> Optional[Dict]:
         try:
-            response = await self.table.get_item(Key=key)
+            params = projection_params(projection) if projection else {}
+            response = await self._read(self.table.get_item, Key=key, **params)
             return response.get("Item")
         except ClientError as e:
             raise Exception(f"Error getting item: {str(e)}")
 
     async def put_item(self, item: Dict) -> Dict:
         try:
-            await self.table.put_item(Item=item)
+            await self._call(self.table.put_item, Item=item)
             return item
         except ClientError as e:
             raise Exception(f"Error putting item: {str(e)}")
@@ -37,7 +192,8 @@ class DynamoDB:
         expression_values: Dict
     ) -> Dict:
         try:
-            response = await self.table.update_item(
+            response = await self._call(
+                self.table.update_item,
                 Key=key,
                 UpdateExpression=update_expression,
                 ExpressionAttributeValues=expression_values,
@@ -49,7 +205,7 @@ class DynamoDB:
 
     async def delete_item(self, key: Dict) -> None:
         try:
-            await self.table.delete_item(Key=key)
+            await self._call(self.table.delete_item, Key=key)
         except ClientError as e:
             raise Exception(f"Error deleting item: {str(e)}")
 
@@ -60,7 +216,10 @@ class DynamoDB:
         filter_expression: Optional[str] = None,
         expression_attribute_names: Optional[Dict] = None,
         limit: Optional[int] = None,
-        select: Optional[str] = None
+        select: Optional[str] = None,
+        exclusive_start_key: Optional[Dict] = None,
+        projection: Optional[List[str]] = None,
+        index_name: Optional[str] = None
     ) -> Dict:
         try:
             query_params = {}
@@ -77,10 +236,121 @@ class DynamoDB:
                 query_params["Limit"] = limit
             if select:
                 query_params["Select"] = select
+            if exclusive_start_key:
+                query_params["ExclusiveStartKey"] = exclusive_start_key
+            if projection:
+                query_params.update(projection_params(projection, expression_attribute_names))
+            if index_name:
+                query_params["IndexName"] = index_name
                 
-            response = await self.table.query(**query_params)
+            response = await self._read(self.table.query, **query_params)
             return response
         except ClientError as e:
             raise Exception(f"Error querying items: {str(e)}")
 
-db = DynamoDB() 
\ No newline at end of file
+    async def scan(
+        self,
+        filter_expression: Optional[str] = None,
+        expression_values: Optional[Dict] = None,
+        expression_attribute_names: Optional[Dict] = None,
+        exclusive_start_key: Optional[Dict] = None,
+        limit: Optional[int] = None,
+        select: Optional[str] = None,
+        projection: Optional[List[str]] = None
+    ) -> Dict:
+        try:
+            scan_params = {}
+
+            if filter_expression:
+                scan_params["FilterExpression"] = filter_expression
+            if expression_values:
+                scan_params["ExpressionAttributeValues"] = expression_values
+            if expression_attribute_names:
+                scan_params["ExpressionAttributeNames"] = expression_attribute_names
+            if exclusive_start_key:
+                scan_params["ExclusiveStartKey"] = exclusive_start_key
+            if limit:
+                scan_params["Limit"] = limit
+            if select:
+                scan_params["Select"] = select
+            if projection:
+                scan_params.update(projection_params(projection, expression_attribute_names))
+
+            response = await self._call(self.table.scan, **scan_params)
+            return response
+        except ClientError as e:
+            raise Exception(f"Error scanning items: {str(e)}")
+
+    async def batch_get_item(self, keys: List[Dict], projection: Optional[List[str]] = None) -> List[Dict]:
+        """Fetch many items by key, 100 keys per BatchGetItem request.
+
+        Keys the service leaves in UnprocessedKeys are retried with
+        exponential backoff. Items come back in no particular order, with
+        only the ``projection`` attributes if given.
+        """
+        params = projection_params(projection) if projection else {}
+        # BatchGetItem rejects requests containing the same key twice
+        unique_keys = list({
+            tuple(sorted(key.items())): key for key in keys
+        }.values())
+        items = []
+        try:
+            for start in range(0, len(unique_keys), BATCH_GET_CHUNK_SIZE):
+                pending = unique_keys[start:start + BATCH_GET_CHUNK_SIZE]
+                attempt = 0
+                while pending:
+                    response = await self._call(
+                        self.dynamodb.batch_get_item,
+                        RequestItems={self.table_name: {"Keys": pending, **params}}
+                    )
+                    items.extend(response.get("Responses", {}).get(self.table_name, []))
+                    pending = (
+                        response.get("UnprocessedKeys", {})
+                        .get(self.table_name, {})
+                        .get("Keys", [])
+                    )
+                    if pending:
+                        if attempt >= BATCH_MAX_RETRIES:
+                            raise Exception(
+                                f"Error batch getting items: {len(pending)} keys left unprocessed"
+                            )
+                        await asyncio.sleep(BATCH_BACKOFF_SECONDS * (2 ** attempt))
+                        attempt += 1
+            return items
+        except ClientError as e:
+            raise Exception(f"Error batch getting items: {str(e)}")
+
+    async def batch_write_item(self, items: List[Dict]) -> int:
+        """Put many items, 25 per BatchWriteItem request.
+
+        Items the service leaves in UnprocessedItems are retried with
+        exponential backoff. A request may not contain the same key twice,
+        so callers must dedupe. Returns the number of items written.
+        """
+        try:
+            for start in range(0, len(items), BATCH_WRITE_CHUNK_SIZE):
+                pending = [
+                    {"PutRequest": {"Item": item}}
+                    for item in items[start:start + BATCH_WRITE_CHUNK_SIZE]
+                ]
+                attempt = 0
+                while pending:
+                    response = await self._call(
+                        self.dynamodb.batch_write_item,
+                        RequestItems={self.table_name: pending}
+                    )
+                    pending = response.get("UnprocessedItems", {}).get(self.table_name, [])
+                    if pending:
+                        if attempt >= BATCH_MAX_RETRIES:
+                            raise Exception(
+                                f"Error batch writing items: {len(pending)} items left unprocessed"
+                            )
+                        await asyncio.sleep(BATCH_BACKOFF_SECONDS * (2 ** attempt))
+                        attempt += 1
+            return len(items)
+        except ClientError as e:
+            raise Exception(f"Error batch writing items: {str(e)}")
+
+db = DynamoDB()
+# Medications have their own table, keyed on id
+medications_db = db.for_table(settings.MEDICATIONS_TABLE) 
\ No newline at end of file
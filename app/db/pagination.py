@@ -0,0 +1,42 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+from typing import Dict
+from app.config import settings
+
+class InvalidCursor(ValueError):
+    pass
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+def _sign(body: bytes) -> bytes:
+    return hmac.new(settings.CURSOR_SECRET.encode(), body, hashlib.sha256).digest()[:16]
+
+def encode_cursor(payload: Dict) -> str:
+    """Opaque, signed continuation token for a JSON-serializable payload"""
+    body = json.dumps(payload, separators=(",", ":"), sort_keys=True).encode()
+    return f"{_b64encode(body)}.{_b64encode(_sign(body))}"
+
+def decode_cursor(token: str) -> Dict:
+    """Verify and unpack a token from encode_cursor, raising InvalidCursor"""
+    try:
+        body_part, signature_part = token.split(".")
+        body = _b64decode(body_part)
+        signature = _b64decode(signature_part)
+    except (ValueError, binascii.Error):
+        raise InvalidCursor("Malformed cursor")
+    if not hmac.compare_digest(signature, _sign(body)):
+        raise InvalidCursor("Cursor signature mismatch")
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise InvalidCursor("Malformed cursor")
+    if not isinstance(payload, dict):
+        raise InvalidCursor("Malformed cursor")
+    return payload
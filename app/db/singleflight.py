@@ -0,0 +1,57 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+def freeze(value: Any) -> Hashable:
+    """A hashable stand-in for request parameters made of dicts, lists and sets"""
+    if isinstance(value, dict):
+        return tuple(sorted((key, freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze(item) for item in value)
+    return value
+
+class SingleFlight:
+    """Shares one in-flight call between concurrent callers asking for the same key.
+
+    The first caller for a key starts the call as a task; callers arriving
+    while it runs await the same task and get the same result or the same
+    exception. Once it settles the key is forgotten, so a later caller
+    starts a fresh call.
+
+    Each caller waits through ``asyncio.shield``: cancelling one caller
+    (a client disconnecting, a timeout) only stops that caller waiting and
+    never cancels the call the others are waiting on. Callers share the
+    result object, so treat it as read-only.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Result of ``call()`` for ``key``, and whether it was shared with a call already in flight"""
+        task = self._in_flight.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            self.calls += 1
+            task = asyncio.ensure_future(call())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._settle(key, done))
+        return await asyncio.shield(task), shared
+
+    def _settle(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Mark the outcome retrieved even if every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._in_flight)}
@@ -1,13 +1,54 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from app import metrics
 from app.api.v1.routes import router as v1_router
+from app.auth.cognito import auth
 from app.config import settings
+from app.db.dynamo import db, medications_db
+from app.services.medications import MedicationService, medication_cache
+from app.services.ingredients import ingredient_index
+from app.services.normalization import name_resolver
+from app.services.result_cache import interaction_result_cache
+from app.services.interaction_graph import interaction_graph
+from app.services.search_index import medication_search_index
 from mangum import Mangum
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared by every request instead of being rebuilt per request
+    app.state.db = db
+    app.state.medication_service = MedicationService(medications_db)
+    # Built now rather than on the first check, so a misconfigured backend fails at startup
+    interaction_result_cache.backend
+    refreshers = []
+    # Before the graph, which is keyed by resolved names
+    if settings.MEDICATION_SYNONYMS_ENABLED:
+        await name_resolver.load(medications_db)
+    if settings.INGREDIENT_EXPANSION_ENABLED:
+        await ingredient_index.load(medications_db)
+    if settings.INTERACTION_GRAPH_ENABLED:
+        await interaction_graph.load(db)
+        refreshers.append(asyncio.create_task(
+            interaction_graph.refresh_periodically(db, settings.INTERACTION_GRAPH_REFRESH_SECONDS)
+        ))
+    if settings.MEDICATION_SEARCH_INDEX_ENABLED:
+        await medication_search_index.load(medications_db)
+        refreshers.append(asyncio.create_task(
+            medication_search_index.reload_periodically(medications_db, settings.MEDICATION_SEARCH_INDEX_REFRESH_SECONDS)
+        ))
+    yield
+    for refresher in refreshers:
+        refresher.cancel()
+    # Also closes medications_db, which shares its connection
+    db.close()
+
 app = FastAPI(
     title="MatrixMeds API",
     description="API for MatrixMeds interaction checking service",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware configuration
@@ -19,6 +60,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so request times include the other middleware
+app.add_middleware(metrics.InstrumentationMiddleware, server_timing=settings.SERVER_TIMING_ENABLED)
+
 # Include API routers
 app.include_router(v1_router, prefix="/api/v1")
 
@@ -26,4 +70,31 @@ app.include_router(v1_router, prefix="/api/v1")
 async def health_check():
     return {"status": "healthy"}
 
-lambda_handler = Mangum(app) 
\ No newline at end of file
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Request, span and DynamoDB histograms and cache statistics, in the Prometheus text format"""
+    gauges = {}
+    for prefix, cache, stats in (
+        ("matrixmeds_interaction_cache", "Interaction result cache", interaction_result_cache.stats()),
+        ("matrixmeds_medication_cache", "Medication cache", medication_cache.stats()),
+        ("matrixmeds_token_cache", "Token cache", auth.cache_stats()),
+    ):
+        for key, value in stats.items():
+            gauges[f"{prefix}_{key}"] = (f"{cache} {key.replace('_', ' ')}", value)
+    return Response(metrics.render(gauges), media_type="text/plain; version=0.0.4")
+
+# Mangum's own lifespan support runs startup and shutdown around every
+# invocation, which would reload the interaction graph and search index and
+# drop DynamoDB connections on every request. Instead the lifespan is entered
+# on the first invocation and left running for as long as Lambda keeps the
+# container warm.
+_mangum = Mangum(app, lifespan="off")
+_container_lifespan = None
+
+def lambda_handler(event, context):
+    global _container_lifespan
+    if _container_lifespan is None:
+        startup = lifespan(app)
+        asyncio.get_event_loop().run_until_complete(startup.__aenter__())
+        _container_lifespan = startup
+    return _mangum(event, context)
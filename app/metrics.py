@@ -0,0 +1,306 @@
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+# Seconds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# DynamoDB calls made by one request
+CALL_COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _label_text(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic counter per label set"""
+
+    def __init__(self, name: str, help: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def total(self) -> float:
+        """Sum over every label set"""
+        with self._lock:
+            return sum(self._values.values())
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_label_text(self.label_names, labels)} {_number(value)}")
+        return lines
+
+class Histogram:
+    """Prometheus-style histogram per label set: cumulative buckets, sum and count"""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # Per label set: [count per bucket (non-cumulative, +Inf last), sum]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._series.items())
+        for labels, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                bucket_labels = _label_text(self.label_names + ("le",), labels + (_number(bound),))
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            label_text = _label_text(self.label_names, labels)
+            lines.append(f"{self.name}_sum{label_text} {_number(total)}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+REQUEST_SECONDS = Histogram(
+    "matrixmeds_request_seconds",
+    "Time to serve a request, by endpoint",
+    ("method", "endpoint", "status")
+)
+REQUEST_DYNAMODB_CALLS = Histogram(
+    "matrixmeds_request_dynamodb_calls",
+    "DynamoDB calls made while serving one request",
+    ("endpoint",),
+    CALL_COUNT_BUCKETS
+)
+SPAN_SECONDS = Histogram(
+    "matrixmeds_span_seconds",
+    "Time spent in instrumented steps: auth, service methods, serialization",
+    ("span",)
+)
+DYNAMODB_CALL_SECONDS = Histogram(
+    "matrixmeds_dynamodb_call_seconds",
+    "Time of single DynamoDB calls, retries included",
+    ("operation",)
+)
+DYNAMODB_CALLS = Counter(
+    "matrixmeds_dynamodb_calls_total",
+    "DynamoDB calls",
+    ("operation",)
+)
+DYNAMODB_CONSUMED_CAPACITY = Counter(
+    "matrixmeds_dynamodb_consumed_capacity_total",
+    "Capacity units DynamoDB reported for calls made while serving requests",
+    ("operation",)
+)
+DYNAMODB_COALESCED = Counter(
+    "matrixmeds_dynamodb_coalesced_total",
+    "DynamoDB reads answered by an identical read already in flight instead of a call of their own",
+    ("operation",)
+)
+INTERACTION_LOOKUP_FANOUT = Histogram(
+    "matrixmeds_interaction_lookup_fanout",
+    "Pair queries dispatched together by one parallel interaction lookup",
+    (),
+    CALL_COUNT_BUCKETS
+)
+
+METRICS = (
+    REQUEST_SECONDS,
+    REQUEST_DYNAMODB_CALLS,
+    SPAN_SECONDS,
+    DYNAMODB_CALL_SECONDS,
+    DYNAMODB_CALLS,
+    DYNAMODB_CONSUMED_CAPACITY,
+    DYNAMODB_COALESCED,
+    INTERACTION_LOOKUP_FANOUT,
+)
+
+def _calls(count: int) -> str:
+    return f"{count} call" if count == 1 else f"{count} calls"
+
+class RequestTimings:
+    """Time spent in each span, and DynamoDB usage, while serving one request"""
+    __slots__ = ("spans", "dynamodb_calls", "dynamodb_seconds", "consumed_capacity")
+
+    def __init__(self):
+        # Name -> [seconds, calls], in the order spans first finished
+        self.spans: Dict[str, List[float]] = {}
+        self.dynamodb_calls = 0
+        self.dynamodb_seconds = 0.0
+        self.consumed_capacity = 0.0
+
+    def add(self, name: str, seconds: float) -> None:
+        span = self.spans.get(name)
+        if span is None:
+            self.spans[name] = [seconds, 1]
+        else:
+            span[0] += seconds
+            span[1] += 1
+
+    def server_timing(self, total_seconds: float) -> str:
+        """The ``Server-Timing`` header value; spans may nest, so they can add up past ``total``"""
+        entries = [f"total;dur={total_seconds * 1000:.3f}"]
+        if self.dynamodb_calls:
+            entries.append(
+                f'dynamodb;dur={self.dynamodb_seconds * 1000:.3f};'
+                f'desc="{_calls(self.dynamodb_calls)} / {self.consumed_capacity:g} CU"'
+            )
+        for name, (seconds, calls) in self.spans.items():
+            entry = f"{name};dur={seconds * 1000:.3f}"
+            if calls > 1:
+                entry += f';desc="{_calls(calls)}"'
+            entries.append(entry)
+        return ", ".join(entries)
+
+_request_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+def current_timings() -> Optional[RequestTimings]:
+    """Timings of the request being served, or None outside a request"""
+    return _request_timings.get()
+
+def record_span(name: str, seconds: float) -> None:
+    SPAN_SECONDS.observe(seconds, name)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+@contextmanager
+def span(name: str):
+    """Time the enclosed block as ``name``"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - start)
+
+def timed(name: str) -> Callable:
+    """Decorate a coroutine function so each call is timed as span ``name``"""
+    def decorate(function: Callable) -> Callable:
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                record_span(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+def consumed_capacity_units(consumed: Any) -> float:
+    """Total CapacityUnits of a response's ConsumedCapacity (one entry, or one per table)"""
+    if not consumed:
+        return 0.0
+    if isinstance(consumed, Mapping):
+        consumed = [consumed]
+    return float(sum(entry.get("CapacityUnits", 0) for entry in consumed))
+
+def record_dynamodb_call(operation: str, seconds: float, consumed: Any = None) -> None:
+    capacity = consumed_capacity_units(consumed)
+    DYNAMODB_CALLS.inc(operation)
+    DYNAMODB_CALL_SECONDS.observe(seconds, operation)
+    if capacity:
+        DYNAMODB_CONSUMED_CAPACITY.inc(operation, amount=capacity)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.dynamodb_calls += 1
+        timings.dynamodb_seconds += seconds
+        timings.consumed_capacity += capacity
+
+def render(gauges: Optional[Mapping[str, Tuple[str, float]]] = None) -> str:
+    """Every metric in the Prometheus text format, plus ``gauges`` given as name -> (help, value)"""
+    lines: List[str] = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    for name, (help, value) in (gauges or {}).items():
+        lines.extend([f"# HELP {name} {help}", f"# TYPE {name} gauge", f"{name} {_number(value)}"])
+    return "\n".join(lines) + "\n"
+
+def _endpoint(scope: Mapping) -> str:
+    endpoint = scope.get("endpoint")
+    return getattr(endpoint, "__name__", "unmatched")
+
+class InstrumentationMiddleware:
+    """Times every HTTP request and the spans and DynamoDB calls inside it.
+
+    Adds a ``Server-Timing`` header to the response (total time until the
+    headers went out, DynamoDB time, calls and consumed capacity, and one
+    entry per span) and feeds the histograms behind ``/metrics``. Endpoints
+    are labelled by their handler's name, so the number of series stays
+    bounded whatever paths clients send. Work done after the headers, such
+    as streaming an NDJSON body, is in the histograms but not the header.
+    """
+
+    def __init__(self, app, server_timing: bool = True):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings = RequestTimings()
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    header = timings.server_timing(time.perf_counter() - start)
+                    message = dict(message, headers=[
+                        *message.get("headers", []),
+                        (b"server-timing", header.encode("latin-1"))
+                    ])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            endpoint = _endpoint(scope)
+            REQUEST_SECONDS.observe(time.perf_counter() - start, scope["method"], endpoint, str(status))
+            REQUEST_DYNAMODB_CALLS.observe(timings.dynamodb_calls, endpoint)
+            _request_timings.reset(token)
@@ -0,0 +1,57 @@
+import sys
+from dataclasses import dataclass, replace
+from enum import Enum
+from typing import Mapping, Optional, Tuple
+from app.models.schemas import InteractionResponse
+
+class Severity(str, Enum):
+    LOW = "low"
+    MEDIUM = "medium"
+    HIGH = "high"
+
+_SEVERITIES = {severity.value: severity for severity in Severity}
+
+@dataclass(slots=True)
+class InteractionRecord:
+    """Internal form of a stored interaction, for rows we wrote ourselves.
+
+    Built straight from DynamoDB items without pydantic validation: the
+    severity becomes a shared enum member and medication names are interned,
+    so the graph holds one copy of each name however many pairs it is in.
+    Records are shared between lookups; treat them as immutable.
+
+    The check route writes records to JSON directly. Elsewhere
+    ``to_response`` makes the API model at the boundary, per call, with
+    pydantic's compiled validator reading the record's attributes; that is
+    faster than building a dict for it or using ``model_construct``, which
+    runs in Python.
+    """
+    # InteractionResponse's field order, so both serialize to the same JSON
+    medication1: str
+    medication2: str
+    severity: Severity
+    description: str
+    id: str
+    created_at: str
+    updated_at: str
+    source_medications: Optional[Tuple[str, ...]] = None
+
+    @classmethod
+    def from_item(cls, item: Mapping) -> "InteractionRecord":
+        return cls(
+            id=item["id"],
+            medication1=sys.intern(item["medication1"]),
+            medication2=sys.intern(item["medication2"]),
+            severity=_SEVERITIES[item["severity"]],
+            description=item["description"],
+            created_at=item["created_at"],
+            updated_at=item["updated_at"]
+        )
+
+    def with_sources(self, source_medications: Tuple[str, ...]) -> "InteractionRecord":
+        return replace(self, source_medications=tuple(source_medications))
+
+    def to_response(self) -> InteractionResponse:
+        # InteractionResponse validates from attributes: the enum severity is
+        # a str and the sources tuple becomes a list
+        return InteractionResponse.model_validate(self)
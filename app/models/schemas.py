@@ -1,6 +1,8 @@
-from pydantic import BaseModel, ConfigDict, field_validator, Field
+from pydantic import BaseModel, ConfigDict, field_validator, model_validator, Field
 from typing import List, Optional
 from datetime import datetime, UTC
+from app.config import settings
+from app.services.normalization import name_resolver
 
 class InteractionBase(BaseModel):
     medication1: str
@@ -17,12 +19,18 @@ class InteractionBase(BaseModel):
         return v.lower()
 
 class InteractionCreate(InteractionBase):
-    pass
+    @model_validator(mode="after")
+    def validate_distinct_medications(self):
+        if name_resolver.resolve(self.medication1) == name_resolver.resolve(self.medication2):
+            raise ValueError("medication1 and medication2 must be different medications")
+        return self
 
 class InteractionResponse(InteractionBase):
     id: str
     created_at: str
     updated_at: str
+    # The checked products, when the interaction is between their ingredients
+    source_medications: Optional[List[str]] = None
 
 class InteractionCheckRequest(BaseModel):
     medications: List[str]
@@ -33,7 +41,11 @@ class InteractionCheckRequest(BaseModel):
     def validate_medications(cls, v):
         if len(v) < 2:
             raise ValueError("At least 2 medications are required")
-        if len(set(v)) != len(v):
+        # "Aspirin", " aspirin" and "ASA" are the same medication
+        names = [name_resolver.resolve(medication) for medication in v]
+        if not all(names):
+            raise ValueError("Medication names must not be blank")
+        if len(set(names)) != len(names):
             raise ValueError("Duplicate medications are not allowed")
         return v
 
@@ -43,6 +55,19 @@ class InteractionCheckResponse(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+class InteractionBatchCheckRequest(BaseModel):
+    regimens: List[InteractionCheckRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.INTERACTION_BATCH_MAX_REGIMENS
+    )
+
+class InteractionBatchCheckResponse(BaseModel):
+    results: List[InteractionCheckResponse]
+    unique_pairs: int
+
+    model_config = ConfigDict(from_attributes=True)
+
 class MedicationBase(BaseModel):
     name: str = Field(..., min_length=1)
     generic_name: str = Field(..., min_length=1)
@@ -69,4 +94,28 @@ class MedicationListResponse(BaseModel):
     total: int
     page: int
     limit: int
-    has_more: bool 
\ No newline at end of file
+    has_more: bool
+    next_cursor: Optional[str] = None
+    approximate_total: bool = False
+
+# Attributes that can be asked for with ``fields``
+MEDICATION_FIELDS = tuple(MedicationResponse.model_fields)
+
+class MedicationFields(BaseModel):
+    """A medication trimmed to the requested ``fields``; ``id`` is always present.
+    Serialize with ``exclude_unset`` so attributes not asked for are left out."""
+    id: str
+    name: Optional[str] = None
+    generic_name: Optional[str] = None
+    description: Optional[str] = None
+    dosage_forms: Optional[list[str]] = None
+    active_ingredients: Optional[list[str]] = None
+    warnings: Optional[list[str]] = None
+    side_effects: Optional[list[str]] = None
+    manufacturer: Optional[str] = None
+    category: Optional[str] = None
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+
+class MedicationFieldsListResponse(MedicationListResponse):
+    items: list[MedicationFields] 
\ No newline at end of file
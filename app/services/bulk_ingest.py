@@ -0,0 +1,123 @@
+import asyncio
+import csv
+import json
+import time
+from dataclasses import dataclass, field
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple
+from pydantic import ValidationError
+from app.db.dynamo import BATCH_WRITE_CHUNK_SIZE, DynamoDB, db as default_db
+from app.models.schemas import InteractionCreate
+from app.services.interactions import build_interaction_item
+from app.services.result_cache import interaction_result_cache
+
+INPUT_FORMATS = ("csv", "jsonl")
+
+@dataclass
+class IngestReport:
+    written: int = 0
+    rejected: List[Tuple[int, str]] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.written / self.elapsed if self.elapsed else 0.0
+
+def read_rows(source: IO[str], input_format: str) -> Iterator[Tuple[int, Dict]]:
+    """Yield (line number, raw row) from CSV with a header row, or JSONL"""
+    if input_format not in INPUT_FORMATS:
+        raise ValueError(f"Input format must be one of {list(INPUT_FORMATS)}")
+    if input_format == "csv":
+        reader = csv.DictReader(source)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(source, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, {"__error__": f"Invalid JSON: {e.msg}"}
+
+def validate_rows(rows: Iterable[Tuple[int, Dict]], report: IngestReport) -> Iterator[Dict]:
+    """Yield stored items for valid rows; record the rest on ``report``.
+
+    A pair seen earlier in the input is rejected as a duplicate, so the
+    first occurrence wins no matter how writes are later interleaved. The
+    keys of every distinct pair are kept for this, so memory grows with
+    the number of distinct pairs (not rows) in the input.
+    """
+    seen = set()
+    for line_number, row in rows:
+        if not isinstance(row, dict) or "__error__" in row:
+            reason = row["__error__"] if isinstance(row, dict) else "Row is not an object"
+            report.rejected.append((line_number, reason))
+            continue
+        if None in row:
+            # csv.DictReader collects surplus fields under a None key
+            report.rejected.append((line_number, "Row has more fields than the header"))
+            continue
+        try:
+            item = build_interaction_item(InteractionCreate(**row))
+        except ValidationError as e:
+            report.rejected.append((line_number, "; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+                for error in e.errors()
+            )))
+            continue
+        pair = (item["medication1"], item["medication2"])
+        if pair in seen:
+            report.rejected.append((line_number, f"Duplicate pair {pair[0]} / {pair[1]}"))
+            continue
+        seen.add(pair)
+        yield item
+
+def chunked(items: Iterable[Dict], size: int = BATCH_WRITE_CHUNK_SIZE) -> Iterator[List[Dict]]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+async def bulk_ingest(
+    source: IO[str],
+    input_format: str,
+    db: Optional[DynamoDB] = None,
+    workers: int = 4
+) -> IngestReport:
+    """Stream interactions from ``source`` into DynamoDB.
+
+    Rows are validated and canonicalized lazily and handed to ``workers``
+    concurrent BatchWriteItem writers through a bounded queue, so at most
+    a few chunks of items are held at once. Duplicate detection still
+    keeps each distinct pair's key; see ``validate_rows``.
+    """
+    db = db if db is not None else default_db
+    report = IngestReport()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)
+    start = time.perf_counter()
+
+    async def produce():
+        for chunk in chunked(validate_rows(read_rows(source, input_format), report)):
+            await queue.put(chunk)
+        for _ in range(workers):
+            await queue.put(None)
+
+    async def write():
+        while (chunk := await queue.get()) is not None:
+            written = await db.batch_write_item(chunk)
+            report.written += written
+
+    tasks = [asyncio.create_task(produce())] + [asyncio.create_task(write()) for _ in range(workers)]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        if report.written:
+            await interaction_result_cache.bump_version()
+    report.elapsed = time.perf_counter() - start
+    return report
@@ -0,0 +1,48 @@
+from typing import Dict, Iterable, Optional, Tuple
+from app.db.dynamo import DynamoDB
+from app.services.normalization import NameResolver, name_resolver
+
+class IngredientIndex:
+    """Canonical medication name -> canonical names of its active ingredients.
+
+    Built once from the catalog, so expanding a regimen costs one dict
+    lookup per medication and no DynamoDB calls. Only combination products
+    are stored: a single-ingredient product already resolves to its
+    generic name through the NameResolver.
+    """
+
+    def __init__(self, resolver: Optional[NameResolver] = None):
+        self.resolver = resolver if resolver is not None else name_resolver
+        self._ingredients: Dict[str, Tuple[str, ...]] = {}
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._ingredients)
+
+    def add(self, name: str, generic_name: str, active_ingredients: Iterable[str]) -> None:
+        ingredients = tuple(dict.fromkeys(self.resolver.resolve(ingredient) for ingredient in active_ingredients))
+        if len(ingredients) < 2:
+            return
+        for key in (self.resolver.resolve(name), self.resolver.resolve(generic_name)):
+            self._ingredients[key] = ingredients
+
+    def expand(self, medication: str) -> Tuple[str, ...]:
+        """Active ingredients of a canonical medication name, or just the name"""
+        return self._ingredients.get(medication, (medication,))
+
+    async def load(self, db: DynamoDB) -> None:
+        """Rebuild the index from the medications in a full table scan"""
+        fresh = IngredientIndex(self.resolver)
+        start_key = None
+        while True:
+            response = await db.scan(exclusive_start_key=start_key)
+            for item in response.get("Items", []):
+                if "name" in item and "generic_name" in item:
+                    fresh.add(item["name"], item["generic_name"], item.get("active_ingredients", []))
+            start_key = response.get("LastEvaluatedKey")
+            if not start_key:
+                break
+        self._ingredients = fresh._ingredients
+        self.loaded = True
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from app.config import settings
+from app.db.dynamo import DynamoDB
+from app.models.records import InteractionRecord
+from app.services.normalization import NameResolver, name_resolver
+from app.services.result_cache import InteractionResultCache, interaction_result_cache
+
+logger = logging.getLogger(__name__)
+
+class InteractionGraph:
+    """In-memory adjacency index over the interactions table.
+
+    Each canonical medication name maps to its interacting partners and the
+    interaction between them, so a regimen of k drugs is checked with k set
+    intersections and no network I/O. ``version`` changes on every mutation.
+    Interactions are held as compact InteractionRecords.
+
+    A refresh that picks up rows written elsewhere (another instance, the
+    bulk loader) also invalidates this instance's cached check results.
+    The refresh watermark only moves with rows a scan returned, never with
+    local writes, and each refresh re-scans ``lookback_seconds`` behind it:
+    ``updated_at`` comes from each writer's clock, so a row stamped earlier
+    can land after a later one.
+    """
+
+    def __init__(
+        self,
+        resolver: Optional[NameResolver] = None,
+        result_cache: Optional[InteractionResultCache] = None,
+        lookback_seconds: Optional[float] = None
+    ):
+        self.resolver = resolver if resolver is not None else name_resolver
+        self.result_cache = result_cache if result_cache is not None else interaction_result_cache
+        self.lookback_seconds = (
+            lookback_seconds if lookback_seconds is not None else settings.INTERACTION_GRAPH_REFRESH_LOOKBACK_SECONDS
+        )
+        self._adjacency: Dict[str, Dict[str, InteractionRecord]] = {}
+        self._watermark: Optional[str] = None
+        self.version = 0
+        self.loaded = False
+
+    @property
+    def etag(self) -> str:
+        return f'W/"interactions-{self.version}"'
+
+    def normalize(self, name: str) -> str:
+        return self.resolver.resolve(name)
+
+    def __len__(self) -> int:
+        return sum(len(partners) for partners in self._adjacency.values()) // 2
+
+    def add(self, interaction: InteractionRecord) -> None:
+        """Insert or replace a single interaction"""
+        self._insert(self._adjacency, interaction)
+        self.version += 1
+
+    def get(self, medication1: str, medication2: str) -> Optional[InteractionRecord]:
+        """The interaction stored for a pair of canonical names, if any"""
+        return self._adjacency.get(medication1, {}).get(medication2)
+
+    def check(self, medications: List[str]) -> List[InteractionRecord]:
+        """Interactions within a regimen, in the same pair order as a table lookup"""
+        names = [self.normalize(medication) for medication in medications]
+        regimen = set(names)
+        interactions = []
+        for i, name in enumerate(names):
+            partners = self._adjacency.get(name)
+            if not partners or not partners.keys() & regimen:
+                continue
+            for other in names[i + 1:]:
+                if other in partners:
+                    interactions.append(partners[other])
+        return interactions
+
+    async def load(self, db: DynamoDB) -> None:
+        """Build the graph from a full table scan and swap it in"""
+        adjacency: Dict[str, Dict[str, InteractionRecord]] = {}
+        watermark = None
+        async for item in self._scan(db):
+            interaction = InteractionRecord.from_item(item)
+            self._insert(adjacency, interaction)
+            watermark = max(watermark or interaction.updated_at, interaction.updated_at)
+        self._adjacency = adjacency
+        self._watermark = watermark
+        self.version += 1
+        self.loaded = True
+
+    async def refresh(self, db: DynamoDB) -> int:
+        """Apply rows updated since the last load or refresh (less the
+        lookback); returns how many changed the graph"""
+        if not self.loaded:
+            await self.load(db)
+            await self.result_cache.bump_version()
+            return len(self)
+        scan_kwargs = {}
+        if self._watermark:
+            scan_kwargs = {
+                "filter_expression": "#updated_at > :since",
+                "expression_attribute_names": {"#updated_at": "updated_at"},
+                "expression_values": {":since": self._scan_from(self._watermark)},
+            }
+        applied = 0
+        async for item in self._scan(db, **scan_kwargs):
+            interaction = InteractionRecord.from_item(item)
+            self._advance_watermark(interaction.updated_at)
+            # The lookback re-reads rows, and local writes are already applied
+            if self.get(self.normalize(interaction.medication1), self.normalize(interaction.medication2)) == interaction:
+                continue
+            self.add(interaction)
+            applied += 1
+        if applied:
+            await self.result_cache.bump_version()
+        return applied
+
+    async def refresh_periodically(self, db: DynamoDB, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh(db)
+            except Exception:
+                logger.exception("Interaction graph refresh failed")
+
+    def _insert(self, adjacency: Dict, interaction: InteractionRecord) -> None:
+        med1 = self.normalize(interaction.medication1)
+        med2 = self.normalize(interaction.medication2)
+        adjacency.setdefault(med1, {})[med2] = interaction
+        adjacency.setdefault(med2, {})[med1] = interaction
+
+    def _advance_watermark(self, updated_at: str) -> None:
+        if self._watermark is None or updated_at > self._watermark:
+            self._watermark = updated_at
+
+    def _scan_from(self, watermark: str) -> str:
+        """``watermark`` moved back by the lookback, in the same ISO format"""
+        try:
+            return (datetime.fromisoformat(watermark) - timedelta(seconds=self.lookback_seconds)).isoformat()
+        except ValueError:
+            return watermark
+
+    @staticmethod
+    async def _scan(db: DynamoDB, **scan_kwargs):
+        start_key = None
+        while True:
+            response = await db.scan(exclusive_start_key=start_key, **scan_kwargs)
+            for item in response.get("Items", []):
+                yield item
+            start_key = response.get("LastEvaluatedKey")
+            if not start_key:
+                break
+
+interaction_graph = InteractionGraph()
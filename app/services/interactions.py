@@ -1,38 +1,290 @@
-from typing import List, Dict
+import asyncio
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 import uuid
 from datetime import datetime, UTC
-from app.db.dynamo import db
+from app import metrics
+from app.db.dynamo import BATCH_GET_CHUNK_SIZE, db
+from app.models.records import InteractionRecord
 from app.models.schemas import InteractionCreate, InteractionResponse
+from app.services.ingredients import IngredientIndex, ingredient_index
+from app.services.interaction_graph import InteractionGraph, interaction_graph
+from app.services.normalization import NameResolver, name_resolver
+from app.services.result_cache import InteractionResultCache, interaction_result_cache
+from app.config import settings
+
+LOOKUP_MODES = ("query", "batch", "parallel")
 
 class InteractionService:
+    def __init__(
+        self,
+        lookup_mode: Optional[str] = None,
+        lookup_concurrency: Optional[int] = None,
+        graph: Optional[InteractionGraph] = None,
+        resolver: Optional[NameResolver] = None,
+        ingredients: Optional[IngredientIndex] = None,
+        result_cache: Optional[InteractionResultCache] = None
+    ):
+        self.lookup_mode = lookup_mode or settings.INTERACTION_LOOKUP_MODE
+        self.lookup_concurrency = lookup_concurrency or settings.INTERACTION_LOOKUP_CONCURRENCY
+        self.graph = graph if graph is not None else interaction_graph
+        self.resolver = resolver if resolver is not None else name_resolver
+        self.ingredients = ingredients if ingredients is not None else ingredient_index
+        self.result_cache = result_cache if result_cache is not None else interaction_result_cache
+        if self.lookup_mode not in LOOKUP_MODES:
+            raise ValueError(f"Lookup mode must be one of {list(LOOKUP_MODES)}")
+
     async def check_interactions(self, medications: List[str]) -> List[InteractionResponse]:
+        return [record.to_response() for record in await self.check_records(medications)]
+
+    @metrics.timed("interactions.check")
+    async def check_records(self, medications: List[str]) -> List[InteractionRecord]:
+        """``check_interactions`` as records, for callers that serialize them
+        directly instead of building a model per interaction"""
+        if self.graph.loaded and not self.ingredients.loaded:
+            return self.graph.check(medications)
+        pairs = self._canonical_pairs(medications)
+        found = await self._lookup(self._stored_pairs(pairs))
+        return self._assemble(pairs, found)
+
+    async def iter_interactions(self, medications: List[str]) -> AsyncIterator[InteractionResponse]:
+        """Yield a regimen's interactions in pair order as they are resolved.
+
+        Same results as ``check_interactions``, but batch mode fetches one
+        BatchGetItem chunk at a time so the first interactions are
+        available before the last pairs have been looked up.
+        """
+        if self.graph.loaded and not self.ingredients.loaded:
+            for record in self.graph.check(medications):
+                yield record.to_response()
+            return
+        pairs = self._canonical_pairs(medications)
+        if self.lookup_mode == "parallel" and not self.graph.loaded:
+            step = self.lookup_concurrency
+        elif self._batched or self.graph.loaded:
+            step = BATCH_GET_CHUNK_SIZE
+        else:
+            step = 1
+        for start in range(0, len(pairs), step):
+            chunk = pairs[start:start + step]
+            found = await self._lookup(self._stored_pairs(chunk))
+            for record in self._assemble(chunk, found):
+                yield record.to_response()
+
+    async def iter_interactions_batch(
+        self,
+        regimens: List[List[str]]
+    ) -> AsyncIterator[Tuple[int, List[InteractionResponse]]]:
+        """Yield ``(index, interactions)`` per regimen, in request order.
+
+        New pairs are fetched whenever they fill a BatchGetItem request,
+        and each regimen is yielded once all of its pairs (and those of the
+        regimens before it) have been fetched. Pairs already fetched earlier
+        in the stream are not fetched again.
+        """
+        if self.graph.loaded and not self.ingredients.loaded:
+            for index, medications in enumerate(regimens):
+                yield index, [record.to_response() for record in self.graph.check(medications)]
+            return
+        found: Dict[Tuple[str, str], InteractionRecord] = {}
+        fetched = set()
+        pending: List[Tuple[int, List[Tuple[str, str]], List[Tuple[str, str]]]] = []
+        missing: Dict[Tuple[str, str], None] = {}
+
+        async def fetch(pairs: List[Tuple[str, str]]) -> None:
+            found.update(await self._lookup(pairs, batch=True))
+            fetched.update(pairs)
+            for pair in pairs:
+                del missing[pair]
+
+        for index, medications in enumerate(regimens):
+            pairs = self._canonical_pairs(medications)
+            stored = self._stored_pairs(pairs)
+            pending.append((index, pairs, stored))
+            missing.update((pair, None) for pair in stored if pair not in fetched)
+            while len(missing) >= BATCH_GET_CHUNK_SIZE:
+                await fetch(list(missing)[:BATCH_GET_CHUNK_SIZE])
+            # Regimens complete in request order, so only a resolved prefix can go out
+            ready = 0
+            while ready < len(pending) and all(pair in fetched for pair in pending[ready][2]):
+                ready += 1
+            for pending_index, pending_pairs, _ in pending[:ready]:
+                yield pending_index, [record.to_response() for record in self._assemble(pending_pairs, found)]
+            del pending[:ready]
+        if missing:
+            await fetch(list(missing))
+        for pending_index, pending_pairs, _ in pending:
+            yield pending_index, [record.to_response() for record in self._assemble(pending_pairs, found)]
+
+    @metrics.timed("interactions.check_batch")
+    async def check_interactions_batch(
+        self,
+        regimens: List[List[str]]
+    ) -> Tuple[List[List[InteractionResponse]], int]:
+        """Check many regimens, looking up each distinct pair only once.
+
+        Pairs shared between regimens are fetched together in one
+        BatchGetItem pass whatever the lookup mode, so cost follows the
+        number of unique pairs rather than the sum over regimens. Returns
+        the interactions of each regimen, in request order, and the number
+        of unique pairs.
+        """
+        regimen_pairs = [self._canonical_pairs(medications) for medications in regimens]
+        unique_pairs = self._stored_pairs([pair for pairs in regimen_pairs for pair in pairs])
+        if self.graph.loaded and not self.ingredients.loaded:
+            return [
+                [record.to_response() for record in self.graph.check(medications)]
+                for medications in regimens
+            ], len(unique_pairs)
+        found = await self._lookup(unique_pairs, batch=True)
+        return [
+            [record.to_response() for record in self._assemble(pairs, found)]
+            for pairs in regimen_pairs
+        ], len(unique_pairs)
+
+    async def _lookup(
+        self,
+        pairs: List[Tuple[str, str]],
+        batch: bool = False
+    ) -> Dict[Tuple[str, str], InteractionRecord]:
+        """Stored interactions for ``pairs`` from the graph, BatchGetItem or one Query each.
+
+        Parallel mode never uses BatchGetItem, even for ``batch`` lookups,
+        since it is meant for backends that lack it.
+        """
+        if self.graph.loaded:
+            return {pair: interaction for pair in pairs if (interaction := self.graph.get(*pair))}
+        if self.lookup_mode == "parallel":
+            return await self._query_pairs_parallel(pairs)
+        if batch or self._batched:
+            return await self._fetch_pairs(pairs)
+        found = {}
+        for med1, med2 in pairs:
+            record = await self._query_pair(med1, med2)
+            if record is not None:
+                found[(med1, med2)] = record
+        return found
+
+    @property
+    def _batched(self) -> bool:
+        # Ingredient expansion multiplies the pairs, so they go through BatchGetItem unless in parallel mode
+        return self.lookup_mode == "batch" or (self.ingredients.loaded and self.lookup_mode != "parallel")
+
+    @staticmethod
+    async def _query_pair(med1: str, med2: str) -> Optional[InteractionRecord]:
+        result = await db.query(
+            "medication1 = :med1 AND medication2 = :med2",
+            {":med1": med1, ":med2": med2}
+        )
+        record = None
+        for item in (result or {}).get("Items", []):
+            record = InteractionRecord.from_item(item)
+        return record
+
+    async def _query_pairs_parallel(self, pairs: List[Tuple[str, str]]) -> Dict[Tuple[str, str], InteractionRecord]:
+        """One Query per pair, at most ``lookup_concurrency`` in flight.
+
+        Results are collected in pair order, so output does not depend on
+        which query finishes first. If the caller is cancelled (the client
+        went away) or a query fails, the queries still pending are
+        cancelled and awaited before this returns or raises.
+        """
+        metrics.INTERACTION_LOOKUP_FANOUT.observe(len(pairs))
+        semaphore = asyncio.Semaphore(self.lookup_concurrency)
+
+        async def lookup(pair: Tuple[str, str]) -> Optional[InteractionRecord]:
+            async with semaphore:
+                return await self._query_pair(*pair)
+
+        tasks = [asyncio.ensure_future(lookup(pair)) for pair in pairs]
+        try:
+            records = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        return {pair: record for pair, record in zip(pairs, records) if record is not None}
+
+    @staticmethod
+    async def _fetch_pairs(pairs: List[Tuple[str, str]]) -> Dict[Tuple[str, str], InteractionRecord]:
+        if not pairs:
+            return {}
+        items = await db.batch_get_item([
+            {"medication1": med1, "medication2": med2}
+            for med1, med2 in pairs
+        ])
+        return {
+            (item["medication1"], item["medication2"]): InteractionRecord.from_item(item)
+            for item in items
+        }
+
+    def _canonical_pairs(self, medications: List[str]) -> List[Tuple[str, str]]:
+        """Every unordered pair of canonical names in the regimen, each sorted
+        the way it is stored. Spellings of the same medication collapse first,
+        so no pair is looked up twice."""
+        names = list(dict.fromkeys(self.resolver.resolve(medication) for medication in medications))
+        pairs = []
+        for i in range(len(names)):
+            for j in range(i + 1, len(names)):
+                med1, med2 = sorted([names[i], names[j]])
+                pairs.append((med1, med2))
+        return pairs
+
+    def _expand(self, pair: Tuple[str, str]) -> List[Tuple[str, str]]:
+        """The stored pairs that can hold an interaction between two products:
+        the products themselves, then every cross pair of their ingredients"""
+        if not self.ingredients.loaded:
+            return [pair]
+        expanded = {pair: None}
+        for ingredient1 in self.ingredients.expand(pair[0]):
+            for ingredient2 in self.ingredients.expand(pair[1]):
+                if ingredient1 != ingredient2:
+                    expanded[tuple(sorted([ingredient1, ingredient2]))] = None
+        return list(expanded)
+
+    def _stored_pairs(self, pairs: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        return list(dict.fromkeys(stored for pair in pairs for stored in self._expand(pair)))
+
+    def _assemble(
+        self,
+        pairs: List[Tuple[str, str]],
+        found: Dict[Tuple[str, str], InteractionRecord]
+    ) -> List[InteractionRecord]:
+        """Interactions in product pair order. One found through ingredients
+        names the products it came from in ``source_medications``."""
         interactions = []
-        for i in range(len(medications)):
-            for j in range(i + 1, len(medications)):
-                med1, med2 = sorted([medications[i], medications[j]])
-                result = await db.query(
-                    "medication1 = :med1 AND medication2 = :med2",
-                    {":med1": med1, ":med2": med2}
-                )
-                if result and "Items" in result:
-                    interactions.extend([
-                        InteractionResponse(**item)
-                        for item in result["Items"]
-                    ])
+        for pair in pairs:
+            for stored in self._expand(pair):
+                record = found.get(stored)
+                if record is None:
+                    continue
+                if stored != pair:
+                    record = record.with_sources(pair)
+                interactions.append(record)
         return interactions
 
+    @metrics.timed("interactions.create")
     async def create_interaction(self, interaction: InteractionCreate) -> InteractionResponse:
-        # Sort medications to ensure consistent ordering
-        med1, med2 = sorted([interaction.medication1, interaction.medication2])
-        
-        interaction_dict = interaction.model_dump()
-        interaction_dict["medication1"] = med1
-        interaction_dict["medication2"] = med2
-        interaction_dict["id"] = str(uuid.uuid4())
-        interaction_dict["created_at"] = datetime.now(UTC).isoformat()
-        interaction_dict["updated_at"] = datetime.now(UTC).isoformat()
-        
+        interaction_dict = build_interaction_item(interaction, self.resolver)
         await db.put_item(interaction_dict)
-        return InteractionResponse(**interaction_dict)
+        record = InteractionRecord.from_item(interaction_dict)
+        if self.graph.loaded:
+            self.graph.add(record)
+        await self.result_cache.bump_version()
+        return record.to_response()
+
+def build_interaction_item(interaction: InteractionCreate, resolver: Optional[NameResolver] = None) -> dict:
+    """The item stored for an interaction, keyed by canonical names in sorted order"""
+    resolver = resolver if resolver is not None else name_resolver
+    # Sort medications to ensure consistent ordering
+    med1, med2 = sorted([resolver.resolve(interaction.medication1), resolver.resolve(interaction.medication2)])
+
+    interaction_dict = interaction.model_dump()
+    interaction_dict["medication1"] = med1
+    interaction_dict["medication2"] = med2
+    interaction_dict["id"] = str(uuid.uuid4())
+    interaction_dict["created_at"] = datetime.now(UTC).isoformat()
+    interaction_dict["updated_at"] = datetime.now(UTC).isoformat()
+    return interaction_dict
 
-interaction_service = InteractionService() 
\ No newline at end of file
+interaction_service = InteractionService()
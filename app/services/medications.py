@@ -1,93 +1,417 @@
-from typing import Optional
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional, Sequence, Union
+import asyncio
+import contextvars
+import logging
+import uuid
 from datetime import datetime, UTC
+from pydantic_core import to_json
+from app import metrics
+from app.cache import TTLCache
 from app.db.dynamo import DynamoDB
-from app.models.schemas import MedicationCreate, MedicationResponse
+from app.db.pagination import InvalidCursor, decode_cursor, encode_cursor
+from app.models.schemas import MEDICATION_FIELDS, MedicationCreate, MedicationFields, MedicationResponse
+from app.services.ingredients import ingredient_index
+from app.services.normalization import name_resolver, normalize_term
+from app.services.result_cache import InteractionResultCache, etag_for, interaction_result_cache
+from app.services.search_index import MedicationSearchIndex, medication_search_index
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
+# Item holding the number of medications, kept up to date by every write
+COUNTER_KEY = {"id": "#medication_count"}
+
+# Totals by normalized search term ("" for the whole catalog)
+count_cache = TTLCache(maxsize=settings.COUNT_CACHE_SIZE, ttl=settings.COUNT_CACHE_TTL_SECONDS)
+
+# Medications by ID, as CachedMedication or MISSING for IDs that were not found.
+# Each instance caches its own reads; writes through another instance show
+# up here after at most MEDICATION_CACHE_TTL_SECONDS.
+medication_cache = TTLCache(maxsize=settings.MEDICATION_CACHE_SIZE, ttl=settings.MEDICATION_CACHE_TTL_SECONDS)
+
+MISSING = object()
+
+class CachedMedication(NamedTuple):
+    medication: MedicationResponse
+    # Rendered JSON of ``medication``, and its validators for conditional requests
+    body: bytes
+    etag: str
+    last_modified: Optional[datetime]
+
+def cache_entry(medication: MedicationResponse) -> CachedMedication:
+    body = to_json(medication)
+    try:
+        # HTTP dates have whole seconds
+        last_modified = datetime.fromisoformat(medication.updated_at).astimezone(UTC).replace(microsecond=0)
+    except ValueError:
+        last_modified = None
+    return CachedMedication(medication, body, etag_for(body), last_modified)
+
+class MedicationPage(NamedTuple):
+    items: list[Union[MedicationResponse, MedicationFields]]
+    total: Optional[int]
+    has_more: bool
+    next_cursor: Optional[str] = None
+    approximate_total: bool = False
+
 class MedicationService:
-    def __init__(self, db: DynamoDB):
+    def __init__(
+        self,
+        db: DynamoDB,
+        search_index: Optional[MedicationSearchIndex] = None,
+        result_cache: Optional[InteractionResultCache] = None
+    ):
         self.db = db
         self.table_name = settings.MEDICATIONS_TABLE
+        self.search_index = search_index if search_index is not None else medication_search_index
+        self.result_cache = result_cache if result_cache is not None else interaction_result_cache
+        # Set once the counter item is known to exist, so writes can ADD to it
+        self._counter_seeded = False
+        # Background COUNTs of search terms, by normalized term
+        self._counting: Dict[str, asyncio.Task] = {}
 
+    @metrics.timed("medications.list")
     async def list_medications(
         self,
         search: Optional[str] = None,
         page: int = 1,
-        limit: int = 50
-    ) -> tuple[list[MedicationResponse], int, bool]:
-        """List medications with search and pagination"""
-        offset = (page - 1) * limit
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        with_total: bool = True,
+        fields: Optional[Sequence[str]] = None
+    ) -> MedicationPage:
+        """List medications with search and pagination.
+
+        ``cursor`` is the ``next_cursor`` of the previous page. It wraps the
+        DynamoDB start key (or the offset into search index matches), so
+        every page costs the same as the first. Totals are only returned
+        for the first page, unless ``with_total`` is off, and may come from
+        the count cache.
+
+        With ``fields``, only those attributes (and ``id``) are read from
+        DynamoDB and items are MedicationFields. Unknown fields raise
+        ValueError.
+
+        ``page`` only applies to the search index, whose matches can be
+        skipped into. A Scan cannot jump ahead, so ``page`` past 1 without a
+        cursor raises ValueError rather than returning the first page.
+        """
+        position = self._decode_position(cursor, search)
+        projection = self._projection(fields)
+        first_page = with_total and cursor is None and page == 1
+        if search and self.search_index.loaded:
+            offset = position.get("o", (page - 1) * limit)
+            return await self._search_medications(search, offset, limit, projection)
         
-        # Build query parameters
-        query_kwargs = {}
-        if search:
-            query_kwargs["filter_expression"] = "contains(#name, :search) OR contains(#generic_name, :search)"
-            query_kwargs["expression_attribute_names"] = {
-                "#name": "name",
-                "#generic_name": "generic_name"
-            }
-            query_kwargs["expression_attribute_values"] = {
-                ":search": search.lower()
-            }
+        # Listing the catalog, or matching a substring of names, reads the
+        # table in key order; each page is one Scan resumed from the cursor
+        if page > 1 and cursor is None:
+            raise ValueError("page is not supported here; pass the previous response's next_cursor as cursor")
+        scan_kwargs = self._search_filter(search)
         if limit is not None:
-            query_kwargs["limit"] = limit + 1
+            scan_kwargs["limit"] = limit + 1
+        if "k" in position:
+            scan_kwargs["exclusive_start_key"] = position["k"]
+        if projection:
+            scan_kwargs["projection"] = projection
             
-        response = await self.db.query(**query_kwargs)
-        items = response.get("Items", [])
-        has_more = len(items) > limit
-        if has_more:
-            items = items[:-1]
+        response = await self.db.scan(**scan_kwargs)
+        items = [item for item in response.get("Items", []) if item.get("id") != COUNTER_KEY["id"]]
+        next_key = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_key = self._item_key(items[-1])
+        elif response.get("LastEvaluatedKey"):
+            # A filtered page can stop short while the table has more to read
+            next_key = response["LastEvaluatedKey"]
             
-        medications = [
-            MedicationResponse(
-                id=item["id"],
-                name=item["name"],
-                generic_name=item["generic_name"],
-                description=item["description"],
-                dosage_forms=item["dosage_forms"],
-                active_ingredients=item["active_ingredients"],
-                warnings=item.get("warnings", []),
-                side_effects=item.get("side_effects", []),
-                manufacturer=item["manufacturer"],
-                category=item["category"],
-                created_at=item["created_at"],
-                updated_at=item["updated_at"]
+        medications = [self._to_response(item, projection) for item in items]
+        total, approximate_total = await self._get_total(search) if first_page else (None, False)
+        next_cursor = encode_cursor({"q": search or "", "k": next_key}) if next_key else None
+        return MedicationPage(medications, total, next_key is not None, next_cursor, approximate_total)
+
+    def iter_medications(
+        self,
+        search: Optional[str] = None,
+        page_size: int = 50,
+        cursor: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> AsyncIterator[Union[MedicationResponse, MedicationFields]]:
+        """Yield every medication from ``cursor`` onwards, one page at a time.
+
+        Only one page is held in memory, so exports of the whole catalog
+        start streaming after the first page is read. A bad cursor raises
+        InvalidCursor (and unknown fields ValueError) here rather than once
+        iteration has begun.
+        """
+        self._decode_position(cursor, search)
+        self._projection(fields)
+        return self._iter_pages(search, page_size, cursor, fields)
+
+    async def _iter_pages(
+        self,
+        search: Optional[str],
+        page_size: int,
+        cursor: Optional[str],
+        fields: Optional[Sequence[str]]
+    ) -> AsyncIterator[Union[MedicationResponse, MedicationFields]]:
+        while True:
+            result = await self.list_medications(
+                search=search,
+                limit=page_size,
+                cursor=cursor,
+                with_total=False,
+                fields=fields
             )
-            for item in items
-        ]
-        total = await self._get_total_count(search) if page == 1 else None
-        return medications, total, has_more
+            for medication in result.items:
+                yield medication
+            if not result.next_cursor:
+                return
+            cursor = result.next_cursor
 
-    async def get_medication(self, medication_id: str) -> Optional[MedicationResponse]:
-        response = await self.db.get_item({"id": medication_id})
+    @metrics.timed("medications.get")
+    async def get_medication(
+        self,
+        medication_id: str,
+        fields: Optional[Sequence[str]] = None
+    ) -> Optional[Union[MedicationResponse, MedicationFields]]:
+        projection = self._projection(fields)
+        if not projection:
+            entry = await self.get_medication_entry(medication_id)
+            return entry.medication if entry else None
+        # A cached medication has every field; otherwise read only the projection
+        entry = medication_cache.get(medication_id)
+        if entry is MISSING:
+            return None
+        if entry is not None:
+            return MedicationFields(**entry.medication.model_dump(include=set(projection)))
+        response = await self.db.get_item({"id": medication_id}, projection=projection)
         if not response:
             return None
-            
+        return self._to_response(response, projection)
+
+    async def get_medication_entry(self, medication_id: str) -> Optional[CachedMedication]:
+        """The medication with its rendered JSON and validators, read through medication_cache.
+
+        IDs that are not found are cached too, for
+        MEDICATION_CACHE_NEGATIVE_TTL_SECONDS, so repeated 404s stay off
+        DynamoDB.
+        """
+        entry = medication_cache.get(medication_id)
+        if entry is MISSING:
+            return None
+        if entry is not None:
+            return entry
+        item = None
+        if medication_id != COUNTER_KEY["id"]:
+            item = await self.db.get_item({"id": medication_id})
+        if not item:
+            medication_cache.set(medication_id, MISSING, ttl=settings.MEDICATION_CACHE_NEGATIVE_TTL_SECONDS)
+            return None
+        entry = cache_entry(self._to_response(item))
+        medication_cache.set(medication_id, entry)
+        return entry
+
+    @staticmethod
+    def invalidate(medication_id: str) -> None:
+        """Drop a medication from this instance's cache; call after writing it"""
+        medication_cache.invalidate(medication_id)
+
+    @metrics.timed("medications.find_by_name")
+    async def find_by_name(self, name: str) -> List[MedicationResponse]:
+        """Medications whose name normalizes to the same term as ``name``, from the name GSI"""
+        response = await self.db.query(
+            key_condition_expression="name_normalized = :name",
+            expression_values={":name": normalize_term(name)},
+            index_name=settings.MEDICATIONS_NAME_INDEX
+        )
+        return [self._to_response(item) for item in response.get("Items", [])]
+
+    @metrics.timed("medications.create")
+    async def create_medication(self, medication: MedicationCreate) -> MedicationResponse:
+        medication_dict = medication.model_dump()
+        # Keys of the name GSI and the search filter
+        medication_dict["name_normalized"] = normalize_term(medication.name)
+        medication_dict["generic_name_normalized"] = normalize_term(medication.generic_name)
+        medication_dict["id"] = str(uuid.uuid4())
+        medication_dict["created_at"] = datetime.now(UTC).isoformat()
+        medication_dict["updated_at"] = datetime.now(UTC).isoformat()
+
+        await self._ensure_counter()
+        await self.db.put_item(medication_dict)
+        self.invalidate(medication_dict["id"])
+        await self.db.update_item(COUNTER_KEY, "ADD item_count :one", {":one": 1})
+        # Any cached search total may now be one short
+        count_cache.clear()
+        if self.search_index.loaded:
+            self.search_index.add(medication_dict["id"], medication.name, medication.generic_name)
+        if name_resolver.loaded:
+            name_resolver.add_medication(medication.name, medication.generic_name, medication.active_ingredients)
+        if ingredient_index.loaded:
+            ingredient_index.add(medication.name, medication.generic_name, medication.active_ingredients)
+        # A new brand name or combination product can change what a cached check should return
+        await self.result_cache.bump_version()
+        return self._to_response(medication_dict)
+
+    async def _search_medications(
+        self,
+        search: str,
+        offset: int,
+        limit: int,
+        projection: Optional[List[str]] = None
+    ) -> MedicationPage:
+        """Page through ranked search index matches, fetching only that page"""
+        medication_ids, total = self.search_index.search(search, offset=offset, limit=limit)
+        if not medication_ids:
+            return MedicationPage([], total, False)
+        get_kwargs = {"projection": projection} if projection else {}
+        items = await self.db.batch_get_item([{"id": medication_id} for medication_id in medication_ids], **get_kwargs)
+        items_by_id = {item["id"]: item for item in items}
+        medications = [
+            self._to_response(items_by_id[medication_id], projection)
+            for medication_id in medication_ids
+            if medication_id in items_by_id
+        ]
+        next_offset = offset + len(medication_ids)
+        has_more = next_offset < total
+        next_cursor = encode_cursor({"q": search, "o": next_offset}) if has_more else None
+        return MedicationPage(medications, total, has_more, next_cursor)
+
+    @staticmethod
+    def _decode_position(cursor: Optional[str], search: Optional[str]) -> dict:
+        if cursor is None:
+            return {}
+        position = decode_cursor(cursor)
+        if position.get("q") != (search or ""):
+            raise InvalidCursor("Cursor belongs to a different search")
+        return position
+
+    @staticmethod
+    def _projection(fields: Optional[Sequence[str]]) -> Optional[List[str]]:
+        """Attributes to read for ``fields``: ``id`` first, then each field once"""
+        if not fields:
+            return None
+        unknown = [field for field in fields if field not in MEDICATION_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        return list(dict.fromkeys(["id", *fields]))
+
+    @staticmethod
+    def _item_key(item: dict) -> dict:
+        return {"id": item["id"]}
+
+    @staticmethod
+    def _to_response(
+        item: dict,
+        projection: Optional[List[str]] = None
+    ) -> Union[MedicationResponse, MedicationFields]:
+        if projection:
+            return MedicationFields(**{field: item[field] for field in projection if field in item})
         return MedicationResponse(
-            id=response["id"],
-            name=response["name"],
-            generic_name=response["generic_name"],
-            description=response["description"],
-            dosage_forms=response["dosage_forms"],
-            active_ingredients=response["active_ingredients"],
-            warnings=response.get("warnings", []),
-            side_effects=response.get("side_effects", []),
-            manufacturer=response["manufacturer"],
-            category=response["category"],
-            created_at=response["created_at"],
-            updated_at=response["updated_at"]
+            id=item["id"],
+            name=item["name"],
+            generic_name=item["generic_name"],
+            description=item["description"],
+            dosage_forms=item["dosage_forms"],
+            active_ingredients=item["active_ingredients"],
+            warnings=item.get("warnings", []),
+            side_effects=item.get("side_effects", []),
+            manufacturer=item["manufacturer"],
+            category=item["category"],
+            created_at=item["created_at"],
+            updated_at=item["updated_at"]
+        )
+
+    async def _get_total(self, search: Optional[str] = None) -> tuple[Optional[int], bool]:
+        """Total for a search (or the catalog) and whether it may be stale.
+
+        Cached totals are approximate: another instance may have written
+        since they were cached. The catalog total comes from the counter
+        item; a full COUNT only runs when that counter has never been set.
+        A search total that is not cached is counted in the background,
+        since a filtered COUNT reads the whole table; until then it is None.
+        """
+        term = normalize_term(search) if search else ""
+        cached = count_cache.get(term)
+        if cached is not None:
+            return cached, True
+        if term:
+            self._count_in_background(search, term)
+            return None, True
+        counter = await self.db.get_item(COUNTER_KEY)
+        if counter and "item_count" in counter:
+            self._counter_seeded = True
+            total = int(counter["item_count"])
+        else:
+            total = await self._get_total_count()
+            await self._seed_counter(total)
+        count_cache.set(term, total)
+        return total, False
+
+    def _count_in_background(self, search: str, term: str) -> None:
+        if term in self._counting:
+            return
+        # A fresh context, so the scan is not billed to the request that started it
+        task = asyncio.create_task(self._count_search(search, term), context=contextvars.Context())
+        self._counting[term] = task
+        task.add_done_callback(lambda _: self._counting.pop(term, None))
+
+    async def _count_search(self, search: str, term: str) -> None:
+        try:
+            count_cache.set(term, await self._get_total_count(search))
+        except Exception:
+            logger.exception("Counting medications matching %r failed", term)
+
+    async def _ensure_counter(self) -> None:
+        """Seed the counter item from a full COUNT if it does not exist yet.
+
+        Runs before a write adds to the counter: ``ADD`` on a missing
+        counter would start it at 1 however many medications the table
+        already holds.
+        """
+        if self._counter_seeded:
+            return
+        counter = await self.db.get_item(COUNTER_KEY)
+        if counter and "item_count" in counter:
+            self._counter_seeded = True
+            return
+        await self._seed_counter(await self._get_total_count())
+
+    async def _seed_counter(self, total: int) -> None:
+        # Another instance may have seeded it first; its count stands
+        await self.db.update_item(
+            COUNTER_KEY,
+            "SET item_count = if_not_exists(item_count, :count)",
+            {":count": total}
         )
+        self._counter_seeded = True
 
     async def _get_total_count(self, search: Optional[str] = None) -> int:
-        query_kwargs = {"select": "COUNT"}
-        if search:
-            query_kwargs["filter_expression"] = "contains(#name, :search) OR contains(#generic_name, :search)"
-            query_kwargs["expression_attribute_names"] = {
-                "#name": "name",
-                "#generic_name": "generic_name"
-            }
-            query_kwargs["expression_attribute_values"] = {
-                ":search": search.lower()
-            }
-        response = await self.db.query(**query_kwargs)
-        return response.get("Count", 0) 
\ No newline at end of file
+        scan_kwargs = self._search_filter(search)
+        count = 0
+        start_key = None
+        while True:
+            page_kwargs = dict(scan_kwargs, select="COUNT")
+            if start_key:
+                page_kwargs["exclusive_start_key"] = start_key
+            response = await self.db.scan(**page_kwargs)
+            count += response.get("Count", 0)
+            start_key = response.get("LastEvaluatedKey")
+            if not start_key:
+                break
+        # Without a search this only runs to seed the counter item
+        return count
+
+    @staticmethod
+    def _search_filter(search: Optional[str]) -> dict:
+        """Scan filter matching ``search`` anywhere in the normalized name or generic name"""
+        if not search:
+            return {}
+        return {
+            "filter_expression": "contains(#name, :search) OR contains(#generic_name, :search)",
+            "expression_attribute_names": {
+                "#name": "name_normalized",
+                "#generic_name": "generic_name_normalized"
+            },
+            "expression_values": {":search": normalize_term(search)}
+        } 
\ No newline at end of file
@@ -0,0 +1,81 @@
+import unicodedata
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, Set
+
+if TYPE_CHECKING:
+    # Only for annotations: request models use this module, and must not pull in the DB layer
+    from app.db.dynamo import DynamoDB
+
+# Abbreviations and international names that rarely appear in the catalog
+COMMON_SYNONYMS = {
+    "asa": "aspirin",
+    "acetylsalicylic acid": "aspirin",
+    "apap": "acetaminophen",
+    "paracetamol": "acetaminophen",
+    "hctz": "hydrochlorothiazide",
+    "ntg": "nitroglycerin",
+}
+
+def normalize_term(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+class NameResolver:
+    """Maps any spelling of a medication to one canonical name.
+
+    Names are NFKC-normalized, case-folded and whitespace-collapsed, then
+    looked up in a precomputed table of brand names and single active
+    ingredients (from the catalog) and COMMON_SYNONYMS. The canonical name
+    is the normalized generic name; names the table does not know resolve
+    to their normalized form. Every lookup is one dict access.
+
+    The first mapping for a name wins: a name already used as an alias or
+    as a canonical name is never remapped, since interactions, the graph
+    and cached results are keyed by the canonical names it resolved to.
+    """
+
+    def __init__(self, synonyms: Optional[Dict[str, str]] = None):
+        self._synonyms = COMMON_SYNONYMS if synonyms is None else synonyms
+        self._canonical: Dict[str, str] = {}
+        self._targets: Set[str] = set()
+        for alias, canonical in self._synonyms.items():
+            self.add_synonym(alias, canonical)
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._canonical)
+
+    def resolve(self, name: str) -> str:
+        term = normalize_term(name)
+        return self._canonical.get(term, term)
+
+    def add_synonym(self, alias: str, canonical: str) -> None:
+        canonical = self.resolve(canonical)
+        alias = normalize_term(alias)
+        if alias == canonical or alias in self._canonical or alias in self._targets:
+            return
+        self._canonical[alias] = canonical
+        self._targets.add(canonical)
+
+    def add_medication(self, name: str, generic_name: str, active_ingredients: Iterable[str] = ()) -> None:
+        """Map a catalog entry's brand name (and sole ingredient) to its generic name"""
+        self.add_synonym(name, generic_name)
+        active_ingredients = list(active_ingredients)
+        # A combination product's ingredients are medications in their own right
+        if len(active_ingredients) == 1:
+            self.add_synonym(active_ingredients[0], generic_name)
+
+    async def load(self, db: "DynamoDB") -> None:
+        """Rebuild the table from the medications in a full table scan"""
+        fresh = NameResolver(self._synonyms)
+        start_key = None
+        while True:
+            response = await db.scan(exclusive_start_key=start_key)
+            for item in response.get("Items", []):
+                if "name" in item and "generic_name" in item:
+                    fresh.add_medication(item["name"], item["generic_name"], item.get("active_ingredients", []))
+            start_key = response.get("LastEvaluatedKey")
+            if not start_key:
+                break
+        self._canonical = fresh._canonical
+        self.loaded = True
+
+name_resolver = NameResolver()
@@ -0,0 +1,151 @@
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+from pydantic import TypeAdapter
+from app import metrics
+from app.cache import MemoryBackend, RedisBackend
+from app.config import settings
+from app.models.records import InteractionRecord
+from app.services.normalization import NameResolver, name_resolver
+
+logger = logging.getLogger(__name__)
+
+CACHE_BACKENDS = ("memory", "redis", "none")
+
+VERSION_KEY = "interactions:version"
+
+class CachedCheck(NamedTuple):
+    body: bytes
+    etag: str
+    hit: bool
+
+@dataclass(slots=True)
+class CheckBody:
+    """InteractionCheckResponse, serialized straight from records"""
+    interactions: List[InteractionRecord]
+    has_interactions: bool
+
+_check_body = TypeAdapter(CheckBody)
+
+def build_backend(name: Optional[str] = None):
+    """The backend named by ``name`` (default INTERACTION_CACHE_BACKEND), or None for ``none``"""
+    name = name or settings.INTERACTION_CACHE_BACKEND
+    if name not in CACHE_BACKENDS:
+        raise ValueError(f"Cache backend must be one of {list(CACHE_BACKENDS)}")
+    if name == "memory":
+        return MemoryBackend(maxsize=settings.INTERACTION_CACHE_SIZE)
+    if name == "redis":
+        return RedisBackend.from_url(settings.REDIS_URL)
+    return None
+
+def etag_for(body: bytes) -> str:
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+class InteractionResultCache:
+    """Caches rendered ``/interactions/check`` responses per regimen.
+
+    The key is the sorted set of canonical names, so any spelling or order
+    of the same medications hits the same entry, plus the data version.
+    ``bump_version`` moves readers to fresh keys; entries under old
+    versions are never read again and age out of the backend. A result
+    computed while a write lands is stored under the version it started
+    with, so it is not served after that write either.
+
+    Writes of interactions and medications bump the version, and so does
+    a graph refresh that picks up rows written elsewhere. The ``memory``
+    backend's version is per process, though: without the graph, writes
+    made through another instance or the bulk loader only show up once
+    cached entries expire.
+
+    Backend failures are logged and the check is answered uncached.
+    Pass ``backend_factory`` instead of ``backend`` to build the backend on
+    first use rather than when the cache is created.
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        resolver: Optional[NameResolver] = None,
+        ttl: Optional[float] = None,
+        backend_factory: Optional[Callable[[], Any]] = None
+    ):
+        self._backend_factory = backend_factory
+        if backend_factory is None:
+            self.backend = backend
+        self.resolver = resolver if resolver is not None else name_resolver
+        self.ttl = ttl if ttl is not None else settings.INTERACTION_CACHE_TTL_SECONDS
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def __getattr__(self, name: str):
+        # Only reached for a backend_factory's backend that is not built yet
+        if name != "backend" or self.__dict__.get("_backend_factory") is None:
+            raise AttributeError(name)
+        self.backend = self._backend_factory()
+        return self.backend
+
+    def key(self, medications: List[str], version: int) -> str:
+        names = sorted({self.resolver.resolve(medication) for medication in medications})
+        digest = hashlib.sha256("\x1f".join(names).encode()).hexdigest()
+        return f"interactions:check:{version}:{digest}"
+
+    async def check(
+        self,
+        medications: List[str],
+        compute: Callable[[List[str]], Awaitable[List[InteractionRecord]]]
+    ) -> CachedCheck:
+        """The rendered check response for ``medications``, from the cache or ``compute``.
+
+        ``compute`` returns records, which are written to JSON as they are:
+        no InteractionResponse is built for them.
+        """
+        key = None
+        if self.backend is not None:
+            try:
+                key = self.key(medications, await self.backend.counter(VERSION_KEY))
+                body = await self.backend.get(key)
+            except Exception:
+                logger.exception("Interaction cache read failed")
+                self.errors += 1
+                key = body = None
+            if body is not None:
+                self.hits += 1
+                return CachedCheck(body, etag_for(body), True)
+            self.misses += 1
+        interactions = await compute(medications)
+        with metrics.span("serialize"):
+            body = _check_body.dump_json(CheckBody(
+                interactions=interactions,
+                has_interactions=len(interactions) > 0
+            ))
+        if key is not None:
+            try:
+                await self.backend.set(key, body, self.ttl)
+            except Exception:
+                logger.exception("Interaction cache write failed")
+                self.errors += 1
+        return CachedCheck(body, etag_for(body), False)
+
+    async def bump_version(self) -> None:
+        """Invalidate every cached result; call after writing interactions"""
+        if self.backend is None:
+            return
+        try:
+            await self.backend.incr(VERSION_KEY)
+        except Exception:
+            logger.exception("Interaction cache version bump failed")
+            self.errors += 1
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+# Built lazily, so importing the app does not import redis
+interaction_result_cache = InteractionResultCache(backend_factory=build_backend)
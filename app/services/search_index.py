@@ -0,0 +1,175 @@
+import asyncio
+import bisect
+import logging
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from app.db.dynamo import DynamoDB
+from app.services.normalization import normalize_term
+
+logger = logging.getLogger(__name__)
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class MedicationSearchIndex:
+    """Trigram inverted index over medication ``name`` and ``generic_name``.
+
+    Queries of three or more characters match the same rows as the old
+    ``contains()`` filter: the posting lists of their trigrams are
+    intersected and candidates are checked for the full query. Shorter
+    queries match name and word prefixes only. Results are ranked exact
+    match, then name prefix, then word prefix (each alphabetically), then
+    any other substring match, shortest name first.
+
+    Writes through this instance are indexed as they happen; medications
+    created through other instances appear on the next periodic reload.
+    """
+
+    def __init__(self):
+        self._docs: Dict[str, Tuple[str, str]] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        # Sorted (term, id) pairs: whole names, and the words after the first
+        self._names: List[Tuple[str, str]] = []
+        self._words: List[Tuple[str, str]] = []
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, medication_id: str, name: str, generic_name: str) -> None:
+        if medication_id in self._docs:
+            self.remove(medication_id)
+        self._insert(medication_id, name, generic_name, keep_sorted=True)
+
+    def remove(self, medication_id: str) -> None:
+        doc = self._docs.pop(medication_id, None)
+        if doc is None:
+            return
+        for gram in trigrams(doc[0]) | trigrams(doc[1]):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(medication_id)
+                if not posting:
+                    del self._postings[gram]
+        names, words = self._doc_terms(doc)
+        for terms, removed in ((self._names, names), (self._words, words)):
+            for term in removed:
+                i = bisect.bisect_left(terms, (term, medication_id))
+                if i < len(terms) and terms[i] == (term, medication_id):
+                    del terms[i]
+
+    def search(self, query: str, offset: int = 0, limit: Optional[int] = None) -> Tuple[List[str], int]:
+        """Ranked medication IDs for ``query`` and the total number of matches"""
+        query = normalize_term(query)
+        if not query:
+            return [], 0
+        if len(query) < 3:
+            matches = {
+                medication_id
+                for terms in (self._names, self._words)
+                for _, medication_id in self._prefix_range(terms, query)
+            }
+        else:
+            matches = self._substring_matches(query)
+
+        wanted = None if limit is None else offset + limit
+        window = []
+        if matches:
+            for medication_id in self._ranked(query, matches):
+                window.append(medication_id)
+                if wanted is not None and len(window) >= wanted:
+                    break
+        return window[offset:], len(matches)
+
+    async def load(self, db: DynamoDB) -> None:
+        """Rebuild the index from a full table scan"""
+        docs, start_key = [], None
+        while True:
+            response = await db.scan(exclusive_start_key=start_key)
+            docs.extend(
+                item for item in response.get("Items", [])
+                if "id" in item and "name" in item and "generic_name" in item
+            )
+            start_key = response.get("LastEvaluatedKey")
+            if not start_key:
+                break
+        self.build(docs)
+
+    async def reload_periodically(self, db: DynamoDB, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.load(db)
+            except Exception:
+                logger.exception("Medication search index reload failed")
+
+    def build(self, items: Iterable[Dict]) -> None:
+        """Replace the index contents with ``items`` in one pass"""
+        fresh = MedicationSearchIndex()
+        for item in items:
+            fresh._insert(item["id"], item["name"], item["generic_name"], keep_sorted=False)
+        fresh._names.sort()
+        fresh._words.sort()
+        self._docs, self._postings = fresh._docs, fresh._postings
+        self._names, self._words = fresh._names, fresh._words
+        self.loaded = True
+
+    def _insert(self, medication_id: str, name: str, generic_name: str, keep_sorted: bool) -> None:
+        doc = (normalize_term(name), normalize_term(generic_name))
+        self._docs[medication_id] = doc
+        for gram in trigrams(doc[0]) | trigrams(doc[1]):
+            self._postings.setdefault(gram, set()).add(medication_id)
+        names, words = self._doc_terms(doc)
+        for terms, added in ((self._names, names), (self._words, words)):
+            for term in added:
+                if keep_sorted:
+                    bisect.insort(terms, (term, medication_id))
+                else:
+                    terms.append((term, medication_id))
+
+    def _substring_matches(self, query: str) -> Set[str]:
+        postings = []
+        for gram in trigrams(query):
+            posting = self._postings.get(gram)
+            if not posting:
+                return set()
+            postings.append(posting)
+        postings.sort(key=len)
+        candidates = postings[0].intersection(*postings[1:])
+        if len(query) == 3:
+            return candidates
+        return {
+            medication_id for medication_id in candidates
+            if query in self._docs[medication_id][0] or query in self._docs[medication_id][1]
+        }
+
+    def _ranked(self, query: str, matches: Set[str]) -> Iterator[str]:
+        """Yield matches best first, only sorting the substring tail if it is reached"""
+        seen = set()
+        for _, medication_id in chain(
+            self._prefix_range(self._names, query),
+            self._prefix_range(self._words, query)
+        ):
+            if medication_id not in seen:
+                seen.add(medication_id)
+                yield medication_id
+        if len(seen) < len(matches):
+            docs = self._docs
+            yield from sorted(
+                matches - seen,
+                key=lambda medication_id: (len(docs[medication_id][0]), docs[medication_id][0], medication_id)
+            )
+
+    @staticmethod
+    def _prefix_range(terms: List[Tuple[str, str]], prefix: str) -> Iterator[Tuple[str, str]]:
+        lo = bisect.bisect_left(terms, (prefix,))
+        hi = bisect.bisect_left(terms, (prefix + "\U0010ffff",), lo)
+        return (terms[i] for i in range(lo, hi))
+
+    @staticmethod
+    def _doc_terms(doc: Tuple[str, str]) -> Tuple[Set[str], Set[str]]:
+        names = {doc[0], doc[1]}
+        words = {word for text in doc for word in text.split()[1:]}
+        return names, words
+
+medication_search_index = MedicationSearchIndex()
@@ -0,0 +1,103 @@
+"""Per-request auth overhead: local JWKS verification vs a Cognito round trip.
+
+Signs access tokens with a throwaway RSA key served as a local JWKS
+fixture, then times ``CognitoAuth.validate_token`` with the claims cache
+cleared before every call (full verification) and left warm (replayed
+token). The remote line is the old GetUser path modelled as one network
+round trip of ``--rtt-ms``.
+
+    python benchmarks/bench_auth.py --iterations 5000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+from app.auth.cognito import CognitoAuth
+
+
+def local_jwks_fixture():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    public_jwk = jwk.construct(public_pem, "RS256").to_dict()
+    public_jwk.update({"kid": "bench", "use": "sig", "alg": "RS256"})
+    return private_pem, {"keys": [public_jwk]}
+
+
+def summarize(label, timings):
+    timings = sorted(timings)
+    print(
+        f"{label:<14} p50 {statistics.median(timings):>9.1f} us"
+        f"   p99 {timings[int(len(timings) * 0.99)]:>9.1f} us"
+    )
+
+
+async def run(iterations, rtt):
+    private_pem, jwks = local_jwks_fixture()
+    auth = CognitoAuth()
+    auth.client_id = "bench-client"
+    auth._download_jwks = lambda: jwks
+    token = jwt.encode(
+        {
+            "sub": "bench-user",
+            "iss": auth.issuer,
+            "client_id": auth.client_id,
+            "token_use": "access",
+            "exp": int(time.time()) + 3600,
+        },
+        private_pem,
+        algorithm="RS256",
+        headers={"kid": "bench"},
+    )
+    await auth.validate_token(token)  # first call downloads the JWKS
+
+    local = []
+    for _ in range(iterations):
+        auth.token_cache.clear()
+        start = time.perf_counter()
+        await auth.validate_token(token)
+        local.append((time.perf_counter() - start) * 1e6)
+
+    cached = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await auth.validate_token(token)
+        cached.append((time.perf_counter() - start) * 1e6)
+
+    remote = []
+    for _ in range(min(iterations, 50)):
+        start = time.perf_counter()
+        await asyncio.sleep(rtt)
+        remote.append((time.perf_counter() - start) * 1e6)
+
+    summarize("local JWKS", local)
+    summarize("cached claims", cached)
+    summarize("remote GetUser", remote)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--rtt-ms", type=float, default=20.0)
+    args = parser.parse_args()
+    asyncio.run(run(args.iterations, args.rtt_ms / 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Round trips and latency of check_interactions by regimen size and lookup mode.
+
+Runs against an in-process stand-in that charges a fixed latency per
+DynamoDB call, so the numbers isolate the cost of the access pattern.
+``parallel`` makes as many round trips as ``query`` but runs
+INTERACTION_LOOKUP_CONCURRENCY of them at a time.
+The second table compares checking ``--regimens`` overlapping regimens
+one request at a time with a single ``check_interactions_batch`` call:
+
+    python benchmarks/bench_check_interactions.py --latency-ms 5
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.dynamo import BATCH_GET_CHUNK_SIZE
+from app.services.interactions import InteractionService
+
+
+class LatencyDB:
+    """Stand-in for app.db.dynamo.db that sleeps for every round trip"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.round_trips = 0
+
+    async def query(self, *args, **kwargs):
+        self.round_trips += 1
+        await asyncio.sleep(self.latency)
+        return {"Items": []}
+
+    async def batch_get_item(self, keys):
+        for _ in range(0, len(keys), BATCH_GET_CHUNK_SIZE):
+            self.round_trips += 1
+            await asyncio.sleep(self.latency)
+        return []
+
+
+async def run(sizes, latency, repeat):
+    print(f"{'drugs':>5} {'pairs':>6} {'mode':>8} {'round trips':>12} {'ms/request':>11}")
+    for size in sizes:
+        medications = [f"drug-{i:03d}" for i in range(size)]
+        pairs = size * (size - 1) // 2
+        for mode in ("query", "batch", "parallel"):
+            stand_in = LatencyDB(latency)
+            service = InteractionService(lookup_mode=mode)
+            with patch("app.services.interactions.db", stand_in):
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    await service.check_interactions(medications)
+                elapsed = (time.perf_counter() - start) / repeat
+            print(
+                f"{size:>5} {pairs:>6} {mode:>8} "
+                f"{stand_in.round_trips // repeat:>12} {elapsed * 1000:>11.1f}"
+            )
+
+
+async def run_batch(regimens, regimen_size, formulary, latency):
+    rng = random.Random(0)
+    drugs = [f"drug-{i:03d}" for i in range(formulary)]
+    batch = [rng.sample(drugs, regimen_size) for _ in range(regimens)]
+    service = InteractionService(lookup_mode="batch")
+    print(f"\n{regimens} regimens of {regimen_size} from {formulary} drugs")
+    print(f"{'strategy':>12} {'pairs':>7} {'round trips':>12} {'ms total':>9}")
+
+    stand_in = LatencyDB(latency)
+    with patch("app.services.interactions.db", stand_in):
+        start = time.perf_counter()
+        for medications in batch:
+            await service.check_interactions(medications)
+        elapsed = time.perf_counter() - start
+    pairs = regimens * regimen_size * (regimen_size - 1) // 2
+    print(f"{'per regimen':>12} {pairs:>7} {stand_in.round_trips:>12} {elapsed * 1000:>9.1f}")
+
+    stand_in = LatencyDB(latency)
+    with patch("app.services.interactions.db", stand_in):
+        start = time.perf_counter()
+        _, unique_pairs = await service.check_interactions_batch(batch)
+        elapsed = time.perf_counter() - start
+    print(f"{'batch':>12} {unique_pairs:>7} {stand_in.round_trips:>12} {elapsed * 1000:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2, 5, 10, 15, 20, 30])
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--regimens", type=int, default=500)
+    parser.add_argument("--regimen-size", type=int, default=5)
+    parser.add_argument("--formulary", type=int, default=60)
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes, args.latency_ms / 1000, args.repeat))
+    asyncio.run(run_batch(args.regimens, args.regimen_size, args.formulary, args.latency_ms / 1000))
+
+
+if __name__ == "__main__":
+    main()
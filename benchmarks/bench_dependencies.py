@@ -0,0 +1,75 @@
+"""Per-request cost of resolving the medication service dependency.
+
+Serves two routes through FastAPI's dependency injection: one builds a
+``MedicationService(DynamoDB())`` per request, as ``get_db`` used to (the
+boto3 resource is touched so it is built, as the old constructor did);
+the other returns the application-scoped instance from ``app.state``.
+Neither route calls DynamoDB, so the difference is pure setup cost.
+
+    python benchmarks/bench_dependencies.py --requests 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1.dependencies import get_medication_service
+from app.config import settings
+from app.db.dynamo import DynamoDB
+from app.services.medications import MedicationService
+
+
+def per_request_service() -> MedicationService:
+    db = DynamoDB(settings.MEDICATIONS_TABLE)
+    db.table
+    return MedicationService(db)
+
+
+def build_app():
+    app = FastAPI()
+    app.state.db = DynamoDB()
+    app.state.db.table
+    app.state.medication_service = MedicationService(app.state.db.for_table(settings.MEDICATIONS_TABLE))
+
+    @app.get("/per-request")
+    async def per_request(service: MedicationService = Depends(per_request_service)):
+        return {}
+
+    @app.get("/app-scoped")
+    async def app_scoped(service: MedicationService = Depends(get_medication_service)):
+        return {}
+
+    return app
+
+
+def measure(client, path, requests):
+    client.get(path)
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        client.get(path)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    print(
+        f"{path:<13} p50 {statistics.median(timings):>8.2f} ms"
+        f"   p99 {timings[int(len(timings) * 0.99)]:>8.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    client = TestClient(build_app())
+    measure(client, "/per-request", args.requests)
+    measure(client, "/app-scoped", args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Requests/sec of the DynamoDB client as the number of in-flight calls grows.
+
+Starts a local moto server (requires ``moto[server]``), creates the
+interactions table and drives ``DynamoDB.get_item`` at increasing
+concurrency:
+
+    python benchmarks/bench_dynamo_concurrency.py --requests 400
+
+The in-process server shares the GIL with the client, so for the scaling
+curve run ``moto_server -p 5123`` separately and pass ``--external``.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+PORT = 5123
+os.environ.setdefault("ENVIRONMENT", "test")
+os.environ.setdefault("DYNAMODB_ENDPOINT", f"http://127.0.0.1:{PORT}")
+os.environ.setdefault("DYNAMODB_TABLE", "bench-interactions")
+os.environ.setdefault("AWS_REGION", "us-east-1")
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import boto3
+from moto.server import ThreadedMotoServer
+
+from app.config import settings
+from app.db.dynamo import DynamoDB
+
+
+def create_table():
+    client = boto3.client(
+        "dynamodb",
+        region_name=settings.AWS_REGION,
+        endpoint_url=settings.DYNAMODB_ENDPOINT,
+        aws_access_key_id="dummy",
+        aws_secret_access_key="dummy",
+    )
+    client.create_table(
+        TableName=settings.DYNAMODB_TABLE,
+        KeySchema=[
+            {"AttributeName": "medication1", "KeyType": "HASH"},
+            {"AttributeName": "medication2", "KeyType": "RANGE"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "medication1", "AttributeType": "S"},
+            {"AttributeName": "medication2", "AttributeType": "S"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+
+
+async def drive(db: DynamoDB, total: int, in_flight: int) -> float:
+    semaphore = asyncio.Semaphore(in_flight)
+
+    async def one(i: int):
+        async with semaphore:
+            await db.get_item({"medication1": f"drug-{i % 50}", "medication2": "warfarin"})
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return total / (time.perf_counter() - start)
+
+
+async def run(levels, total):
+    db = DynamoDB()
+    for i in range(50):
+        await db.put_item({
+            "medication1": f"drug-{i}",
+            "medication2": "warfarin",
+            "severity": "high",
+            "description": "benchmark row",
+        })
+    await drive(db, 50, 8)  # warm the connection pool
+    print(f"{'in-flight':>9} {'req/s':>9}")
+    for in_flight in levels:
+        print(f"{in_flight:>9} {await drive(db, total, in_flight):>9.0f}")
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--external", action="store_true", help="use a moto server already listening on DYNAMODB_ENDPOINT")
+    args = parser.parse_args()
+
+    server = None
+    if not args.external:
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        server = ThreadedMotoServer(ip_address="127.0.0.1", port=PORT)
+        server.start()
+    try:
+        create_table()
+        asyncio.run(run(args.levels, args.requests))
+    finally:
+        if server:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""Load test of the API in-process against moto DynamoDB and a stub JWKS.
+
+Seeds moto-backed interactions and medications tables, signs an access
+token with a throwaway RSA key served as the user pool's JWKS, runs the
+app's lifespan and drives it through httpx's ASGI transport with
+``--concurrency`` requests in flight:
+
+- ``check-N``: ``POST /interactions/check`` with N random medications,
+  for each N in ``--regimen-sizes``
+- ``list`` / ``search``: ``GET /medications``, a page of the catalog and a
+  name search
+- ``get``: ``GET /medications/{id}``
+
+Reports p50/p95/p99 latency, requests per second and DynamoDB calls per
+request for each scenario. The interaction result cache is off unless
+``--result-cache`` is given, so repeated regimens still reach DynamoDB.
+
+    python benchmarks/bench_load.py --save-baseline baseline.json
+    python benchmarks/bench_load.py --baseline baseline.json --threshold 0.2
+
+With ``--baseline`` the run exits non-zero when any scenario's p50 or
+p95 is more than ``--threshold`` slower, its RPS that much lower, or it
+makes more DynamoDB calls per request or fails more requests than the
+baseline did. Compare
+baselines recorded on the same machine with the same options; moto runs
+in this process, so absolute numbers are not production latencies.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+# moto intercepts AWS endpoints, so the app must not point at a local one
+os.environ["ENVIRONMENT"] = "benchmark"
+os.environ.setdefault("AWS_REGION", "us-east-1")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+os.environ.setdefault("DYNAMODB_TABLE", "bench-interactions")
+os.environ.setdefault("MEDICATIONS_TABLE", "bench-medications")
+os.environ.setdefault("COGNITO_USER_POOL_ID", "us-east-1_bench")
+os.environ.setdefault("COGNITO_CLIENT_ID", "bench-client")
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import boto3
+import httpx
+from jose import jwt
+from moto import mock_aws
+
+from app import metrics
+from app.auth.cognito import auth
+from app.config import settings
+from app.db.dynamo import db
+from app.main import app, lifespan
+from app.models.schemas import InteractionCreate, MedicationCreate
+from app.services.interactions import build_interaction_item
+from app.services.result_cache import interaction_result_cache
+from benchmarks.bench_auth import local_jwks_fixture
+
+SEVERITIES = ("low", "medium", "high")
+# Compared against the baseline; higher is worse for all but rps
+COMPARED = ("p50_ms", "p95_ms", "rps", "dynamodb_calls", "errors")
+# Options that change what is measured; a baseline only compares like with like
+WORKLOAD_OPTIONS = ("regimen_sizes", "requests", "concurrency", "formulary", "interactions", "seed", "result_cache")
+
+
+def create_tables():
+    client = boto3.client("dynamodb", region_name=settings.AWS_REGION)
+    client.create_table(
+        TableName=settings.DYNAMODB_TABLE,
+        KeySchema=[
+            {"AttributeName": "medication1", "KeyType": "HASH"},
+            {"AttributeName": "medication2", "KeyType": "RANGE"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "medication1", "AttributeType": "S"},
+            {"AttributeName": "medication2", "AttributeType": "S"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    client.create_table(
+        TableName=settings.MEDICATIONS_TABLE,
+        KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+        AttributeDefinitions=[
+            {"AttributeName": "id", "AttributeType": "S"},
+            {"AttributeName": "name_normalized", "AttributeType": "S"},
+        ],
+        GlobalSecondaryIndexes=[{
+            "IndexName": settings.MEDICATIONS_NAME_INDEX,
+            "KeySchema": [{"AttributeName": "name_normalized", "KeyType": "HASH"}],
+            "Projection": {"ProjectionType": "ALL"},
+        }],
+        BillingMode="PAY_PER_REQUEST",
+    )
+
+
+async def seed(rng, formulary, interactions):
+    """Write the catalog and random interactions between its medications; returns the names and ids"""
+    names = [f"Medication {i:04d}" for i in range(formulary)]
+    ids = []
+    for i, name in enumerate(names):
+        medication = await app.state.medication_service.create_medication(MedicationCreate(
+            name=name,
+            generic_name=f"generic {i:04d}",
+            description="Used to treat a condition.",
+            dosage_forms=["tablet"],
+            active_ingredients=[f"ingredient {i:04d}"],
+            warnings=["Do not exceed the stated dose"],
+            manufacturer="Manufacturer Inc.",
+            category="Category",
+        ))
+        ids.append(medication.id)
+    pairs = set()
+    while len(pairs) < min(interactions, formulary * (formulary - 1) // 2):
+        pairs.add(tuple(sorted(rng.sample(names, 2))))
+    await db.batch_write_item([
+        build_interaction_item(InteractionCreate(
+            medication1=med1,
+            medication2=med2,
+            severity=rng.choice(SEVERITIES),
+            description=f"Interaction between {med1} and {med2}",
+        ))
+        for med1, med2 in sorted(pairs)
+    ])
+    return names, ids
+
+
+def sign_token():
+    private_pem, jwks = local_jwks_fixture()
+    auth._download_jwks = lambda: jwks
+    return jwt.encode(
+        {
+            "sub": "bench-user",
+            "iss": auth.issuer,
+            "client_id": auth.client_id,
+            "token_use": "access",
+            "exp": int(time.time()) + 3600,
+        },
+        private_pem,
+        algorithm="RS256",
+        headers={"kid": "bench"},
+    )
+
+
+def scenarios(rng, names, ids, regimen_sizes):
+    """Scenario name -> function returning the next request's (method, url, json)"""
+    built = {}
+    for size in regimen_sizes:
+        built[f"check-{size}"] = lambda size=size: (
+            "POST", "/api/v1/interactions/check", {"medications": rng.sample(names, size)}
+        )
+    built["list"] = lambda: ("GET", "/api/v1/medications?limit=20", None)
+    built["search"] = lambda: ("GET", f"/api/v1/medications?limit=20&search={rng.randrange(100):02d}", None)
+    built["get"] = lambda: ("GET", f"/api/v1/medications/{rng.choice(ids)}", None)
+    return built
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of sorted values"""
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+async def drive(client, next_request, requests, concurrency):
+    latencies = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            method, url, body = next_request()
+            start = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    calls_before = metrics.DYNAMODB_CALLS.total()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "rps": requests / elapsed,
+        "dynamodb_calls": (metrics.DYNAMODB_CALLS.total() - calls_before) / requests,
+        "errors": errors,
+    }
+
+
+def regressions(results, baseline, threshold):
+    """Descriptions of every compared measure that got worse than the baseline allows"""
+    found = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for measure in COMPARED:
+            old, new = previous[measure], result[measure]
+            if measure == "rps":
+                worse = new < old * (1 - threshold)
+            elif measure in ("dynamodb_calls", "errors"):
+                worse = new > old
+            else:
+                worse = new > old * (1 + threshold)
+            if worse:
+                found.append(f"{name}: {measure} {old:.2f} -> {new:.2f}")
+    return found
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    create_tables()
+    async with lifespan(app):
+        if not args.result_cache:
+            interaction_result_cache.backend = None
+        names, ids = await seed(rng, args.formulary, args.interactions)
+        headers = {"Authorization": f"Bearer {sign_token()}"}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+            results = {}
+            print(
+                f"{'scenario':<10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+                f" {'rps':>8} {'ddb/req':>8} {'errors':>7}"
+            )
+            for name, next_request in scenarios(rng, names, ids, args.regimen_sizes).items():
+                await drive(client, next_request, args.warmup, args.concurrency)
+                result = results[name] = await drive(client, next_request, args.requests, args.concurrency)
+                print(
+                    f"{name:<10} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f}"
+                    f" {result['rps']:>8.1f} {result['dynamodb_calls']:>8.1f} {result['errors']:>7}"
+                )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--regimen-sizes", type=int, nargs="+", default=[2, 5, 10, 30])
+    parser.add_argument("--requests", type=int, default=100, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--formulary", type=int, default=200, help="medications seeded")
+    parser.add_argument("--interactions", type=int, default=2000, help="interactions seeded")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--result-cache", action="store_true", help="keep the interaction result cache on")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the results to PATH as JSON")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against results saved with --save-baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown, as a fraction")
+    args = parser.parse_args()
+
+    with mock_aws():
+        results = asyncio.run(run(args))
+
+    options = {option: getattr(args, option) for option in WORKLOAD_OPTIONS}
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as baseline_file:
+            json.dump({"options": options, "scenarios": results}, baseline_file, indent=2, sort_keys=True)
+        print(f"\nSaved baseline to {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline["options"] != options:
+            print(f"\nWarning: {args.baseline} was recorded with {baseline['options']}")
+        found = regressions(results, baseline["scenarios"], args.threshold)
+        if found:
+            print(f"\nRegressions beyond {args.threshold:.0%}:")
+            for regression in found:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Typeahead latency of the medication search index over a synthetic catalog.
+
+    python benchmarks/bench_medication_search.py --catalog 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.search_index import MedicationSearchIndex
+
+SYLLABLES = ["ab", "cor", "dex", "fen", "gli", "lo", "mab", "met", "nol", "pra",
+             "pril", "sar", "tan", "tin", "vas", "xa", "zol", "ine", "one", "ide"]
+
+
+def synthetic_name(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--catalog", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=2_000)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    index = MedicationSearchIndex()
+    start = time.perf_counter()
+    catalog = [
+        {"id": str(i), "name": synthetic_name(rng), "generic_name": synthetic_name(rng)}
+        for i in range(args.catalog)
+    ]
+    names = [item["name"] for item in catalog]
+    index.build(catalog)
+    print(f"indexed {args.catalog} medications in {time.perf_counter() - start:.2f}s")
+
+    # Typeahead: every prefix a user types on the way to a real name
+    queries = []
+    while len(queries) < args.queries:
+        name = rng.choice(names).lower()
+        queries.extend(name[:n] for n in range(1, len(name) + 1))
+
+    timings = []
+    for query in queries[:args.queries]:
+        start = time.perf_counter()
+        index.search(query, limit=args.limit)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    print(f"queries: {len(timings)}")
+    print(f"p50 {statistics.median(timings):.3f} ms")
+    print(f"p95 {timings[int(len(timings) * 0.95)]:.3f} ms")
+    print(f"p99 {timings[int(len(timings) * 0.99)]:.3f} ms")
+    print(f"max {timings[-1]:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
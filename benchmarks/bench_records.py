@@ -0,0 +1,172 @@
+"""Memory held by InteractionRecords and the end-to-end cost of serving them.
+
+Builds ``--interactions`` interactions from DynamoDB-shaped items once as
+``InteractionResponse(**item)``, the old hot path, once as
+``InteractionRecord.from_item``, and once as records that have each been
+served, and reports the memory they still hold once the items are gone
+(traced with tracemalloc, so build times are inflated). Then times a
+check of a regimen with ``--response-size`` interactions end to end, from
+the medication names to the response body the route sends: through the
+graph, whose records are served again on every request, and through the
+query and batch lookups against an in-process table with no latency. The
+last row validates the same items straight into models, the way lookups
+did before records, and serializes them the same way.
+
+    python benchmarks/bench_records.py --interactions 100000
+"""
+import argparse
+import asyncio
+import gc
+import itertools
+import os
+import random
+import sys
+import time
+import tracemalloc
+from unittest.mock import patch
+from pydantic_core import to_json
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.records import InteractionRecord
+from app.models.schemas import InteractionCheckResponse, InteractionResponse
+from app.services.ingredients import IngredientIndex
+from app.services.interaction_graph import InteractionGraph
+from app.services.interactions import InteractionService
+from app.services.normalization import NameResolver
+from app.services.result_cache import InteractionResultCache
+
+
+def make_items(count, formulary):
+    rng = random.Random(0)
+    drugs = [f"drug-{i:04d}" for i in range(formulary)]
+    return [make_item(i, *sorted(rng.sample(drugs, 2)), rng) for i in range(count)]
+
+
+def make_item(i, med1, med2, rng):
+    return {
+        # Fresh strings per item, as boto3 deserializes them
+        "id": f"{i:08d}-0000-0000-0000-000000000000",
+        "medication1": "".join(med1),
+        "medication2": "".join(med2),
+        "severity": rng.choice(["low", "medium", "high"]),
+        "description": f"Interaction between {med1} and {med2}",
+        "created_at": "2024-01-01T00:00:00+00:00",
+        "updated_at": "2024-01-01T00:00:00+00:00"
+    }
+
+
+def served(item):
+    record = InteractionRecord.from_item(item)
+    record.to_response()
+    return record
+
+
+def make_regimen(size):
+    """A regimen and the items of its first ``size`` pairs, which all interact"""
+    rng = random.Random(0)
+    count = 2
+    while count * (count - 1) // 2 < size:
+        count += 1
+    regimen = [f"drug-{i:04d}" for i in range(count)]
+    pairs = list(itertools.combinations(regimen, 2))[:size]
+    return regimen, [make_item(i, med1, med2, rng) for i, (med1, med2) in enumerate(pairs)]
+
+
+class ItemsDB:
+    """Stand-in for app.db.dynamo.db that answers from a dict with no latency"""
+
+    def __init__(self, items):
+        self.items = {(item["medication1"], item["medication2"]): item for item in items}
+
+    async def query(self, key_condition, values):
+        item = self.items.get((values[":med1"], values[":med2"]))
+        return {"Items": [dict(item)] if item else []}
+
+    async def batch_get_item(self, keys):
+        pairs = [(key["medication1"], key["medication2"]) for key in keys]
+        return [dict(self.items[pair]) for pair in pairs if pair in self.items]
+
+
+def measure_memory(build, count, formulary):
+    gc.collect()
+    tracemalloc.start()
+    items = make_items(count, formulary)
+    start = time.perf_counter()
+    built = [build(item) for item in items]
+    elapsed = time.perf_counter() - start
+    del items
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del built
+    return size, elapsed
+
+
+async def time_response(respond, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        await respond()
+    return (time.perf_counter() - start) / repeat
+
+
+async def run_responses(size, repeat):
+    regimen, items = make_regimen(size)
+    resolver = NameResolver(synonyms={})
+    # Uncached, so every check builds its body
+    disabled = InteractionResultCache(None, resolver=resolver)
+    graph = InteractionGraph(resolver=resolver, result_cache=disabled)
+    for item in items:
+        graph.add(InteractionRecord.from_item(item))
+    graph.loaded = True
+
+    def check(mode, graph=None):
+        """The check route's work: look up the records, write the body"""
+        service = InteractionService(
+            lookup_mode=mode,
+            graph=graph if graph is not None else InteractionGraph(resolver=resolver, result_cache=disabled),
+            resolver=resolver,
+            ingredients=IngredientIndex(resolver),
+            result_cache=disabled
+        )
+        return lambda: disabled.check(regimen, service.check_records)
+
+    async def items_validated():
+        interactions = [InteractionResponse(**item) for item in items]
+        return to_json(InteractionCheckResponse(
+            interactions=interactions,
+            has_interactions=len(interactions) > 0
+        ))
+
+    print(f"\n{len(items)}-interaction check, names to response body:")
+    with patch("app.services.interactions.db", ItemsDB(items)):
+        for label, respond in (
+            ("graph, served records", check("query", graph)),
+            ("query lookup", check("query")),
+            ("batch lookup", check("batch")),
+            ("items, validated", items_validated),
+        ):
+            print(f"{label:<26} {await time_response(respond, repeat) * 1e6:>9.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--interactions", type=int, default=100_000)
+    parser.add_argument("--formulary", type=int, default=2000)
+    parser.add_argument("--response-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'':<26} {'MB held':>9} {'bytes/item':>11} {'build ms':>9}")
+    for label, build in (
+        ("InteractionResponse", lambda item: InteractionResponse(**item)),
+        ("InteractionRecord", InteractionRecord.from_item),
+        ("InteractionRecord, served", served),
+    ):
+        size, elapsed = measure_memory(build, args.interactions, args.formulary)
+        print(f"{label:<26} {size / 1e6:>9.1f} {size / args.interactions:>11.0f} {elapsed * 1000:>9.1f}")
+
+    asyncio.run(run_responses(args.response_size, args.repeat))
+
+if __name__ == "__main__":
+    main()
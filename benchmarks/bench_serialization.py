@@ -0,0 +1,147 @@
+"""Response serialization cost: response_model vs ModelResponse.
+
+Serves the same ``MedicationListResponse`` page two ways: returned as a
+model, so FastAPI re-validates it against ``response_model`` before
+serializing it, and wrapped in ``ModelResponse``, which pydantic-core
+writes to JSON in one pass. Each
+medication carries several warnings, side effects and dosage forms. A
+third column serves the page trimmed to ``fields=name,generic_name``, as
+a typeahead would request it, with body sizes for the full and trimmed
+pages.
+Requests are driven straight into the ASGI app, so the times are the
+app's own, without a client or server around it.
+
+    python benchmarks/bench_serialization.py --sizes 50 500
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+
+from app.api.v1.responses import ModelResponse
+from app.models.schemas import (
+    MedicationFields,
+    MedicationFieldsListResponse,
+    MedicationListResponse,
+    MedicationResponse
+)
+
+TYPEAHEAD_FIELDS = ["id", "name", "generic_name"]
+
+
+def make_page(size):
+    items = [
+        MedicationResponse(
+            id=f"{i:08d}-0000-0000-0000-000000000000",
+            name=f"Medication {i}",
+            generic_name=f"generic-{i}",
+            description="Used to treat a condition. " * 4,
+            dosage_forms=["tablet", "capsule", "oral solution"],
+            active_ingredients=[f"ingredient-{i}", f"ingredient-{i + 1}"],
+            warnings=[f"Warning {j} for medication {i}" for j in range(5)],
+            side_effects=[f"Side effect {j}" for j in range(8)],
+            manufacturer="Manufacturer Inc.",
+            category="Category",
+            created_at="2024-01-01T00:00:00+00:00",
+            updated_at="2024-01-01T00:00:00+00:00"
+        )
+        for i in range(size)
+    ]
+    return MedicationListResponse(items=items, total=size, page=1, limit=size, has_more=False)
+
+
+def trim(page):
+    return MedicationFieldsListResponse(
+        items=[MedicationFields(**item.model_dump(include=set(TYPEAHEAD_FIELDS))) for item in page.items],
+        total=page.total, page=page.page, limit=page.limit, has_more=page.has_more,
+        next_cursor=page.next_cursor, approximate_total=page.approximate_total
+    )
+
+
+def build_app(page):
+    app = FastAPI()
+    trimmed = trim(page)
+
+    @app.get("/response-model", response_model=MedicationListResponse)
+    async def response_model():
+        return page
+
+    @app.get("/model-response", response_model=MedicationListResponse)
+    async def model_response():
+        return ModelResponse(page)
+
+    @app.get("/fields", response_model=MedicationListResponse)
+    async def fields():
+        return ModelResponse(trimmed, exclude_unset=True)
+
+    return app
+
+
+async def get(app, path, sizes=None):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "headers": [],
+        "client": ("bench", 0), "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if sizes is not None and message["type"] == "http.response.body":
+            sizes.append(len(message.get("body", b"")))
+
+    await app(scope, receive, send)
+
+
+async def measure(app, path, requests):
+    await get(app, path)
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        await get(app, path)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+async def body_size(app, path):
+    sizes = []
+    await get(app, path, sizes)
+    return sum(sizes)
+
+
+async def run(sizes, requests):
+    print(
+        f"{'items':>6} {'response_model ms':>18} {'ModelResponse ms':>17} {'fields ms':>10}"
+        f" {'full KB':>8} {'fields KB':>10}"
+    )
+    for size in sizes:
+        app = build_app(make_page(size))
+        default = await measure(app, "/response-model", requests)
+        fast = await measure(app, "/model-response", requests)
+        trimmed = await measure(app, "/fields", requests)
+        full_bytes = await body_size(app, "/model-response")
+        trimmed_bytes = await body_size(app, "/fields")
+        print(
+            f"{size:>6} {default:>18.3f} {fast:>17.3f} {trimmed:>10.3f}"
+            f" {full_bytes / 1024:>8.1f} {trimmed_bytes / 1024:>10.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes, args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Time to first byte and peak memory of buffered vs NDJSON batch checks.
+
+Posts ``--regimens`` regimens to ``/api/v1/interactions/check/batch``
+straight into the ASGI app, once as a JSON document and once with
+``Accept: application/x-ndjson``. Memory is measured on a separate run
+because tracing slows allocation-heavy code. DynamoDB is replaced by a stand-in that
+charges ``--latency-ms`` per BatchGetItem and finds an interaction for
+every pair, so responses are large.
+
+    python benchmarks/bench_streaming.py --regimens 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.auth.cognito import auth
+from app.db.dynamo import BATCH_GET_CHUNK_SIZE
+from app.main import app
+
+
+class LatencyDB:
+    """Stand-in for app.db.dynamo.db where every pair interacts"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def batch_get_item(self, keys):
+        await asyncio.sleep(self.latency * -(-len(keys) // BATCH_GET_CHUNK_SIZE))
+        return [
+            dict(key, id=f"{key['medication1']}:{key['medication2']}", severity="high",
+                 description="Interaction description " * 4,
+                 created_at="2024-01-01T00:00:00Z", updated_at="2024-01-01T00:00:00Z")
+            for key in keys
+        ]
+
+
+async def measure(body, headers, trace_memory):
+    """Drive the ASGI app directly so the arrival of each body chunk is seen"""
+    payload = json.dumps(body).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": "/api/v1/interactions/check/batch",
+        "raw_path": b"/api/v1/interactions/check/batch", "query_string": b"", "root_path": "",
+        "headers": [(b"content-type", b"application/json")]
+        + [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+        "client": ("bench", 0), "server": ("bench", 80),
+    }
+    received = False
+    first_byte = None
+    size = 0
+
+    async def receive():
+        nonlocal received
+        if received:
+            await asyncio.Event().wait()
+        received = True
+        return {"type": "http.request", "body": payload, "more_body": False}
+
+    async def send(message):
+        nonlocal first_byte, size
+        if message["type"] == "http.response.body" and message.get("body"):
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+            size += len(message["body"])
+
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    total = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+    tracemalloc.stop()
+    return first_byte, total, peak, size
+
+
+async def run(regimens, regimen_size, formulary, latency):
+    rng = random.Random(0)
+    drugs = [f"drug-{i:04d}" for i in range(formulary)]
+    body = {"regimens": [{"medications": rng.sample(drugs, regimen_size)} for _ in range(regimens)]}
+    app.dependency_overrides[auth.get_current_user] = lambda: {"sub": "bench"}
+    print(f"{'response':>9} {'TTFB ms':>9} {'total ms':>9} {'peak MB':>8} {'body MB':>8}")
+    with patch("app.services.interactions.db", LatencyDB(latency)):
+        for label, headers in (("json", {}), ("ndjson", {"Accept": "application/x-ndjson"})):
+            first_byte, total, _, size = await measure(body, headers, trace_memory=False)
+            _, _, peak, _ = await measure(body, headers, trace_memory=True)
+            print(
+                f"{label:>9} {first_byte * 1000:>9.1f} {total * 1000:>9.1f} "
+                f"{peak / 1e6:>8.1f} {size / 1e6:>8.1f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--regimens", type=int, default=1000)
+    parser.add_argument("--regimen-size", type=int, default=8)
+    parser.add_argument("--formulary", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    args = parser.parse_args()
+    asyncio.run(run(args.regimens, args.regimen_size, args.formulary, args.latency_ms / 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -36,6 +36,24 @@ class MatrixMedsStack(Stack):
             removal_policy=RemovalPolicy.DESTROY
         )
 
+        # Create Medications Table, keyed on id, with exact-name lookups on a GSI
+        medications_table = dynamodb.Table(self, "MatrixMedsMedicationsTable",
+            table_name="matrixmeds-medications",
+            partition_key=dynamodb.Attribute(
+                name="id",
+                type=dynamodb.AttributeType.STRING
+            ),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.DESTROY
+        )
+        medications_table.add_global_secondary_index(
+            index_name="name-index",
+            partition_key=dynamodb.Attribute(
+                name="name_normalized",
+                type=dynamodb.AttributeType.STRING
+            )
+        )
+
         # Create Cognito User Pool
         user_pool = cognito.UserPool(self, "MatrixMedsUserPool",
             user_pool_name="matrixmeds-users",
@@ -0,0 +1,56 @@
+"""Bulk load interactions from a CSV or JSONL file.
+
+CSV input needs a header row with medication1, medication2, severity and
+description columns; JSONL input has one object with those keys per line.
+With MEDICATION_SYNONYMS_ENABLED, names are resolved against the catalog
+first, as the server does, so rows are keyed by the names it looks up.
+
+    python scripts/bulk_load_interactions.py interactions.csv --workers 8
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.db.dynamo import medications_db
+from app.services.bulk_ingest import INPUT_FORMATS, bulk_ingest
+from app.services.normalization import name_resolver
+
+async def load(source, input_format: str, workers: int):
+    if settings.MEDICATION_SYNONYMS_ENABLED:
+        await name_resolver.load(medications_db)
+    return await bulk_ingest(source, input_format, workers=workers)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=INPUT_FORMATS, help="defaults to the file extension")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--show-rejected", type=int, default=20, help="rejected rows to print")
+    args = parser.parse_args()
+
+    input_format = args.format or os.path.splitext(args.path)[1].lstrip(".").lower()
+    if input_format not in INPUT_FORMATS:
+        parser.error(f"cannot tell the format of {args.path}; pass --format")
+
+    with open(args.path, newline="", encoding="utf-8") as source:
+        report = asyncio.run(load(source, input_format, args.workers))
+
+    print(f"Written:  {report.written} rows in {report.elapsed:.1f}s ({report.rows_per_second:.0f} rows/sec)")
+    print(f"Rejected: {len(report.rejected)} rows")
+    for line_number, reason in report.rejected[:args.show_rejected]:
+        print(f"  line {line_number}: {reason}")
+    if report.written and settings.INTERACTION_CACHE_BACKEND == "memory":
+        # This process's cache version is not the servers'
+        print(
+            "Note: servers caching check results in memory pick these rows up on their next graph"
+            f" refresh, or once cached results expire (up to {settings.INTERACTION_CACHE_TTL_SECONDS:g}s)"
+        )
+    sys.exit(1 if report.rejected else 0)
+
+if __name__ == "__main__":
+    main()
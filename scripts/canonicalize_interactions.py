@@ -0,0 +1,71 @@
+"""Re-key interactions stored under non-canonical medication names.
+
+Rows written before name resolution was introduced are keyed by whatever
+spelling the client sent ("Aspirin", "ASA"), so lookups by canonical name
+miss them. This rewrites each such row under its canonical pair and
+deletes the old key. When several rows collapse onto one pair, the most
+recently updated wins.
+
+    python scripts/canonicalize_interactions.py --dry-run
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.db.dynamo import db, medications_db
+from app.services.normalization import name_resolver
+
+async def canonicalize(dry_run: bool):
+    if settings.MEDICATION_SYNONYMS_ENABLED:
+        # Synonyms come from the catalog, not the interactions being re-keyed
+        await name_resolver.load(medications_db)
+    winners = {}
+    stale_keys = []
+    start_key = None
+    while True:
+        response = await db.scan(exclusive_start_key=start_key)
+        for item in response.get("Items", []):
+            if "medication1" not in item or "medication2" not in item:
+                continue
+            pair = tuple(sorted([
+                name_resolver.resolve(item["medication1"]),
+                name_resolver.resolve(item["medication2"])
+            ]))
+            if (item["medication1"], item["medication2"]) != pair:
+                stale_keys.append({"medication1": item["medication1"], "medication2": item["medication2"]})
+            current = winners.get(pair)
+            if current is None or item.get("updated_at", "") > current.get("updated_at", ""):
+                winners[pair] = item
+        start_key = response.get("LastEvaluatedKey")
+        if not start_key:
+            break
+
+    # Only pairs that gained or lost a spelling need writing
+    stale_pairs = {
+        tuple(sorted([name_resolver.resolve(key["medication1"]), name_resolver.resolve(key["medication2"])]))
+        for key in stale_keys
+    }
+    rewrites = [
+        dict(winners[pair], medication1=pair[0], medication2=pair[1])
+        for pair in stale_pairs
+    ]
+    print(f"{len(rewrites)} canonical rows to write, {len(stale_keys)} old keys to delete")
+    if dry_run:
+        return
+    await db.batch_write_item(rewrites)
+    for key in stale_keys:
+        await db.delete_item(key)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(canonicalize(args.dry_run))
+
+if __name__ == "__main__":
+    main()
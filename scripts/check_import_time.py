@@ -0,0 +1,65 @@
+"""Fail when importing the Lambda entry point gets slower than a budget.
+
+Runs ``python -X importtime -c "import app.main"`` in a fresh interpreter
+(best of ``--runs``), prints the modules with the largest cumulative
+import time, and exits non-zero when ``app.main`` exceeds ``--budget-ms``
+or when a module that should load lazily (boto3 by default) shows up.
+
+    python scripts/check_import_time.py --budget-ms 800
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def profile(module):
+    """Return {module: (self_us, cumulative_us)} for one cold import"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_TIME_BUDGET_MS", "800")))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--forbid", nargs="*", default=["boto3"])
+    args = parser.parse_args()
+
+    runs = [profile(args.module) for _ in range(args.runs)]
+    timings = min(runs, key=lambda run: run[args.module][1])
+    total_ms = timings[args.module][1] / 1000
+
+    print(f"{'module':<50} {'self ms':>9} {'cumul ms':>9}")
+    slowest = sorted(timings.items(), key=lambda item: item[1][1], reverse=True)
+    for name, (self_us, cumulative_us) in slowest[:args.top]:
+        print(f"{name:<50} {self_us / 1000:>9.1f} {cumulative_us / 1000:>9.1f}")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"import {args.module} took {total_ms:.0f} ms, budget is {args.budget_ms:.0f} ms")
+    for name in args.forbid:
+        if name in timings:
+            failures.append(f"{name} is imported eagerly by {args.module}")
+
+    print(f"\n{args.module}: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -5,10 +5,16 @@ import os
 # Add the parent directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from app.config import settings
+from app.db.dynamo import medications_db
 from app.services.interactions import interaction_service
+from app.services.normalization import name_resolver
 from app.models.schemas import InteractionCreate
 
 async def seed_interactions():
+    # Key rows by the same canonical names the server resolves to
+    if settings.MEDICATION_SYNONYMS_ENABLED:
+        await name_resolver.load(medications_db)
     interactions = [
         InteractionCreate(
             medication1="Aspirin",
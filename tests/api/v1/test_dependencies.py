@@ -1,120 +1,81 @@
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
+from fastapi import Request
+from fastapi.testclient import TestClient
 from app.api.v1.dependencies import get_medication_service, get_db
+from app.main import app
 from app.services.medications import MedicationService
 from app.db.dynamo import DynamoDB
 
 
 class TestDependencies:
-    
+
     @pytest.fixture
-    def mock_db(self):
-        """Mock DynamoDB instance"""
-        return Mock()
+    def request_with_state(self):
+        """Request whose app.state holds mock application-scoped instances"""
+        request = Mock(spec=Request)
+        request.app.state.db = Mock(spec=DynamoDB)
+        request.app.state.medication_service = Mock(spec=MedicationService)
+        return request
 
-    def test_get_db_returns_dynamodb_instance(self):
-        """Test that get_db returns a DynamoDB instance"""
-        with patch("app.api.v1.dependencies.DynamoDB") as mock_dynamo_class:
-            mock_dynamo_instance = Mock(spec=DynamoDB)
-            mock_dynamo_class.return_value = mock_dynamo_instance
-            
-            result = get_db()
-            
-            mock_dynamo_class.assert_called_once()
-            assert result == mock_dynamo_instance
+    def test_get_db_returns_app_instance(self, request_with_state):
+        """Test that get_db returns the application's DynamoDB instance"""
+        assert get_db(request_with_state) is request_with_state.app.state.db
 
-    def test_get_db_creates_new_instance_each_time(self):
-        """Test that get_db creates a new instance each time it's called"""
+    def test_get_db_reuses_instance(self, request_with_state):
+        """Test that get_db does not build a new DynamoDB per request"""
         with patch("app.api.v1.dependencies.DynamoDB") as mock_dynamo_class:
-            mock_dynamo_class.side_effect = [Mock(spec=DynamoDB), Mock(spec=DynamoDB)]
-            
-            result1 = get_db()
-            result2 = get_db()
-            
-            assert result1 != result2
-            assert mock_dynamo_class.call_count == 2
-
-    def test_get_medication_service_with_custom_db(self, mock_db):
-        """Test medication service with custom DB instance"""
-        service = get_medication_service(db=mock_db)
-        assert isinstance(service, MedicationService)
-        assert service.db == mock_db
-        assert service.table_name == "medications"
-
-    def test_get_medication_service_with_default_db(self):
-        """Test medication service with default DB dependency"""
-        # This test is not valid outside FastAPI DI context, so skip or adjust
-        pass
-
-    def test_get_medication_service_creates_new_instance_each_time(self):
-        """Test that get_medication_service creates a new instance each time"""
-        with patch("app.api.v1.dependencies.get_db") as mock_get_db:
-            mock_db_instance = Mock(spec=DynamoDB)
-            mock_get_db.return_value = mock_db_instance
-            
-            service1 = get_medication_service()
-            service2 = get_medication_service()
-            
-            assert service1 != service2
-            assert isinstance(service1, MedicationService)
-            assert isinstance(service2, MedicationService)
+            assert get_db(request_with_state) is get_db(request_with_state)
+        mock_dynamo_class.assert_not_called()
 
-    def test_get_medication_service_with_none_db(self):
-        """Test medication service with None DB (should use default)"""
-        with patch("app.api.v1.dependencies.get_db") as mock_get_db:
-            mock_db_instance = Mock(spec=DynamoDB)
-            mock_get_db.return_value = mock_db_instance
-            
-            service = get_medication_service(db=None)
-            
-            # Should still use the provided None, but MedicationService should handle it
-            assert isinstance(service, MedicationService)
-            assert service.db is None
-
-    def test_get_medication_service_preserves_db_reference(self, mock_db):
-        """Test that the DB reference is properly preserved in the service"""
-        service = get_medication_service(db=mock_db)
-        
-        # Verify the service has the correct DB reference
-        assert service.db is mock_db
-        
-        # Verify we can call methods on the mock DB through the service
-        mock_db.some_method.return_value = "test_result"
-        assert mock_db.some_method() == "test_result"
+    def test_get_medication_service_returns_app_instance(self, request_with_state):
+        """Test that get_medication_service returns the application's service"""
+        service = get_medication_service(request_with_state)
+        assert service is request_with_state.app.state.medication_service
+        assert get_medication_service(request_with_state) is service
 
     def test_dependencies_import_structure(self):
         """Test that all dependencies are properly importable"""
         from app.api.v1.dependencies import get_db, get_medication_service
-        
+
         assert callable(get_db)
         assert callable(get_medication_service)
 
     def test_get_db_function_signature(self):
         """Test that get_db has the correct function signature"""
         import inspect
-        
+
         sig = inspect.signature(get_db)
-        assert len(sig.parameters) == 0  # No parameters
+        assert list(sig.parameters) == ["request"]
         assert sig.return_annotation == DynamoDB
 
     def test_get_medication_service_function_signature(self):
         """Test that get_medication_service has the correct function signature"""
         import inspect
-        
+
         sig = inspect.signature(get_medication_service)
-        assert len(sig.parameters) == 1  # One parameter: db
-        assert sig.parameters['db'].annotation == DynamoDB
+        assert list(sig.parameters) == ["request"]
         assert sig.return_annotation == MedicationService
 
-    def test_get_medication_service_with_different_db_types(self):
-        """Test medication service with different types of DB objects"""
-        # Test with Mock object
-        mock_db = Mock()
-        service = get_medication_service(db=mock_db)
-        assert service.db == mock_db
-        # Don't test DI here
-
-    def test_dependency_injection_chain(self):
-        """Test the complete dependency injection chain"""
-        # Not valid outside FastAPI DI context
-        pass 
\ No newline at end of file
+    def test_lifespan_shares_instances_across_requests(self):
+        """Test that the lifespan creates one service used by every request"""
+        seen = []
+        def record(request: Request):
+            service = get_medication_service(request)
+            seen.append((service, get_db(request)))
+            return service
+        app.dependency_overrides[get_medication_service] = record
+        try:
+            with patch("app.main.db") as mock_db, \
+                    patch("app.main.medications_db") as mock_medications_db, \
+                    TestClient(app) as client:
+                mock_medications_db.get_item = AsyncMock(return_value=None)
+                client.get("/api/v1/medications/123")
+                client.get("/api/v1/medications/456")
+        finally:
+            app.dependency_overrides.pop(get_medication_service, None)
+        assert len(seen) == 2
+        assert seen[0][0] is seen[1][0]
+        assert seen[0][1] is mock_db
+        assert seen[0][0].db is mock_medications_db
+        mock_db.close.assert_called_once()
@@ -0,0 +1,42 @@
+import json
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.v1.responses import ModelResponse
+from app.models.schemas import MedicationListResponse, MedicationResponse
+
+MEDICATION = MedicationResponse(
+    id="1",
+    name="Aspirin",
+    generic_name="acetylsalicylic acid",
+    description="Pain reliever — 100 mg",
+    dosage_forms=["tablet"],
+    active_ingredients=["aspirin"],
+    warnings=["Bleeding risk"],
+    side_effects=[],
+    manufacturer="Bayer",
+    category="NSAID",
+    created_at="2024-01-01T00:00:00Z",
+    updated_at="2024-01-01T00:00:00Z"
+)
+
+PAGE = MedicationListResponse(items=[MEDICATION], total=1, page=1, limit=50, has_more=False)
+
+
+def test_model_response_matches_default_serialization():
+    """Test that the fast path writes the same JSON as the response_model path"""
+    app = FastAPI()
+
+    @app.get("/default", response_model=MedicationListResponse)
+    async def default():
+        return PAGE
+
+    @app.get("/fast", response_model=MedicationListResponse)
+    async def fast():
+        return ModelResponse(PAGE)
+
+    client = TestClient(app)
+    default_response = client.get("/default")
+    fast_response = client.get("/fast")
+    assert fast_response.headers["content-type"] == "application/json"
+    assert fast_response.content == default_response.content
+    assert json.loads(fast_response.content)["items"][0]["description"] == "Pain reliever — 100 mg"
@@ -3,7 +3,9 @@ from fastapi.testclient import TestClient
 from unittest.mock import patch, MagicMock, AsyncMock
 from app.main import app
 from app.auth.cognito import auth
+from app.models.records import InteractionRecord
 from app.models.schemas import (
+    MedicationFields,
     MedicationResponse, 
     MedicationListResponse,
     InteractionCreate,
@@ -12,7 +14,11 @@ from app.models.schemas import (
     InteractionCheckResponse
 )
 from app.api.v1.dependencies import get_medication_service
+from app.db.pagination import InvalidCursor
+from app.services.medications import MedicationPage, cache_entry
 from app.services.interactions import interaction_service
+from app.services.result_cache import interaction_result_cache
+from app.cache import MemoryBackend
 from fastapi import HTTPException
 
 client = TestClient(app)
@@ -34,6 +40,11 @@ def mock_medication_service():
     yield mock
     app.dependency_overrides.pop(get_medication_service, None)
 
+@pytest.fixture(autouse=True)
+def fresh_result_cache():
+    with patch.object(interaction_result_cache, "backend", MemoryBackend()):
+        yield
+
 @pytest.fixture
 def mock_db():
     with patch("app.db.dynamo.DynamoDB") as mock:
@@ -87,17 +98,17 @@ def test_create_interaction_invalid_request():
 
 def test_check_interactions_success():
     """Test successful interaction check"""
-    with patch.object(interaction_service, 'check_interactions') as mock_check:
+    with patch.object(interaction_service, 'check_records') as mock_check:
         mock_interactions = [
-            InteractionResponse(
-                id="1",
-                medication1="Aspirin",
-                medication2="Warfarin",
-                severity="high",
-                description="Increased risk of bleeding",
-                created_at="2024-01-01T00:00:00Z",
-                updated_at="2024-01-01T00:00:00Z"
-            )
+            InteractionRecord.from_item({
+                "id": "1",
+                "medication1": "Aspirin",
+                "medication2": "Warfarin",
+                "severity": "high",
+                "description": "Increased risk of bleeding",
+                "created_at": "2024-01-01T00:00:00Z",
+                "updated_at": "2024-01-01T00:00:00Z"
+            })
         ]
         mock_check.return_value = mock_interactions
         
@@ -114,9 +125,208 @@ def test_check_interactions_success():
         assert data["interactions"][0]["medication1"] == "Aspirin"
         assert data["interactions"][0]["medication2"] == "Warfarin"
 
+def test_check_interactions_cached_with_etag():
+    """Test that a repeated regimen is served from the cache and revalidates with 304"""
+    with patch.object(interaction_service, 'check_records') as mock_check:
+        mock_check.return_value = []
+        first = client.post("/api/v1/interactions/check", json={"medications": ["Aspirin", "Warfarin"]})
+        second = client.post("/api/v1/interactions/check", json={"medications": ["warfarin", "ASA"]})
+        not_modified = client.get(
+            "/api/v1/interactions/check?medications=Aspirin&medications=Warfarin",
+            headers={"If-None-Match": first.headers["ETag"]}
+        )
+        mock_check.assert_awaited_once()
+    assert (first.headers["X-Cache"], second.headers["X-Cache"]) == ("MISS", "HIT")
+    assert second.json() == {"interactions": [], "has_interactions": False}
+    assert not_modified.status_code == 304
+    assert not_modified.headers["ETag"] == first.headers["ETag"]
+
+def test_check_interactions_post_ignores_if_none_match():
+    """Test that POST answers with the body even when the ETag matches; 304 is for GET"""
+    with patch.object(interaction_service, 'check_records') as mock_check:
+        mock_check.return_value = []
+        first = client.post("/api/v1/interactions/check", json={"medications": ["Aspirin", "Warfarin"]})
+        second = client.post(
+            "/api/v1/interactions/check",
+            json={"medications": ["Aspirin", "Warfarin"]},
+            headers={"If-None-Match": first.headers["ETag"]}
+        )
+    assert second.status_code == 200
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert second.json() == {"interactions": [], "has_interactions": False}
+
+def test_check_interactions_cache_invalidated_by_create():
+    """Test that a new interaction is visible on the next check"""
+    with patch.object(interaction_service, 'check_records') as mock_check, \
+         patch("app.services.interactions.db") as mock_db:
+        mock_db.put_item = AsyncMock()
+        mock_check.return_value = []
+        before = client.get("/api/v1/interactions/check?medications=Aspirin&medications=Warfarin")
+        client.post("/api/v1/interactions", json={
+            "medication1": "Aspirin",
+            "medication2": "Warfarin",
+            "severity": "high",
+            "description": "Increased risk of bleeding"
+        })
+        mock_check.return_value = [InteractionRecord.from_item({
+            "id": "1",
+            "medication1": "aspirin",
+            "medication2": "warfarin",
+            "severity": "high",
+            "description": "Increased risk of bleeding",
+            "created_at": "2024-01-01T00:00:00Z",
+            "updated_at": "2024-01-01T00:00:00Z"
+        })]
+        after = client.get(
+            "/api/v1/interactions/check?medications=Aspirin&medications=Warfarin",
+            headers={"If-None-Match": before.headers["ETag"]}
+        )
+    assert after.status_code == 200
+    assert after.headers["X-Cache"] == "MISS"
+    assert after.json()["has_interactions"] is True
+
+def test_check_interactions_get_invalid_request():
+    response = client.get("/api/v1/interactions/check?medications=Aspirin")
+    assert response.status_code == 422
+
+def test_cache_stats():
+    response = client.get("/api/v1/cache/stats")
+    assert response.status_code == 200
+    assert set(response.json()) == {"interaction_results", "medications", "tokens"}
+    assert "hit_ratio" in response.json()["interaction_results"]
+
+def test_check_interactions_batch_success():
+    """Test that batch results come back per regimen, in request order"""
+    interaction = InteractionResponse(
+        id="1",
+        medication1="Aspirin",
+        medication2="Warfarin",
+        severity="high",
+        description="Increased risk of bleeding",
+        created_at="2024-01-01T00:00:00Z",
+        updated_at="2024-01-01T00:00:00Z"
+    )
+    with patch.object(interaction_service, "check_interactions_batch", new=AsyncMock()) as mock_check:
+        mock_check.return_value = ([[interaction], []], 2)
+        response = client.post(
+            "/api/v1/interactions/check/batch",
+            json={"regimens": [
+                {"medications": ["Aspirin", "Warfarin"]},
+                {"medications": ["Aspirin", "Tylenol"]}
+            ]},
+            headers={"Authorization": "Bearer test-token"}
+        )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["unique_pairs"] == 2
+    assert data["results"][0]["has_interactions"] is True
+    assert data["results"][0]["interactions"][0]["id"] == "1"
+    assert data["results"][1] == {"interactions": [], "has_interactions": False}
+    mock_check.assert_awaited_once_with([["Aspirin", "Warfarin"], ["Aspirin", "Tylenol"]])
+
+def test_check_interactions_batch_invalid_regimen():
+    """Test that one bad regimen rejects the whole batch"""
+    response = client.post(
+        "/api/v1/interactions/check/batch",
+        json={"regimens": [{"medications": ["Aspirin", "Warfarin"]}, {"medications": ["Aspirin"]}]},
+        headers={"Authorization": "Bearer test-token"}
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"][:3] == ["body", "regimens", 1]
+
+def test_check_interactions_batch_empty():
+    response = client.post(
+        "/api/v1/interactions/check/batch",
+        json={"regimens": []},
+        headers={"Authorization": "Bearer test-token"}
+    )
+    assert response.status_code == 422
+
+async def async_iter(items):
+    for item in items:
+        yield item
+
+SAMPLE_INTERACTION = InteractionResponse(
+    id="1",
+    medication1="Aspirin",
+    medication2="Warfarin",
+    severity="high",
+    description="Increased risk of bleeding",
+    created_at="2024-01-01T00:00:00Z",
+    updated_at="2024-01-01T00:00:00Z"
+)
+
+def test_check_interactions_ndjson():
+    """Test that Accept: application/x-ndjson streams one interaction per line"""
+    with patch.object(interaction_service, "iter_interactions") as mock_iter:
+        mock_iter.return_value = async_iter([SAMPLE_INTERACTION, SAMPLE_INTERACTION])
+        response = client.post(
+            "/api/v1/interactions/check",
+            json={"medications": ["Aspirin", "Warfarin"]},
+            headers={"Authorization": "Bearer test-token", "Accept": "application/x-ndjson"}
+        )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = response.text.splitlines()
+    assert len(lines) == 2
+    assert InteractionResponse.model_validate_json(lines[0]) == SAMPLE_INTERACTION
+
+def test_check_interactions_batch_ndjson():
+    with patch.object(interaction_service, "iter_interactions_batch") as mock_iter:
+        mock_iter.return_value = async_iter([(0, [SAMPLE_INTERACTION]), (1, [])])
+        response = client.post(
+            "/api/v1/interactions/check/batch",
+            json={"regimens": [
+                {"medications": ["Aspirin", "Warfarin"]},
+                {"medications": ["Aspirin", "Tylenol"]}
+            ]},
+            headers={"Authorization": "Bearer test-token", "Accept": "application/x-ndjson"}
+        )
+    lines = [InteractionCheckResponse.model_validate_json(line) for line in response.text.splitlines()]
+    assert [line.has_interactions for line in lines] == [True, False]
+
+def test_ndjson_stream_failure_ends_with_error_line():
+    async def failing():
+        yield SAMPLE_INTERACTION
+        raise Exception("Error batch getting items: throttled")
+    with patch.object(interaction_service, "iter_interactions", return_value=failing()):
+        response = client.post(
+            "/api/v1/interactions/check",
+            json={"medications": ["Aspirin", "Warfarin"]},
+            headers={"Authorization": "Bearer test-token", "Accept": "application/x-ndjson"}
+        )
+    lines = response.text.splitlines()
+    assert len(lines) == 2
+    assert lines[-1] == '{"error": "Stream interrupted"}'
+
+def test_list_medications_ndjson_export(mock_medication_service):
+    medication = MedicationResponse(
+        id="1",
+        name="Test Med",
+        generic_name="Test Generic",
+        description="Test Description",
+        dosage_forms=["tablet"],
+        active_ingredients=["test"],
+        manufacturer="Test Manufacturer",
+        category="Test Category",
+        created_at="2024-01-01T00:00:00Z",
+        updated_at="2024-01-01T00:00:00Z"
+    )
+    mock_medication_service.iter_medications = MagicMock(return_value=async_iter([medication]))
+    response = client.get("/api/v1/medications?limit=500", headers={"Accept": "application/x-ndjson"})
+    assert response.status_code == 200
+    assert [MedicationResponse.model_validate_json(line) for line in response.text.splitlines()] == [medication]
+    mock_medication_service.iter_medications.assert_called_once_with(None, 500, None, None)
+    mock_medication_service.list_medications.assert_not_called()
+
+def test_list_medications_ndjson_invalid_cursor(mock_medication_service):
+    mock_medication_service.iter_medications = MagicMock(side_effect=InvalidCursor("Invalid cursor"))
+    response = client.get("/api/v1/medications?cursor=bad", headers={"Accept": "application/x-ndjson"})
+    assert response.status_code == 400
+
 def test_check_interactions_no_interactions():
     """Test interaction check with no interactions found"""
-    with patch.object(interaction_service, 'check_interactions') as mock_check:
+    with patch.object(interaction_service, 'check_records') as mock_check:
         mock_check.return_value = []
         
         response = client.post(
@@ -179,7 +389,7 @@ def test_list_medications(mock_medication_service):
             updated_at="2024-01-01T00:00:00Z"
         )
     ]
-    mock_medication_service.list_medications.return_value = (mock_medications, 1, False)
+    mock_medication_service.list_medications.return_value = MedicationPage(mock_medications, 1, False, None)
 
     response = client.get(
         "/api/v1/medications",
@@ -207,7 +417,7 @@ def test_list_medications_with_search(mock_medication_service):
             updated_at="2024-01-01T00:00:00Z"
         )
     ]
-    mock_medication_service.list_medications.return_value = (mock_medications, 1, False)
+    mock_medication_service.list_medications.return_value = MedicationPage(mock_medications, 1, False, None)
 
     response = client.get(
         "/api/v1/medications?search=aspirin",
@@ -218,7 +428,7 @@ def test_list_medications_with_search(mock_medication_service):
     assert len(data["items"]) == 1
     assert data["items"][0]["name"] == "Aspirin"
     mock_medication_service.list_medications.assert_called_with(
-        search="aspirin", page=1, limit=50
+        search="aspirin", page=1, limit=50, cursor=None, fields=None
     )
 
 def test_list_medications_with_pagination(mock_medication_service):
@@ -237,7 +447,7 @@ def test_list_medications_with_pagination(mock_medication_service):
             updated_at="2024-01-01T00:00:00Z"
         )
     ]
-    mock_medication_service.list_medications.return_value = (mock_medications, 5, True)
+    mock_medication_service.list_medications.return_value = MedicationPage(mock_medications, 5, True, None)
 
     response = client.get(
         "/api/v1/medications?page=2&limit=10",
@@ -249,9 +459,130 @@ def test_list_medications_with_pagination(mock_medication_service):
     assert data["limit"] == 10
     assert data["has_more"] is True
     mock_medication_service.list_medications.assert_called_with(
-        search=None, page=2, limit=10
+        search=None, page=2, limit=10, cursor=None, fields=None
+    )
+
+def test_list_medications_returns_next_cursor(mock_medication_service):
+    """Test that the continuation token is passed through in both directions"""
+    mock_medication_service.list_medications.return_value = MedicationPage([], None, True, "next-token")
+
+    response = client.get(
+        "/api/v1/medications?cursor=this-token",
+        headers={"Authorization": "Bearer test-token"}
+    )
+    assert response.status_code == 200
+    assert response.json()["next_cursor"] == "next-token"
+    mock_medication_service.list_medications.assert_called_with(
+        search=None, page=1, limit=50, cursor="this-token", fields=None
     )
 
+def test_list_medications_page_without_cursor_is_rejected(mock_medication_service):
+    """Test that a page the scan cannot reach is a client error, not page 1 relabelled"""
+    mock_medication_service.list_medications.side_effect = ValueError("page is not supported here")
+    response = client.get(
+        "/api/v1/medications?page=3&limit=2",
+        headers={"Authorization": "Bearer test-token"}
+    )
+    assert response.status_code == 400
+
+def test_list_medications_invalid_cursor(mock_medication_service):
+    """Test that a tampered cursor is a client error"""
+    mock_medication_service.list_medications.side_effect = InvalidCursor("Cursor signature mismatch")
+
+    response = client.get(
+        "/api/v1/medications?cursor=forged",
+        headers={"Authorization": "Bearer test-token"}
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Cursor signature mismatch"
+
+def test_list_medications_fields(mock_medication_service):
+    """Test that fields trims each item to the requested attributes"""
+    mock_medication_service.list_medications.return_value = MedicationPage(
+        [MedicationFields(id="1", name="Aspirin", generic_name="aspirin")], 1, False
+    )
+
+    response = client.get("/api/v1/medications?fields=name,%20generic_name")
+    assert response.status_code == 200
+    assert response.json()["items"] == [{"id": "1", "name": "Aspirin", "generic_name": "aspirin"}]
+    assert response.json()["next_cursor"] is None
+    mock_medication_service.list_medications.assert_called_with(
+        search=None, page=1, limit=50, cursor=None, fields=["name", "generic_name"]
+    )
+
+def test_list_medications_unknown_fields(mock_medication_service):
+    mock_medication_service.list_medications.side_effect = ValueError("Unknown fields: dose")
+    response = client.get("/api/v1/medications?fields=dose")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown fields: dose"
+
+def test_get_medication_fields(mock_medication_service):
+    mock_medication_service.get_medication.return_value = MedicationFields(id="1", name="Aspirin")
+    response = client.get("/api/v1/medications/1?fields=name")
+    assert response.json() == {"id": "1", "name": "Aspirin"}
+    mock_medication_service.get_medication.assert_awaited_once_with("1", ["name"])
+
+def test_find_medications_by_name(mock_medication_service):
+    mock_medication_service.find_by_name.return_value = [MedicationResponse(
+        id="1",
+        name="Aspirin",
+        generic_name="Acetylsalicylic acid",
+        description="Pain reliever",
+        dosage_forms=["tablet"],
+        active_ingredients=["aspirin"],
+        manufacturer="Test Manufacturer",
+        category="Analgesic",
+        created_at="2024-01-01T00:00:00Z",
+        updated_at="2024-01-01T00:00:00Z"
+    )]
+    response = client.get("/api/v1/medications/by-name/ASPIRIN")
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()] == ["1"]
+    mock_medication_service.find_by_name.assert_awaited_once_with("ASPIRIN")
+
+def test_create_medication(mock_medication_service):
+    """Test creating a medication"""
+    mock_medication_service.create_medication.return_value = MedicationResponse(
+        id="1",
+        name="Test Med",
+        generic_name="Test Generic",
+        description="Test Description",
+        dosage_forms=["tablet"],
+        active_ingredients=["test"],
+        manufacturer="Test Manufacturer",
+        category="Test Category",
+        created_at="2024-01-01T00:00:00Z",
+        updated_at="2024-01-01T00:00:00Z"
+    )
+
+    response = client.post(
+        "/api/v1/medications",
+        json={
+            "name": "Test Med",
+            "generic_name": "Test Generic",
+            "description": "Test Description",
+            "dosage_forms": ["tablet"],
+            "active_ingredients": ["test"],
+            "manufacturer": "Test Manufacturer",
+            "category": "Test Category"
+        },
+        headers={"Authorization": "Bearer test-token"}
+    )
+    assert response.status_code == 200
+    assert response.json()["id"] == "1"
+    mock_medication_service.create_medication.assert_awaited_once()
+
+def test_list_medications_approximate_total(mock_medication_service):
+    """Test that a cached total is flagged as approximate"""
+    mock_medication_service.list_medications.return_value = MedicationPage([], 40, False, None, True)
+
+    response = client.get(
+        "/api/v1/medications",
+        headers={"Authorization": "Bearer test-token"}
+    )
+    assert response.json()["total"] == 40
+    assert response.json()["approximate_total"] is True
+
 def test_get_medication(mock_medication_service):
     """Test getting medication"""
     # Mock service response
@@ -267,7 +598,7 @@ def test_get_medication(mock_medication_service):
         created_at="2024-01-01T00:00:00Z",
         updated_at="2024-01-01T00:00:00Z"
     )
-    mock_medication_service.get_medication.return_value = mock_medication
+    mock_medication_service.get_medication_entry.return_value = cache_entry(mock_medication)
 
     response = client.get(
         "/api/v1/medications/1",
@@ -277,10 +608,30 @@ def test_get_medication(mock_medication_service):
     data = response.json()
     assert data["id"] == "1"
     assert data["name"] == "Test Med"
+    assert response.headers["last-modified"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+    assert response.headers["cache-control"] == "public, no-cache"
+
+    revalidated = client.get("/api/v1/medications/1", headers={"If-None-Match": response.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == response.headers["etag"]
+
+    revalidated = client.get("/api/v1/medications/1", headers={"If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"})
+    assert revalidated.status_code == 304
+
+    stale = client.get("/api/v1/medications/1", headers={"If-Modified-Since": "Sun, 31 Dec 2023 23:59:59 GMT"})
+    assert stale.status_code == 200
+
+    # If-None-Match wins over If-Modified-Since
+    changed = client.get("/api/v1/medications/1", headers={
+        "If-None-Match": '"other"',
+        "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"
+    })
+    assert changed.status_code == 200
 
 def test_get_medication_not_found(mock_medication_service):
     """Test getting non-existent medication"""
-    mock_medication_service.get_medication.return_value = None
+    mock_medication_service.get_medication_entry.return_value = None
 
     response = client.get(
         "/api/v1/medications/999",
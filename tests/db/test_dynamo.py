@@ -1,12 +1,16 @@
 import pytest
-from unittest.mock import AsyncMock, patch
+import asyncio
+import threading
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
 from app.db.dynamo import DynamoDB
+from app.config import settings
 from botocore.exceptions import ClientError
 
 @pytest.fixture
 def mock_table():
     """Mock DynamoDB table"""
-    mock = AsyncMock()
+    mock = MagicMock()
     with patch("boto3.resource") as mock_resource:
         mock_resource.return_value.Table.return_value = mock
         yield mock
@@ -150,6 +154,34 @@ async def test_query_success(mock_table):
         ExpressionAttributeValues={":med1": "Drug A"}
     )
 
+@pytest.mark.asyncio
+async def test_get_item_with_projection(mock_table):
+    mock_table.get_item.return_value = {"Item": {"id": "123", "name": "Aspirin"}}
+    db = DynamoDB()
+    await db.get_item({"id": "123"}, projection=["id", "name"])
+    mock_table.get_item.assert_called_once_with(
+        Key={"id": "123"},
+        ProjectionExpression="#p0, #p1",
+        ExpressionAttributeNames={"#p0": "id", "#p1": "name"}
+    )
+
+@pytest.mark.asyncio
+async def test_query_projection_keeps_filter_names(mock_table):
+    mock_table.query.return_value = {"Items": []}
+    db = DynamoDB()
+    await db.query(
+        filter_expression="contains(#name, :search)",
+        expression_values={":search": "asp"},
+        expression_attribute_names={"#name": "name"},
+        projection=["id", "name"]
+    )
+    mock_table.query.assert_called_once_with(
+        FilterExpression="contains(#name, :search)",
+        ExpressionAttributeValues={":search": "asp"},
+        ProjectionExpression="#p0, #p1",
+        ExpressionAttributeNames={"#name": "name", "#p0": "id", "#p1": "name"}
+    )
+
 @pytest.mark.asyncio
 async def test_query_with_filter(mock_table):
     """Test query with filter expression"""
@@ -213,4 +245,344 @@ async def test_query_with_select(mock_table):
     db = DynamoDB()
     result = await db.query(select="COUNT")
     assert result["Count"] == 5
-    mock_table.query.assert_called_once_with(Select="COUNT") 
\ No newline at end of file
+    mock_table.query.assert_called_once_with(Select="COUNT") 
+
+@pytest.fixture
+def mock_resource():
+    """Mock DynamoDB service resource for batch operations"""
+    with patch("boto3.resource") as mock_resource:
+        mock_resource.return_value.batch_get_item = MagicMock()
+        yield mock_resource.return_value
+
+TABLE = settings.DYNAMODB_TABLE
+
+@pytest.mark.asyncio
+async def test_batch_get_item_chunks_keys(mock_resource):
+    """Test batch_get_item splits keys into 100-key requests"""
+    keys = [{"medication1": f"a{i:03d}", "medication2": "b"} for i in range(250)]
+    mock_resource.batch_get_item.return_value = {"Responses": {TABLE: [{"id": "1"}]}}
+    db = DynamoDB()
+    result = await db.batch_get_item(keys)
+    assert mock_resource.batch_get_item.call_count == 3
+    chunk_sizes = [
+        len(call.kwargs["RequestItems"][db.table_name]["Keys"])
+        for call in mock_resource.batch_get_item.call_args_list
+    ]
+    assert chunk_sizes == [100, 100, 50]
+    assert len(result) == 3
+
+@pytest.mark.asyncio
+async def test_batch_get_item_with_projection(mock_resource):
+    mock_resource.batch_get_item.return_value = {"Responses": {TABLE: [{"id": "1"}]}}
+    db = DynamoDB()
+    await db.batch_get_item([{"id": "1"}], projection=["id", "name"])
+    mock_resource.batch_get_item.assert_called_once_with(RequestItems={TABLE: {
+        "Keys": [{"id": "1"}],
+        "ProjectionExpression": "#p0, #p1",
+        "ExpressionAttributeNames": {"#p0": "id", "#p1": "name"}
+    }})
+
+@pytest.mark.asyncio
+async def test_batch_get_item_deduplicates_keys(mock_resource):
+    """Test batch_get_item never sends the same key twice"""
+    mock_resource.batch_get_item.return_value = {"Responses": {TABLE: []}}
+    db = DynamoDB()
+    await db.batch_get_item([{"id": "1"}, {"id": "1"}, {"id": "2"}])
+    sent = mock_resource.batch_get_item.call_args.kwargs["RequestItems"][db.table_name]["Keys"]
+    assert sent == [{"id": "1"}, {"id": "2"}]
+
+@pytest.mark.asyncio
+async def test_batch_get_item_retries_unprocessed_keys(mock_resource):
+    """Test batch_get_item retries UnprocessedKeys with backoff"""
+    mock_resource.batch_get_item.side_effect = [
+        {
+            "Responses": {TABLE: [{"id": "1"}]},
+            "UnprocessedKeys": {TABLE: {"Keys": [{"id": "2"}]}}
+        },
+        {"Responses": {TABLE: [{"id": "2"}]}, "UnprocessedKeys": {}}
+    ]
+    db = DynamoDB()
+    with patch("app.db.dynamo.asyncio.sleep", new=AsyncMock()) as mock_sleep:
+        result = await db.batch_get_item([{"id": "1"}, {"id": "2"}])
+    assert [item["id"] for item in result] == ["1", "2"]
+    mock_sleep.assert_awaited_once()
+    retried = mock_resource.batch_get_item.call_args.kwargs["RequestItems"][db.table_name]["Keys"]
+    assert retried == [{"id": "2"}]
+
+@pytest.mark.asyncio
+async def test_batch_get_item_gives_up_after_max_retries(mock_resource):
+    """Test batch_get_item raises when keys stay unprocessed"""
+    mock_resource.batch_get_item.return_value = {
+        "Responses": {},
+        "UnprocessedKeys": {TABLE: {"Keys": [{"id": "1"}]}}
+    }
+    db = DynamoDB()
+    with patch("app.db.dynamo.asyncio.sleep", new=AsyncMock()):
+        with pytest.raises(Exception, match="Error batch getting items"):
+            await db.batch_get_item([{"id": "1"}])
+
+@pytest.mark.asyncio
+async def test_batch_get_item_error(mock_resource):
+    """Test batch_get_item error handling"""
+    mock_resource.batch_get_item.side_effect = ClientError(
+        {"Error": {"Code": "ValidationException", "Message": "Invalid keys"}},
+        "BatchGetItem"
+    )
+    db = DynamoDB()
+    with pytest.raises(Exception, match="Error batch getting items"):
+        await db.batch_get_item([{"id": "1"}])
+
+@pytest.mark.asyncio
+async def test_batch_write_item_chunks_items(mock_resource):
+    """Test batch_write_item splits items into 25-item requests"""
+    mock_resource.batch_write_item.return_value = {"UnprocessedItems": {}}
+    db = DynamoDB()
+    written = await db.batch_write_item([{"id": str(i)} for i in range(60)])
+    assert written == 60
+    chunk_sizes = [
+        len(call.kwargs["RequestItems"][db.table_name])
+        for call in mock_resource.batch_write_item.call_args_list
+    ]
+    assert chunk_sizes == [25, 25, 10]
+    first = mock_resource.batch_write_item.call_args_list[0].kwargs["RequestItems"][db.table_name][0]
+    assert first == {"PutRequest": {"Item": {"id": "0"}}}
+
+@pytest.mark.asyncio
+async def test_batch_write_item_retries_unprocessed_items(mock_resource):
+    """Test batch_write_item resends UnprocessedItems with backoff"""
+    unprocessed = [{"PutRequest": {"Item": {"id": "2"}}}]
+    mock_resource.batch_write_item.side_effect = [
+        {"UnprocessedItems": {TABLE: unprocessed}},
+        {"UnprocessedItems": {}}
+    ]
+    db = DynamoDB()
+    with patch("app.db.dynamo.asyncio.sleep", new=AsyncMock()) as mock_sleep:
+        assert await db.batch_write_item([{"id": "1"}, {"id": "2"}]) == 2
+    mock_sleep.assert_awaited_once()
+    assert mock_resource.batch_write_item.call_args.kwargs["RequestItems"] == {db.table_name: unprocessed}
+
+@pytest.mark.asyncio
+async def test_batch_write_item_gives_up_after_max_retries(mock_resource):
+    """Test batch_write_item raises when items stay unprocessed"""
+    mock_resource.batch_write_item.return_value = {
+        "UnprocessedItems": {TABLE: [{"PutRequest": {"Item": {"id": "1"}}}]}
+    }
+    db = DynamoDB()
+    with patch("app.db.dynamo.asyncio.sleep", new=AsyncMock()):
+        with pytest.raises(Exception, match="Error batch writing items: 1 items left unprocessed"):
+            await db.batch_write_item([{"id": "1"}])
+
+@pytest.mark.asyncio
+async def test_scan_success(mock_table):
+    """Test scan with a filter and a start key"""
+    mock_table.scan.return_value = {"Items": [{"id": "123"}], "Count": 1}
+    db = DynamoDB()
+    result = await db.scan(
+        filter_expression="#updated_at > :since",
+        expression_values={":since": "2024-01-01T00:00:00Z"},
+        expression_attribute_names={"#updated_at": "updated_at"},
+        exclusive_start_key={"id": "100"}
+    )
+    assert result["Items"][0]["id"] == "123"
+    mock_table.scan.assert_called_once_with(
+        FilterExpression="#updated_at > :since",
+        ExpressionAttributeValues={":since": "2024-01-01T00:00:00Z"},
+        ExpressionAttributeNames={"#updated_at": "updated_at"},
+        ExclusiveStartKey={"id": "100"}
+    )
+
+@pytest.mark.asyncio
+async def test_scan_error(mock_table):
+    """Test scan error handling"""
+    mock_table.scan.side_effect = ClientError(
+        {"Error": {"Code": "ResourceNotFoundException", "Message": "Table not found"}},
+        "Scan"
+    )
+    db = DynamoDB()
+    with pytest.raises(Exception, match="Error scanning items"):
+        await db.scan()
+
+@pytest.mark.asyncio
+async def test_calls_run_off_the_event_loop(mock_table):
+    """Test that blocking boto3 calls execute on the worker pool"""
+    calling_threads = []
+    def get_item(**kwargs):
+        calling_threads.append(threading.current_thread())
+        return {"Item": {"id": "123"}}
+    mock_table.get_item.side_effect = get_item
+    db = DynamoDB()
+    await db.get_item({"id": "123"})
+    assert calling_threads[0] is not threading.main_thread()
+    assert calling_threads[0].name.startswith("dynamodb")
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_overlap(mock_table):
+    """Test that in-flight calls do not serialize on each other"""
+    def slow_get_item(**kwargs):
+        time.sleep(0.1)
+        return {"Item": kwargs["Key"]}
+    mock_table.get_item.side_effect = slow_get_item
+    db = DynamoDB()
+    start = time.perf_counter()
+    results = await asyncio.gather(*(db.get_item({"id": str(i)}) for i in range(5)))
+    assert time.perf_counter() - start < 0.4
+    assert [r["id"] for r in results] == ["0", "1", "2", "3", "4"]
+
+@pytest.mark.asyncio
+async def test_call_timeout(mock_table):
+    """Test that a call exceeding call_timeout surfaces as an error"""
+    mock_table.get_item.side_effect = lambda **kwargs: time.sleep(0.2)
+    db = DynamoDB()
+    db.call_timeout = 0.01
+    with pytest.raises(Exception, match="Error getting item.*RequestTimeout"):
+        await db.get_item({"id": "123"})
+
+def test_client_config():
+    """Test that the connection pool and timeouts are passed to boto3"""
+    with patch("boto3.resource") as mock_resource:
+        db = DynamoDB()
+        db.table
+    config = mock_resource.call_args.kwargs["config"]
+    assert config.max_pool_connections == settings.DYNAMODB_MAX_POOL_CONNECTIONS
+    assert config.tcp_keepalive is True
+    assert config.read_timeout == settings.DYNAMODB_READ_TIMEOUT
+    assert db.executor._max_workers == settings.DYNAMODB_MAX_POOL_CONNECTIONS
+    db.close()
+
+@pytest.mark.asyncio
+async def test_query_with_exclusive_start_key(mock_table):
+    """Test query resumes from a start key"""
+    mock_table.query.return_value = {"Items": [], "Count": 0}
+    db = DynamoDB()
+    await db.query(limit=10, exclusive_start_key={"id": "123"})
+    mock_table.query.assert_called_once_with(Limit=10, ExclusiveStartKey={"id": "123"})
+
+def test_resource_created_lazily():
+    """Test that boto3 is only touched on first use, and only once"""
+    with patch("boto3.resource") as mock_resource:
+        db = DynamoDB()
+        mock_resource.assert_not_called()
+        assert db.table is db.table
+        assert db.dynamodb is db.dynamodb
+    mock_resource.assert_called_once()
+    mock_resource.return_value.Table.assert_called_once_with(db.table_name)
+    db.close()
+
+@pytest.mark.asyncio
+async def test_close_releases_and_rebuilds(mock_table):
+    """Test that close drops the pool and threads, and later calls rebuild them"""
+    db = DynamoDB()
+    mock_table.get_item.return_value = {}
+    await db.get_item({"id": "1"})
+    executor = db.executor
+    client = db.dynamodb.meta.client
+    db.close()
+    client.close.assert_called_once()
+    assert executor._shutdown
+    await db.get_item({"id": "1"})
+    assert db.executor is not executor
+    db.close()
+
+def test_for_table_shares_connection():
+    """Test that a table view reuses the resource and threads of its parent"""
+    with patch("boto3.resource") as mock_resource:
+        db = DynamoDB()
+        medications = db.for_table("medications")
+        assert medications.table_name == "medications"
+        assert medications.dynamodb is db.dynamodb
+        assert medications.executor is db.executor
+        medications.table
+    mock_resource.assert_called_once()
+    mock_resource.return_value.Table.assert_called_once_with("medications")
+    medications.close()
+    assert db._executor is None
+    db.close()
+
+@pytest.mark.asyncio
+async def test_for_table_rebuilds_after_close():
+    """Test that closing the shared connection rebinds views on next use"""
+    with patch("boto3.resource", side_effect=lambda *args, **kwargs: MagicMock()) as mock_resource:
+        db = DynamoDB()
+        medications = db.for_table("medications")
+        medications.table.get_item.return_value = {}
+        await medications.get_item({"id": "1"})
+        table = medications.table
+        db.close()
+        assert medications.table is not table
+    assert mock_resource.call_count == 2
+    db.close()
+
+@pytest.mark.asyncio
+async def test_query_index(mock_table):
+    mock_table.query.return_value = {"Items": [], "Count": 0}
+    db = DynamoDB()
+    await db.query(
+        key_condition_expression="name_normalized = :name",
+        expression_values={":name": "aspirin"},
+        index_name="name-index"
+    )
+    mock_table.query.assert_called_once_with(
+        KeyConditionExpression="name_normalized = :name",
+        ExpressionAttributeValues={":name": "aspirin"},
+        IndexName="name-index"
+    )
+
+@pytest.mark.asyncio
+async def test_scan_count_with_limit(mock_table):
+    mock_table.scan.return_value = {"Count": 3}
+    db = DynamoDB()
+    await db.scan(limit=10, select="COUNT")
+    mock_table.scan.assert_called_once_with(Limit=10, Select="COUNT")
+
+@pytest.mark.asyncio
+async def test_calls_in_a_request_record_consumed_capacity(mock_table):
+    """Test that calls serving a request ask for and report consumed capacity"""
+    from app import metrics
+    mock_table.get_item.return_value = {"ConsumedCapacity": {"TableName": "t", "CapacityUnits": 0.5}}
+    db = DynamoDB()
+    await db.get_item({"id": "1"})
+    assert "ReturnConsumedCapacity" not in mock_table.get_item.call_args.kwargs
+
+    timings = metrics.RequestTimings()
+    token = metrics._request_timings.set(timings)
+    try:
+        await db.get_item({"id": "1"})
+    finally:
+        metrics._request_timings.reset(token)
+    assert mock_table.get_item.call_args.kwargs["ReturnConsumedCapacity"] == "TOTAL"
+    assert timings.dynamodb_calls == 1
+    assert timings.consumed_capacity == 0.5
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_reads_are_coalesced(mock_table):
+    """Test that identical in-flight reads share one call and different ones do not"""
+    from app import metrics
+    release = threading.Event()
+
+    def get_item(**kwargs):
+        release.wait(5)
+        return {"Item": {"id": kwargs["Key"]["id"]}}
+
+    mock_table.get_item.side_effect = get_item
+    db = DynamoDB()
+    before = metrics.DYNAMODB_COALESCED.total()
+    reads = [asyncio.create_task(db.get_item({"id": "1"})) for _ in range(3)]
+    reads.append(asyncio.create_task(db.get_item({"id": "2"})))
+    await asyncio.sleep(0.05)
+    release.set()
+    items = await asyncio.gather(*reads)
+    assert [item["id"] for item in items] == ["1", "1", "1", "2"]
+    assert mock_table.get_item.call_count == 2
+    assert db.reads.stats()["coalesced"] == 2
+    assert metrics.DYNAMODB_COALESCED.total() == before + 2
+    db.close()
+
+@pytest.mark.asyncio
+async def test_coalescing_can_be_disabled(mock_table):
+    mock_table.query.return_value = {"Items": []}
+    db = DynamoDB()
+    db.coalesce_reads = False
+    await asyncio.gather(*(db.query("medication1 = :med1", {":med1": "a"}) for _ in range(3)))
+    assert mock_table.query.call_count == 3
+    assert db.reads.stats()["calls"] == 0
+    db.close()
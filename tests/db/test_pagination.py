@@ -0,0 +1,27 @@
+import pytest
+from app.db.pagination import InvalidCursor, decode_cursor, encode_cursor
+
+
+def test_round_trip():
+    payload = {"q": "aspirin", "k": {"id": "123"}}
+    token = encode_cursor(payload)
+    assert decode_cursor(token) == payload
+
+
+def test_token_is_opaque_and_url_safe():
+    token = encode_cursor({"k": {"id": "a/b+c"}})
+    assert "id" not in token
+    assert all(c.isalnum() or c in "-_." for c in token)
+
+
+def test_tampered_token_rejected():
+    token = encode_cursor({"k": {"id": "123"}})
+    forged = encode_cursor({"k": {"id": "999"}}).split(".")[0] + "." + token.split(".")[1]
+    with pytest.raises(InvalidCursor, match="signature"):
+        decode_cursor(forged)
+
+
+@pytest.mark.parametrize("token", ["", "garbage", "a.b.c", "!!!.???"])
+def test_malformed_token_rejected(token):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token)
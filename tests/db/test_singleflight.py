@@ -0,0 +1,105 @@
+import asyncio
+import pytest
+from app.db.singleflight import SingleFlight, freeze
+
+
+class Gate:
+    """Call stand-in that blocks until released, counting how often it ran"""
+
+    def __init__(self, result="value"):
+        self.result = result
+        self.calls = 0
+        self.released = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.released.wait()
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+def test_freeze_is_order_insensitive_for_dicts():
+    first = freeze({"Key": {"id": "1"}, "ProjectionExpression": "#p0", "Names": ["a", "b"]})
+    second = freeze({"Names": ["a", "b"], "ProjectionExpression": "#p0", "Key": {"id": "1"}})
+    assert first == second
+    assert hash(first) == hash(second)
+    assert freeze({"Names": ["a", "b"]}) != freeze({"Names": ["b", "a"]})
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    gate = Gate()
+    waiters = [asyncio.create_task(flight.do("key", gate)) for _ in range(5)]
+    await asyncio.sleep(0)
+    gate.released.set()
+    results = await asyncio.gather(*waiters)
+    assert gate.calls == 1
+    assert [value for value, _ in results] == ["value"] * 5
+    assert [shared for _, shared in results] == [False, True, True, True, True]
+    assert flight.stats() == {"calls": 1, "coalesced": 4, "in_flight": 0}
+
+
+@pytest.mark.asyncio
+async def test_different_keys_do_not_share():
+    flight = SingleFlight()
+    gate = Gate()
+    gate.released.set()
+    await asyncio.gather(flight.do("a", gate), flight.do("b", gate))
+    assert gate.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_settled_key_starts_a_fresh_call():
+    flight = SingleFlight()
+    gate = Gate()
+    gate.released.set()
+    await flight.do("key", gate)
+    await flight.do("key", gate)
+    assert gate.calls == 2
+    assert len(flight) == 0
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_caller():
+    flight = SingleFlight()
+    gate = Gate(result=RuntimeError("throttled"))
+    waiters = [asyncio.create_task(flight.do("key", gate)) for _ in range(3)]
+    await asyncio.sleep(0)
+    gate.released.set()
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+    assert gate.calls == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(flight) == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelling_one_caller_leaves_the_others_waiting():
+    flight = SingleFlight()
+    gate = Gate()
+    first = asyncio.create_task(flight.do("key", gate))
+    second = asyncio.create_task(flight.do("key", gate))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    gate.released.set()
+    assert await second == ("value", True)
+    assert first.cancelled()
+    assert gate.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_call_finishes_when_every_caller_is_cancelled():
+    flight = SingleFlight()
+    gate = Gate(result=RuntimeError("nobody listening"))
+    waiter = asyncio.create_task(flight.do("key", gate))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert len(flight) == 1
+    gate.released.set()
+    for _ in range(3):
+        await asyncio.sleep(0)
+    assert len(flight) == 0
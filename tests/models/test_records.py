@@ -0,0 +1,48 @@
+from app.models.records import InteractionRecord, Severity
+from app.models.schemas import InteractionResponse
+
+ITEM = {
+    "id": "1",
+    "medication1": "aspirin",
+    "medication2": "warfarin",
+    "severity": "high",
+    "description": "Increased risk of bleeding",
+    "created_at": "2024-01-01T00:00:00Z",
+    "updated_at": "2024-01-01T00:00:00Z"
+}
+
+
+def test_from_item_interns_severity_and_names():
+    first = InteractionRecord.from_item(ITEM)
+    second = InteractionRecord.from_item(dict(ITEM, id="2", medication1="".join(["asp", "irin"])))
+    assert first.severity is Severity.HIGH
+    assert first.medication1 is second.medication1
+
+
+def test_record_is_slotted():
+    assert not hasattr(InteractionRecord.from_item(ITEM), "__dict__")
+
+
+def test_to_response_matches_validated_model():
+    assert InteractionRecord.from_item(ITEM).to_response() == InteractionResponse(**ITEM)
+
+
+def test_with_sources():
+    record = InteractionRecord.from_item(ITEM).with_sources(("excedrin", "warfarin"))
+    response = record.to_response()
+    assert response.source_medications == ["excedrin", "warfarin"]
+    assert response.model_dump_json() == InteractionResponse(
+        **ITEM, source_medications=["excedrin", "warfarin"]
+    ).model_dump_json()
+
+
+def test_to_response_builds_a_model_per_call():
+    record = InteractionRecord.from_item(ITEM)
+    response = record.to_response()
+    assert response is not record.to_response()
+    assert type(response.severity) is str
+    # Copies carry their own sources
+    sourced = record.with_sources(("excedrin",))
+    assert sourced.to_response().source_medications == ["excedrin"]
+    assert record.to_response().source_medications is None
+    assert sourced == record.with_sources(("excedrin",))
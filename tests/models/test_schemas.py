@@ -7,11 +7,13 @@ from app.models.schemas import (
     InteractionResponse,
     InteractionCheckRequest,
     InteractionCheckResponse,
+    InteractionBatchCheckRequest,
     MedicationBase,
     MedicationCreate,
     MedicationResponse,
     MedicationListResponse
 )
+from app.config import settings
 
 def test_interaction_base_validation():
     # Test valid data
@@ -101,6 +103,24 @@ def test_interaction_check_request():
         InteractionCheckRequest(medications=["Drug A", "Drug A"])
     assert "Duplicate medications are not allowed" in str(exc_info.value)
 
+    # Test spellings of the same medication
+    with pytest.raises(ValidationError) as exc_info:
+        InteractionCheckRequest(medications=["Aspirin", " aspirin", "Warfarin"])
+    assert "Duplicate medications are not allowed" in str(exc_info.value)
+    with pytest.raises(ValidationError) as exc_info:
+        InteractionCheckRequest(medications=["Aspirin", "ASA"])
+    assert "Duplicate medications are not allowed" in str(exc_info.value)
+
+    # Test blank names
+    with pytest.raises(ValidationError) as exc_info:
+        InteractionCheckRequest(medications=["Aspirin", "   "])
+    assert "Medication names must not be blank" in str(exc_info.value)
+
+def test_interaction_create_rejects_same_medication():
+    with pytest.raises(ValidationError) as exc_info:
+        InteractionCreate(medication1="Aspirin", medication2="ASA", severity="high", description="Test")
+    assert "must be different medications" in str(exc_info.value)
+
 def test_interaction_check_response():
     now = datetime.now(UTC).isoformat()
     data = {
@@ -124,6 +144,15 @@ def test_interaction_check_response():
     assert response.interactions[0].severity == "high"
     assert response.has_interactions is True
 
+def test_interaction_batch_check_request():
+    request = InteractionBatchCheckRequest(regimens=[{"medications": ["Aspirin", "Warfarin"]}])
+    assert request.regimens[0].medications == ["Aspirin", "Warfarin"]
+    with pytest.raises(ValidationError):
+        InteractionBatchCheckRequest(regimens=[])
+    too_many = [{"medications": ["a", "b"]}] * (settings.INTERACTION_BATCH_MAX_REGIMENS + 1)
+    with pytest.raises(ValidationError):
+        InteractionBatchCheckRequest(regimens=too_many)
+
 def test_medication_base_validation():
     """Test MedicationBase validation"""
     # Valid data
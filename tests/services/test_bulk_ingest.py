@@ -0,0 +1,109 @@
+import io
+import json
+import boto3
+import pytest
+from moto import mock_aws
+from unittest.mock import AsyncMock
+from app.config import settings
+from app.db.dynamo import DynamoDB
+from app.services.bulk_ingest import IngestReport, bulk_ingest, chunked, read_rows, validate_rows
+
+CSV_INPUT = """medication1,medication2,severity,description
+Warfarin,Aspirin,high,Increased bleeding risk
+Lisinopril,Ibuprofen,medium,Reduced blood pressure control
+ASA,warfarin,low,Same pair under another name
+Metformin,Contrast Dye,severe,Not a valid severity
+Simvastatin,Grapefruit
+"""
+
+@pytest.fixture
+def local_table():
+    """Interactions table in an in-process DynamoDB stand-in"""
+    with mock_aws():
+        boto3.client("dynamodb", region_name=settings.AWS_REGION).create_table(
+            TableName=settings.DYNAMODB_TABLE,
+            KeySchema=[
+                {"AttributeName": "medication1", "KeyType": "HASH"},
+                {"AttributeName": "medication2", "KeyType": "RANGE"}
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "medication1", "AttributeType": "S"},
+                {"AttributeName": "medication2", "AttributeType": "S"}
+            ],
+            BillingMode="PAY_PER_REQUEST"
+        )
+        db = DynamoDB()
+        yield db
+        db.close()
+
+def test_read_rows_csv():
+    rows = list(read_rows(io.StringIO(CSV_INPUT), "csv"))
+    assert rows[0] == (2, {
+        "medication1": "Warfarin",
+        "medication2": "Aspirin",
+        "severity": "high",
+        "description": "Increased bleeding risk"
+    })
+    assert len(rows) == 5
+
+def test_read_rows_jsonl_reports_bad_lines():
+    source = io.StringIO('{"medication1": "A"}\n\nnot json\n')
+    rows = list(read_rows(source, "jsonl"))
+    assert rows[0] == (1, {"medication1": "A"})
+    assert rows[1][0] == 3
+    assert rows[1][1]["__error__"].startswith("Invalid JSON")
+
+def test_read_rows_unknown_format():
+    with pytest.raises(ValueError, match="Input format must be one of"):
+        list(read_rows(io.StringIO(""), "xml"))
+
+def test_validate_rows_canonicalizes_and_rejects():
+    report = IngestReport()
+    items = list(validate_rows(read_rows(io.StringIO(CSV_INPUT), "csv"), report))
+    assert [(item["medication1"], item["medication2"]) for item in items] == [
+        ("aspirin", "warfarin"),
+        ("ibuprofen", "lisinopril")
+    ]
+    assert all(item["id"] and item["created_at"] for item in items)
+    rejected_lines = [line for line, _ in report.rejected]
+    assert rejected_lines == [4, 5, 6]
+    assert report.rejected[0][1] == "Duplicate pair aspirin / warfarin"
+    assert "Severity must be one of" in report.rejected[1][1]
+    assert report.rejected[2][1].startswith("severity:")
+
+def test_validate_rows_rejects_surplus_csv_fields():
+    source = io.StringIO("medication1,medication2,severity,description\nA,B,low,desc,extra\n")
+    report = IngestReport()
+    assert list(validate_rows(read_rows(source, "csv"), report)) == []
+    assert report.rejected == [(2, "Row has more fields than the header")]
+
+def test_chunked():
+    assert [len(chunk) for chunk in chunked(range(60))] == [25, 25, 10]
+
+@pytest.mark.asyncio
+async def test_bulk_ingest_writes_to_table(local_table):
+    """Test a JSONL load lands in DynamoDB with pairs sorted"""
+    lines = [
+        json.dumps({
+            "medication1": f"drug-{i:03d}",
+            "medication2": "aspirin",
+            "severity": "low",
+            "description": "test"
+        })
+        for i in range(120)
+    ]
+    report = await bulk_ingest(io.StringIO("\n".join(lines)), "jsonl", db=local_table, workers=3)
+    assert report.written == 120
+    assert report.rejected == []
+    assert report.rows_per_second > 0
+    item = await local_table.get_item({"medication1": "aspirin", "medication2": "drug-007"})
+    assert item["severity"] == "low"
+    response = await local_table.scan()
+    assert response["Count"] == 120
+
+@pytest.mark.asyncio
+async def test_bulk_ingest_propagates_write_errors():
+    db = AsyncMock(spec=DynamoDB)
+    db.batch_write_item.side_effect = Exception("Error batch writing items: throttled")
+    with pytest.raises(Exception, match="throttled"):
+        await bulk_ingest(io.StringIO(CSV_INPUT), "csv", db=db, workers=2)
@@ -0,0 +1,33 @@
+import pytest
+from unittest.mock import AsyncMock
+from app.services.ingredients import IngredientIndex
+from app.services.normalization import NameResolver
+
+
+@pytest.fixture
+def index():
+    index = IngredientIndex(NameResolver())
+    index.add("Excedrin", "Acetaminophen/Aspirin/Caffeine", ["Acetaminophen", "ASA", "Caffeine"])
+    index.add("Tylenol", "Acetaminophen", ["acetaminophen"])
+    return index
+
+def test_expand_combination_product(index):
+    assert index.expand("excedrin") == ("acetaminophen", "aspirin", "caffeine")
+    assert index.expand("acetaminophen/aspirin/caffeine") == ("acetaminophen", "aspirin", "caffeine")
+
+def test_single_ingredient_products_are_not_stored(index):
+    assert len(index) == 2
+    assert index.expand("tylenol") == ("tylenol",)
+    assert index.expand("warfarin") == ("warfarin",)
+
+@pytest.mark.asyncio
+async def test_load_from_catalog():
+    index = IngredientIndex(NameResolver())
+    db = AsyncMock()
+    db.scan.return_value = {"Items": [
+        {"id": "1", "name": "Vicodin", "generic_name": "Hydrocodone/APAP", "active_ingredients": ["Hydrocodone", "APAP"]},
+        {"medication1": "aspirin", "medication2": "warfarin"}
+    ]}
+    await index.load(db)
+    assert index.loaded
+    assert index.expand("vicodin") == ("hydrocodone", "acetaminophen")
@@ -0,0 +1,171 @@
+import pytest
+from unittest.mock import AsyncMock
+from app.services.interaction_graph import InteractionGraph
+from app.services.normalization import NameResolver
+from app.models.records import InteractionRecord
+
+
+def make_item(med1, med2, updated_at="2024-01-01T00:00:00+00:00", **overrides):
+    item = {
+        "id": f"{med1}-{med2}",
+        "medication1": med1,
+        "medication2": med2,
+        "severity": "high",
+        "description": f"{med1} interacts with {med2}",
+        "created_at": "2024-01-01T00:00:00+00:00",
+        "updated_at": updated_at
+    }
+    item.update(overrides)
+    return item
+
+
+@pytest.fixture
+def mock_db():
+    """Mock DynamoDB whose scan returns two pages"""
+    mock = AsyncMock()
+    mock.scan.side_effect = [
+        {"Items": [make_item("Aspirin", "Warfarin")], "LastEvaluatedKey": {"medication1": "Aspirin"}},
+        {"Items": [make_item("Vitamin K", "Warfarin", updated_at="2024-02-01T00:00:00+00:00")]}
+    ]
+    return mock
+
+
+@pytest.mark.asyncio
+async def test_load_follows_pagination(mock_db):
+    graph = InteractionGraph()
+    await graph.load(mock_db)
+    assert graph.loaded
+    assert len(graph) == 2
+    assert mock_db.scan.call_count == 2
+    mock_db.scan.assert_called_with(exclusive_start_key={"medication1": "Aspirin"})
+
+
+@pytest.mark.asyncio
+async def test_check_uses_normalized_names(mock_db):
+    graph = InteractionGraph()
+    await graph.load(mock_db)
+    result = graph.check(["  ASPIRIN ", "warfarin", "Ibuprofen"])
+    assert [i.id for i in result] == ["Aspirin-Warfarin"]
+    assert isinstance(result[0], InteractionRecord)
+
+
+@pytest.mark.asyncio
+async def test_check_resolves_synonyms(mock_db):
+    resolver = NameResolver()
+    resolver.add_medication("Coumadin", "Warfarin")
+    graph = InteractionGraph(resolver=resolver)
+    await graph.load(mock_db)
+    assert [i.id for i in graph.check(["ASA", "Coumadin"])] == ["Aspirin-Warfarin"]
+
+
+@pytest.mark.asyncio
+async def test_check_returns_pair_order(mock_db):
+    graph = InteractionGraph()
+    await graph.load(mock_db)
+    result = graph.check(["Vitamin K", "Aspirin", "Warfarin"])
+    assert [i.id for i in result] == ["Vitamin K-Warfarin", "Aspirin-Warfarin"]
+
+
+def test_check_no_interactions():
+    graph = InteractionGraph()
+    assert graph.check(["aspirin", "ibuprofen"]) == []
+
+
+def test_add_bumps_version_and_etag():
+    graph = InteractionGraph()
+    etag = graph.etag
+    graph.add(InteractionRecord.from_item(make_item("Aspirin", "Warfarin")))
+    assert graph.version == 1
+    assert graph.etag != etag
+    assert len(graph.check(["warfarin", "aspirin"])) == 1
+
+
+def test_add_replaces_existing_pair():
+    graph = InteractionGraph()
+    graph.add(InteractionRecord.from_item(make_item("Aspirin", "Warfarin")))
+    graph.add(InteractionRecord.from_item(make_item("Aspirin", "Warfarin", description="Updated")))
+    assert len(graph) == 1
+    assert graph.check(["aspirin", "warfarin"])[0].description == "Updated"
+
+
+@pytest.mark.asyncio
+async def test_refresh_scans_from_watermark(mock_db):
+    graph = InteractionGraph()
+    await graph.load(mock_db)
+    version = graph.version
+    mock_db.scan.side_effect = None
+    mock_db.scan.return_value = {
+        "Items": [make_item("Ibuprofen", "Lisinopril", updated_at="2024-03-01T00:00:00+00:00")]
+    }
+    applied = await graph.refresh(mock_db)
+    assert applied == 1
+    assert graph.version == version + 1
+    mock_db.scan.assert_called_with(
+        exclusive_start_key=None,
+        filter_expression="#updated_at > :since",
+        expression_attribute_names={"#updated_at": "updated_at"},
+        expression_values={":since": "2024-01-31T23:59:30+00:00"}
+    )
+    assert len(graph.check(["lisinopril", "ibuprofen"])) == 1
+
+
+class FakeTable:
+    """Interactions table whose scan applies refresh's updated_at filter"""
+
+    def __init__(self, *items):
+        self.items = list(items)
+
+    async def scan(self, exclusive_start_key=None, expression_values=None, **_):
+        since = (expression_values or {}).get(":since", "")
+        return {"Items": [item for item in self.items if item["updated_at"] > since]}
+
+
+@pytest.mark.asyncio
+async def test_local_write_does_not_skip_earlier_remote_rows():
+    table = FakeTable(make_item("A", "B", updated_at="2024-01-01T00:00:00+00:00"))
+    graph = InteractionGraph(result_cache=AsyncMock())
+    await graph.load(table)
+    # Another instance writes c/d, then this one creates e/f before refreshing
+    table.items.append(make_item("C", "D", updated_at="2024-01-01T00:01:00+00:00"))
+    local = make_item("E", "F", updated_at="2024-01-01T00:02:00+00:00")
+    table.items.append(local)
+    graph.add(InteractionRecord.from_item(local))
+    assert await graph.refresh(table) == 1
+    assert len(graph.check(["c", "d"])) == 1
+    # Rows already applied are not counted again
+    assert await graph.refresh(table) == 0
+
+
+@pytest.mark.asyncio
+async def test_refresh_catches_rows_stamped_behind_the_watermark():
+    table = FakeTable(make_item("A", "B", updated_at="2024-01-01T00:01:00+00:00"))
+    graph = InteractionGraph(result_cache=AsyncMock(), lookback_seconds=30)
+    await graph.load(table)
+    # A writer whose clock lags lands a row older than the newest one seen
+    table.items.append(make_item("C", "D", updated_at="2024-01-01T00:00:45+00:00"))
+    assert await graph.refresh(table) == 1
+    assert len(graph.check(["c", "d"])) == 1
+
+
+@pytest.mark.asyncio
+async def test_refresh_loads_when_not_loaded(mock_db):
+    graph = InteractionGraph()
+    applied = await graph.refresh(mock_db)
+    assert graph.loaded
+    assert applied == 2
+
+
+@pytest.mark.asyncio
+async def test_refresh_invalidates_cached_results_only_when_rows_changed(mock_db):
+    result_cache = AsyncMock()
+    graph = InteractionGraph(result_cache=result_cache)
+    await graph.load(mock_db)
+    mock_db.scan.side_effect = None
+    mock_db.scan.return_value = {"Items": []}
+    await graph.refresh(mock_db)
+    result_cache.bump_version.assert_not_awaited()
+    mock_db.scan.return_value = {
+        "Items": [make_item("Ibuprofen", "Lisinopril", updated_at="2024-03-01T00:00:00+00:00")]
+    }
+    await graph.refresh(mock_db)
+    result_cache.bump_version.assert_awaited_once()
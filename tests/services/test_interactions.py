@@ -1,7 +1,13 @@
+import asyncio
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
 from datetime import datetime, UTC
+from app import metrics
 from app.services.interactions import InteractionService, interaction_service
+from app.services.interaction_graph import InteractionGraph
+from app.services.ingredients import IngredientIndex
+from app.services.normalization import NameResolver
+from app.models.records import InteractionRecord
 from app.models.schemas import InteractionCreate, InteractionResponse
 
 
@@ -100,6 +106,251 @@ class TestInteractionService:
                 {":med1": "aspirin", ":med2": "ibuprofen"}
             )
 
+    @pytest.mark.asyncio
+    async def test_check_interactions_batch_mode_single_round_trip(self, sample_interaction_data):
+        """Test that batch mode resolves every pair with one batch_get_item call"""
+        service = InteractionService(lookup_mode="batch")
+        with patch("app.services.interactions.db") as mock_db:
+            mock_db.batch_get_item = AsyncMock(return_value=[sample_interaction_data])
+            result = await service.check_interactions(["ibuprofen", "aspirin", "acetaminophen"])
+            mock_db.batch_get_item.assert_awaited_once_with([
+                {"medication1": "aspirin", "medication2": "ibuprofen"},
+                {"medication1": "acetaminophen", "medication2": "ibuprofen"},
+                {"medication1": "acetaminophen", "medication2": "aspirin"}
+            ])
+            mock_db.query.assert_not_called()
+            assert len(result) == 1
+            assert isinstance(result[0], InteractionResponse)
+            assert result[0].medication1 == "aspirin"
+
+    @pytest.mark.asyncio
+    async def test_check_interactions_batch_mode_preserves_pair_order(self, sample_interaction_data):
+        """Test that batch results are returned in pair order, not response order"""
+        service = InteractionService(lookup_mode="batch")
+        other = dict(sample_interaction_data, id="other", medication1="acetaminophen", medication2="aspirin")
+        with patch("app.services.interactions.db") as mock_db:
+            mock_db.batch_get_item = AsyncMock(return_value=[other, sample_interaction_data])
+            result = await service.check_interactions(["aspirin", "ibuprofen", "acetaminophen"])
+            assert [r.id for r in result] == ["test-interaction-id", "other"]
+
+    @pytest.mark.asyncio
+    async def test_check_interactions_batch_mode_no_pairs(self):
+        """Test that batch mode skips the database when there are no pairs"""
+        service = InteractionService(lookup_mode="batch")
+        with patch("app.services.interactions.db") as mock_db:
+            result = await service.check_interactions(["aspirin"])
+            assert result == []
+            mock_db.batch_get_item.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_check_interactions_batch_dedupes_pairs(self, sample_interaction_data):
+        """Test that pairs shared between regimens are fetched once"""
+        service = InteractionService()
+        with patch("app.services.interactions.db") as mock_db:
+            mock_db.batch_get_item = AsyncMock(return_value=[sample_interaction_data])
+            results, unique_pairs = await service.check_interactions_batch([
+                ["ibuprofen", "aspirin"],
+                ["aspirin", "ibuprofen", "warfarin"],
+                ["warfarin", "aspirin"]
+            ])
+            mock_db.batch_get_item.assert_awaited_once_with([
+                {"medication1": "aspirin", "medication2": "ibuprofen"},
+                {"medication1": "aspirin", "medication2": "warfarin"},
+                {"medication1": "ibuprofen", "medication2": "warfarin"}
+            ])
+            mock_db.query.assert_not_called()
+        assert unique_pairs == 3
+        assert [[r.id for r in result] for result in results] == [
+            ["test-interaction-id"],
+            ["test-interaction-id"],
+            []
+        ]
+
+    @pytest.mark.asyncio
+    async def test_check_interactions_batch_uses_loaded_graph(self, sample_interaction_data):
+        graph = InteractionGraph()
+        graph.add(InteractionRecord.from_item(sample_interaction_data))
+        graph.loaded = True
+        service = InteractionService(graph=graph)
+        with patch("app.services.interactions.db") as mock_db:
+            results, unique_pairs = await service.check_interactions_batch([
+                ["Aspirin", "Ibuprofen"],
+                ["aspirin", "warfarin"]
+            ])
+            mock_db.batch_get_item.assert_not_called()
+        assert [len(result) for result in results] == [1, 0]
+        assert unique_pairs == 2
+
+    @pytest.mark.asyncio
+    async def test_iter_interactions_batch_mode_streams_chunks(self, sample_interaction_data):
+        """Test that batch mode yields after each BatchGetItem chunk"""
+        service = InteractionService(lookup_mode="batch")
+        medications = [f"drug-{i:02d}" for i in range(16)]
+        found = dict(sample_interaction_data, medication1="drug-00", medication2="drug-01")
+        with patch("app.services.interactions.db") as mock_db:
+            mock_db.batch_get_item = AsyncMock(side_effect=[[found], []])
+            stream = service.iter_interactions(medications)
+            first = await stream.__anext__()
+            assert mock_db.batch_get_item.await_count == 1
+            assert first.id == "test-interaction-id"
+            assert [interaction async for interaction in stream] == []
+            chunk_sizes = [len(call.args[0]) for call in mock_db.batch_get_item.await_args_list]
+            assert chunk_sizes == [100, 20]
+
+    @pytest.mark.asyncio
+    async def test_iter_interactions_query_mode(self, interaction_service_instance, sample_interaction_data):
+        with patch("app.services.interactions.db") as mock_db:
+            mock_db.query = AsyncMock(return_value={"Items": [sample_interaction_data]})
+            result = [i async for i in interaction_service_instance.iter_interactions(["aspirin", "ibuprofen"])]
+        assert [i.id for i in result] == ["test-interaction-id"]
+
+    @pytest.mark.asyncio
+    async def test_iter_interactions_batch_matches_check(self, sample_interaction_data):
+        """Test that streamed regimens match the buffered results and fetch pairs once"""
+        regimens = [["ibuprofen", "aspirin"], ["aspirin", "warfarin"], ["aspirin", "ibuprofen"]]
+        service = InteractionService()
+        with patch("app.services.interactions.db") as mock_db, \
+             patch("app.services.interactions.BATCH_GET_CHUNK_SIZE", 1):
+            mock_db.batch_get_item = AsyncMock(side_effect=lambda keys: [
+                sample_interaction_data for key in keys if key["medication2"] == "ibuprofen"
+            ])
+            streamed = [item async for item in service.iter_interactions_batch(regimens)]
+            fetched = [key for call in mock_db.batch_get_item.await_args_list for key in call.args[0]]
+        assert [index for index, _ in streamed] == [0, 1, 2]
+        assert [[i.id for i in interactions] for _, interactions in streamed] == [
+            ["test-interaction-id"], [], ["test-interaction-id"]
+        ]
+        assert len(fetched) == 2
+
+    @pytest.mark.asyncio
+    async def test_check_interactions_resolves_spellings(self, sample_interaction_data):
+        """Test that variant spellings are queried once, under the canonical key"""
+        service = InteractionService(lookup_mode="batch")
+        with patch("app.services.interactions.db") as mock_db:
+            mock_db.batch_get_item = AsyncMock(return_value=[dict(sample_interaction_data, medication2="warfarin")])
+            result = await service.check_interactions(["ASA", "Warfarin ", "ASPIRIN"])
+            mock_db.batch_get_item.assert_awaited_once_with([
+                {"medication1": "aspirin", "medication2": "warfarin"}
+            ])
+        assert len(result) == 1
+
+    @pytest.mark.asyncio
+    async def test_create_interaction_stores_canonical_names(self):
+        service = InteractionService()
+        interaction = InteractionCreate(
+            medication1="Warfarin",
+            medication2="ASA",
+            severity="high",
+            description="Increased risk of bleeding"
+        )
+        with patch("app.services.interactions.db") as mock_db:
+            mock_db.put_item = AsyncMock()
+            result = await service.create_interaction(interaction)
+        assert (result.medication1, result.medication2) == ("aspirin", "warfarin")
+
+    @pytest.fixture
+    def ingredients(self):
+        ingredients = IngredientIndex(NameResolver())
+        ingredients.add("Excedrin", "Acetaminophen/Aspirin/Caffeine", ["acetaminophen", "aspirin", "caffeine"])
+        ingredients.loaded = True
+        return ingredients
+
+    @pytest.mark.asyncio
+    async def test_check_interactions_expands_ingredients(self, sample_interaction_data, ingredients):
+        """Test that a combination product is checked through its ingredients in one round trip"""
+        service = InteractionService(lookup_mode="query", ingredients=ingredients)
+        aspirin_warfarin = dict(sample_interaction_data, medication2="warfarin")
+        with patch("app.services.interactions.db") as mock_db:
+            mock_db.batch_get_item = AsyncMock(return_value=[aspirin_warfarin])
+            result = await service.check_interactions(["Excedrin", "Warfarin"])
+            mock_db.batch_get_item.assert_awaited_once_with([
+                {"medication1": "excedrin", "medication2": "warfarin"},
+                {"medication1": "acetaminophen", "medication2": "warfarin"},
+                {"medication1": "aspirin", "medication2": "warfarin"},
+                {"medication1": "caffeine", "medication2": "warfarin"}
+            ])
+            mock_db.query.assert_not_called()
+        assert len(result) == 1
+        assert (result[0].medication1, result[0].medication2) == ("aspirin", "warfarin")
+        assert result[0].source_medications == ["excedrin", "warfarin"]
+
+    @pytest.mark.asyncio
+    async def test_check_interactions_expansion_dedupes_per_product_pair(self, sample_interaction_data, ingredients):
+        """Test that a direct hit and one through ingredients are reported per product pair"""
+        service = InteractionService(lookup_mode="batch", ingredients=ingredients)
+        aspirin_warfarin = dict(sample_interaction_data, medication2="warfarin")
+        with patch("app.services.interactions.db") as mock_db:
+            mock_db.batch_get_item = AsyncMock(return_value=[aspirin_warfarin])
+            result = await service.check_interactions(["Aspirin", "Excedrin", "Warfarin"])
+            keys = mock_db.batch_get_item.await_args.args[0]
+        assert len(keys) == len({tuple(key.values()) for key in keys})
+        assert [(r.medication1, r.medication2, r.source_medications) for r in result] == [
+            ("aspirin", "warfarin", None),
+            ("aspirin", "warfarin", ["excedrin", "warfarin"])
+        ]
+
+    @pytest.mark.asyncio
+    async def test_check_interactions_expansion_uses_loaded_graph(self, sample_interaction_data, ingredients):
+        graph = InteractionGraph()
+        graph.add(InteractionRecord.from_item(dict(sample_interaction_data, medication2="warfarin")))
+        graph.loaded = True
+        service = InteractionService(graph=graph, ingredients=ingredients)
+        with patch("app.services.interactions.db") as mock_db:
+            result = await service.check_interactions(["Excedrin", "Warfarin"])
+            mock_db.batch_get_item.assert_not_called()
+            mock_db.query.assert_not_called()
+        assert result[0].source_medications == ["excedrin", "warfarin"]
+
+    def test_invalid_lookup_mode(self):
+        """Test that unknown lookup modes are rejected"""
+        with pytest.raises(ValueError, match="Lookup mode must be one of"):
+            InteractionService(lookup_mode="scan")
+
+    @pytest.mark.asyncio
+    async def test_check_interactions_uses_loaded_graph(self, sample_interaction_data):
+        """Test that a loaded graph answers without touching the database"""
+        graph = InteractionGraph()
+        graph.add(InteractionRecord.from_item(sample_interaction_data))
+        graph.loaded = True
+        service = InteractionService(graph=graph)
+        with patch("app.services.interactions.db") as mock_db:
+            result = await service.check_interactions(["Ibuprofen", "Aspirin"])
+            assert len(result) == 1
+            mock_db.query.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_check_records_returns_the_graphs_records(self, sample_interaction_data):
+        """Test that the check route's records come straight from the graph, unconverted"""
+        record = InteractionRecord.from_item(sample_interaction_data)
+        graph = InteractionGraph()
+        graph.add(record)
+        graph.loaded = True
+        service = InteractionService(graph=graph)
+        assert (await service.check_records(["Ibuprofen", "Aspirin"]))[0] is record
+        assert await service.check_interactions(["Ibuprofen", "Aspirin"]) == [record.to_response()]
+
+    @pytest.mark.asyncio
+    async def test_create_interaction_patches_loaded_graph(self, sample_interaction_create):
+        """Test that writes are visible in the graph immediately"""
+        graph = InteractionGraph()
+        graph.loaded = True
+        service = InteractionService(graph=graph)
+        with patch("app.services.interactions.db") as mock_db:
+            mock_db.put_item = AsyncMock()
+            result = await service.create_interaction(sample_interaction_create)
+        assert graph.version == 1
+        assert graph.check(["aspirin", "ibuprofen"])[0].to_response() == result
+
+    @pytest.mark.asyncio
+    async def test_create_interaction_bumps_result_cache_version(self, sample_interaction_create):
+        result_cache = MagicMock()
+        result_cache.bump_version = AsyncMock()
+        service = InteractionService(result_cache=result_cache)
+        with patch("app.services.interactions.db") as mock_db:
+            mock_db.put_item = AsyncMock()
+            await service.create_interaction(sample_interaction_create)
+        result_cache.bump_version.assert_awaited_once()
+
     @pytest.mark.asyncio
     async def test_create_interaction_success(self, interaction_service_instance, sample_interaction_create):
         """Test creating a new interaction successfully"""
@@ -192,4 +443,73 @@ class TestInteractionService:
             mock_db.put_item.side_effect = Exception("Database error")
             
             with pytest.raises(Exception, match="Database error"):
-                await interaction_service_instance.create_interaction(sample_interaction_create) 
\ No newline at end of file
+                await interaction_service_instance.create_interaction(sample_interaction_create) 
+    @pytest.mark.asyncio
+    async def test_parallel_mode_bounds_concurrency_and_keeps_order(self, sample_interaction_data):
+        """Test that parallel lookups overlap up to the limit and come back in pair order"""
+        in_flight = 0
+        peak = 0
+
+        async def query(condition, values):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            # Later pairs finish first
+            await asyncio.sleep(0.01 if values[":med1"] == "a" else 0)
+            in_flight -= 1
+            return {"Items": [dict(sample_interaction_data, medication1=values[":med1"], medication2=values[":med2"])]}
+
+        service = InteractionService(lookup_mode="parallel", lookup_concurrency=3)
+        lookups = metrics.INTERACTION_LOOKUP_FANOUT.count()
+        with patch("app.services.interactions.db") as mock_db:
+            mock_db.query.side_effect = query
+            result = await service.check_interactions(["a", "b", "c", "d", "e"])
+            mock_db.batch_get_item.assert_not_called()
+        assert metrics.INTERACTION_LOOKUP_FANOUT.count() == lookups + 1
+        assert [(r.medication1, r.medication2) for r in result] == [
+            ("a", "b"), ("a", "c"), ("a", "d"), ("a", "e"),
+            ("b", "c"), ("b", "d"), ("b", "e"), ("c", "d"), ("c", "e"), ("d", "e")
+        ]
+        assert peak == 3
+
+    @pytest.mark.asyncio
+    async def test_parallel_mode_queries_batch_checks(self):
+        """Test that parallel mode answers batch checks without BatchGetItem"""
+        service = InteractionService(lookup_mode="parallel")
+        with patch("app.services.interactions.db") as mock_db:
+            mock_db.query = AsyncMock(return_value={"Items": []})
+            results, unique_pairs = await service.check_interactions_batch([["a", "b"], ["b", "a", "c"]])
+            mock_db.batch_get_item.assert_not_called()
+        assert mock_db.query.await_count == unique_pairs == 3
+        assert results == [[], []]
+
+    @pytest.mark.asyncio
+    async def test_parallel_mode_cancels_pending_queries(self):
+        """Test that a failed or cancelled check leaves no queries running"""
+        started = []
+        finished = []
+
+        async def query(condition, values):
+            started.append(values[":med1"])
+            if values[":med1"] == "a":
+                raise Exception("Database error")
+            await asyncio.sleep(1)
+            finished.append(values[":med1"])
+            return {"Items": []}
+
+        service = InteractionService(lookup_mode="parallel", lookup_concurrency=10)
+        with patch("app.services.interactions.db") as mock_db:
+            mock_db.query.side_effect = query
+            with pytest.raises(Exception, match="Database error"):
+                await service.check_interactions(["a", "b", "c", "d"])
+
+            started.clear()
+            mock_db.query.side_effect = lambda condition, values: asyncio.sleep(1)
+            check = asyncio.create_task(service.check_interactions(["b", "c", "d"]))
+            await asyncio.sleep(0.01)
+            check.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await check
+        assert finished == []
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        assert tasks == []
@@ -1,8 +1,16 @@
+import json
+import asyncio
+import boto3
 import pytest
+from moto import mock_aws
 from unittest.mock import AsyncMock, patch
 from datetime import datetime, UTC
-from app.services.medications import MedicationService
-from app.models.schemas import MedicationResponse
+from app.config import settings
+from app.db.dynamo import DynamoDB
+from app.services.medications import MedicationService, count_cache, medication_cache, COUNTER_KEY
+from app.services.search_index import MedicationSearchIndex
+from app.db.pagination import InvalidCursor
+from app.models.schemas import MedicationCreate, MedicationResponse
 
 @pytest.fixture
 def mock_db():
@@ -10,6 +18,18 @@ def mock_db():
     mock = AsyncMock()
     return mock
 
+@pytest.fixture(autouse=True)
+def clear_count_cache():
+    count_cache.clear()
+    yield
+    count_cache.clear()
+
+@pytest.fixture(autouse=True)
+def clear_medication_cache():
+    medication_cache.clear()
+    yield
+    medication_cache.clear()
+
 @pytest.fixture
 def medication_service(mock_db):
     """Medication service instance with mocked DB"""
@@ -20,7 +40,7 @@ def medication_service(mock_db):
 @pytest.mark.asyncio
 async def test_list_medications_no_search(medication_service, mock_db):
     """Test listing medications without search"""
-    mock_db.query.return_value = {
+    mock_db.scan.return_value = {
         "Items": [
             {
                 "id": "1",
@@ -37,9 +57,9 @@ async def test_list_medications_no_search(medication_service, mock_db):
         ],
         "Count": 1
     }
-    medications, total, has_more = await medication_service.list_medications()
-    mock_db.query.assert_any_call(limit=51)
-    mock_db.query.assert_any_call(select="COUNT")
+    medications, total, has_more, next_cursor, approximate_total = await medication_service.list_medications()
+    mock_db.scan.assert_any_call(limit=51)
+    mock_db.scan.assert_any_call(select="COUNT")
     assert len(medications) == 1
     assert medications[0].id == "1"
     assert medications[0].name == "Test Med"
@@ -48,7 +68,7 @@ async def test_list_medications_no_search(medication_service, mock_db):
 @pytest.mark.asyncio
 async def test_list_medications_with_search(medication_service, mock_db):
     """Test listing medications with search"""
-    mock_db.query.return_value = {
+    mock_db.scan.return_value = {
         "Items": [
             {
                 "id": "1",
@@ -65,26 +85,30 @@ async def test_list_medications_with_search(medication_service, mock_db):
         ],
         "Count": 1
     }
-    medications, total, has_more = await medication_service.list_medications(search="aspirin")
-    mock_db.query.assert_any_call(
+    medications, total, has_more, next_cursor, approximate_total = await medication_service.list_medications(search="aspirin")
+    mock_db.scan.assert_called_once_with(
         limit=51,
         filter_expression="contains(#name, :search) OR contains(#generic_name, :search)",
-        expression_attribute_names={"#name": "name", "#generic_name": "generic_name"},
-        expression_attribute_values={":search": "aspirin"}
+        expression_attribute_names={"#name": "name_normalized", "#generic_name": "generic_name_normalized"},
+        expression_values={":search": "aspirin"}
     )
-    mock_db.query.assert_any_call(
+    # The total is counted off the request path
+    assert total is None and approximate_total
+    await asyncio.gather(*medication_service._counting.values())
+    mock_db.scan.assert_any_call(
         select="COUNT",
         filter_expression="contains(#name, :search) OR contains(#generic_name, :search)",
-        expression_attribute_names={"#name": "name", "#generic_name": "generic_name"},
-        expression_attribute_values={":search": "aspirin"}
+        expression_attribute_names={"#name": "name_normalized", "#generic_name": "generic_name_normalized"},
+        expression_values={":search": "aspirin"}
     )
     assert len(medications) == 1
     assert medications[0].name == "Aspirin"
     assert not has_more
+    assert count_cache.get("aspirin") == 1
 
 @pytest.mark.asyncio
 async def test_list_medications_with_pagination(medication_service, mock_db):
-    mock_db.query.return_value = {
+    mock_db.scan.return_value = {
         "Items": [
             {"id": str(i), "name": f"Med {i}", "generic_name": f"Generic {i}",
              "description": f"Description {i}", "dosage_forms": ["tablet"],
@@ -95,8 +119,8 @@ async def test_list_medications_with_pagination(medication_service, mock_db):
         ],
         "Count": 51
     }
-    medications, total, has_more = await medication_service.list_medications(limit=50)
-    mock_db.query.assert_any_call(limit=51)
+    medications, total, has_more, next_cursor, approximate_total = await medication_service.list_medications(limit=50)
+    mock_db.scan.assert_any_call(limit=51)
     assert len(medications) == 50
     assert has_more
 
@@ -133,34 +157,34 @@ async def test_get_medication_not_found(medication_service, mock_db):
 
 @pytest.mark.asyncio
 async def test_get_total_count_no_search(medication_service, mock_db):
-    mock_db.query.return_value = {"Count": 100}
+    mock_db.scan.return_value = {"Count": 100}
     count = await medication_service._get_total_count()
-    mock_db.query.assert_any_call(select="COUNT")
+    mock_db.scan.assert_any_call(select="COUNT")
     assert count == 100
 
 @pytest.mark.asyncio
 async def test_get_total_count_with_search(medication_service, mock_db):
-    mock_db.query.return_value = {"Count": 5}
+    mock_db.scan.return_value = {"Count": 5}
     count = await medication_service._get_total_count(search="aspirin")
-    mock_db.query.assert_any_call(
+    mock_db.scan.assert_any_call(
         select="COUNT",
         filter_expression="contains(#name, :search) OR contains(#generic_name, :search)",
-        expression_attribute_names={"#name": "name", "#generic_name": "generic_name"},
-        expression_attribute_values={":search": "aspirin"}
+        expression_attribute_names={"#name": "name_normalized", "#generic_name": "generic_name_normalized"},
+        expression_values={":search": "aspirin"}
     )
     assert count == 5
 
 @pytest.mark.asyncio
 async def test_list_medications_empty_result(medication_service, mock_db):
-    mock_db.query.return_value = {"Items": []}
-    medications, total, has_more = await medication_service.list_medications()
-    mock_db.query.assert_any_call(limit=51)
+    mock_db.scan.return_value = {"Items": []}
+    medications, total, has_more, next_cursor, approximate_total = await medication_service.list_medications()
+    mock_db.scan.assert_any_call(limit=51)
     assert len(medications) == 0
     assert not has_more
 
 @pytest.mark.asyncio
 async def test_list_medications_with_optional_fields(medication_service, mock_db):
-    mock_db.query.return_value = {
+    mock_db.scan.return_value = {
         "Items": [
             {
                 "id": "1",
@@ -176,8 +200,376 @@ async def test_list_medications_with_optional_fields(medication_service, mock_db
             }
         ]
     }
-    medications, total, has_more = await medication_service.list_medications()
-    mock_db.query.assert_any_call(limit=51)
+    medications, total, has_more, next_cursor, approximate_total = await medication_service.list_medications()
+    mock_db.scan.assert_any_call(limit=51)
     assert len(medications) == 1
     assert medications[0].warnings == []
-    assert medications[0].side_effects == [] 
\ No newline at end of file
+    assert medications[0].side_effects == [] 
+
+@pytest.fixture
+def loaded_index():
+    index = MedicationSearchIndex()
+    index.add("1", "Aspirin", "Acetylsalicylic acid")
+    index.add("2", "Baby Aspirin", "Acetylsalicylic acid")
+    index.add("3", "Coumadin", "Warfarin")
+    index.loaded = True
+    return index
+
+def page_then_count(page):
+    """Scan stub returning ``page`` for listing scans and a single-page COUNT otherwise"""
+    async def scan(**kwargs):
+        if kwargs.get("select") == "COUNT":
+            return {"Count": 0}
+        return page
+    return scan
+
+def make_medication(medication_id, name):
+    return {
+        "id": medication_id, "name": name, "generic_name": "Generic",
+        "description": "Description", "dosage_forms": ["tablet"],
+        "active_ingredients": ["ingredient"], "manufacturer": "Test",
+        "category": "Test", "created_at": "2024-01-01T00:00:00Z",
+        "updated_at": "2024-01-01T00:00:00Z"
+    }
+
+def make_create(name):
+    return MedicationCreate(
+        name=name, generic_name="Generic", description="Description",
+        dosage_forms=["tablet"], active_ingredients=["ingredient"],
+        manufacturer="Test", category="Test"
+    )
+
+@pytest.mark.asyncio
+async def test_list_medications_search_uses_index(mock_db, loaded_index):
+    service = MedicationService(mock_db, search_index=loaded_index)
+    mock_db.batch_get_item.return_value = [make_medication("2", "Baby Aspirin"), make_medication("1", "Aspirin")]
+    medications, total, has_more, next_cursor, approximate_total = await service.list_medications(search="aspirin", limit=50)
+    mock_db.batch_get_item.assert_awaited_once_with([{"id": "1"}, {"id": "2"}])
+    mock_db.scan.assert_not_called()
+    assert [m.id for m in medications] == ["1", "2"]
+    assert total == 2
+    assert not has_more
+
+@pytest.mark.asyncio
+async def test_list_medications_search_index_pagination(mock_db, loaded_index):
+    service = MedicationService(mock_db, search_index=loaded_index)
+    mock_db.batch_get_item.return_value = [make_medication("2", "Baby Aspirin")]
+    medications, total, has_more, next_cursor, approximate_total = await service.list_medications(search="aspirin", page=2, limit=1)
+    mock_db.batch_get_item.assert_awaited_once_with([{"id": "2"}])
+    assert [m.id for m in medications] == ["2"]
+    assert total == 2
+    assert not has_more
+
+@pytest.mark.asyncio
+async def test_list_medications_search_index_no_match(mock_db, loaded_index):
+    service = MedicationService(mock_db, search_index=loaded_index)
+    medications, total, has_more, next_cursor, approximate_total = await service.list_medications(search="ibuprofen")
+    mock_db.batch_get_item.assert_not_called()
+    assert medications == []
+    assert total == 0
+
+@pytest.mark.asyncio
+async def test_list_medications_next_cursor_resumes_after_last_item(medication_service, mock_db):
+    mock_db.scan.return_value = {"Items": [make_medication(str(i), f"Med {i}") for i in range(3)]}
+    medications, total, has_more, next_cursor, approximate_total = await medication_service.list_medications(limit=2)
+    assert has_more
+    assert next_cursor is not None
+
+    mock_db.scan.reset_mock()
+    mock_db.scan.return_value = {"Items": [make_medication("2", "Med 2")]}
+    medications, total, has_more, next_cursor, approximate_total = await medication_service.list_medications(limit=2, cursor=next_cursor)
+    mock_db.scan.assert_called_once_with(limit=3, exclusive_start_key={"id": "1"})
+    assert [m.id for m in medications] == ["2"]
+    assert total is None
+    assert not has_more
+    assert next_cursor is None
+
+@pytest.mark.asyncio
+async def test_list_medications_short_filtered_page_uses_last_evaluated_key(medication_service, mock_db):
+    mock_db.scan.side_effect = page_then_count({"Items": [], "LastEvaluatedKey": {"id": "42"}})
+    medications, total, has_more, next_cursor, approximate_total = await medication_service.list_medications(search="rare")
+    assert medications == []
+    assert has_more
+
+    mock_db.scan.reset_mock()
+    mock_db.scan.side_effect = page_then_count({"Items": []})
+    await medication_service.list_medications(search="rare", cursor=next_cursor)
+    assert mock_db.scan.call_args.kwargs["exclusive_start_key"] == {"id": "42"}
+
+@pytest.mark.asyncio
+async def test_list_medications_scan_rejects_page_without_cursor(medication_service, mock_db):
+    with pytest.raises(ValueError, match="next_cursor"):
+        await medication_service.list_medications(page=3, limit=2)
+    mock_db.scan.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_list_medications_cursor_bound_to_search(medication_service, mock_db):
+    mock_db.scan.side_effect = page_then_count({"Items": [], "LastEvaluatedKey": {"id": "42"}})
+    _, _, _, next_cursor, _ = await medication_service.list_medications(search="rare")
+    with pytest.raises(InvalidCursor):
+        await medication_service.list_medications(search="other", cursor=next_cursor)
+
+@pytest.mark.asyncio
+async def test_list_medications_search_index_cursor(mock_db, loaded_index):
+    service = MedicationService(mock_db, search_index=loaded_index)
+    mock_db.batch_get_item.return_value = [make_medication("1", "Aspirin")]
+    _, total, has_more, next_cursor, _ = await service.list_medications(search="aspirin", limit=1)
+    assert has_more
+
+    mock_db.batch_get_item.reset_mock()
+    mock_db.batch_get_item.return_value = [make_medication("2", "Baby Aspirin")]
+    medications, _, has_more, next_cursor, _ = await service.list_medications(search="aspirin", limit=1, cursor=next_cursor)
+    mock_db.batch_get_item.assert_awaited_once_with([{"id": "2"}])
+    assert not has_more
+    assert next_cursor is None
+
+@pytest.mark.asyncio
+async def test_total_comes_from_counter_item(medication_service, mock_db):
+    mock_db.scan.return_value = {"Items": []}
+    mock_db.get_item.return_value = {"id": COUNTER_KEY["id"], "item_count": 1234}
+    result = await medication_service.list_medications()
+    mock_db.get_item.assert_awaited_once_with(COUNTER_KEY)
+    assert result.total == 1234
+    assert not result.approximate_total
+    for call in mock_db.scan.call_args_list:
+        assert call.kwargs.get("select") != "COUNT"
+
+@pytest.mark.asyncio
+async def test_total_backfills_missing_counter(medication_service, mock_db):
+    mock_db.scan.side_effect = [{"Items": []}, {"Count": 7}]
+    mock_db.get_item.return_value = None
+    result = await medication_service.list_medications()
+    assert result.total == 7
+    mock_db.update_item.assert_awaited_once_with(
+        COUNTER_KEY,
+        "SET item_count = if_not_exists(item_count, :count)",
+        {":count": 7}
+    )
+
+@pytest.mark.asyncio
+async def test_search_total_is_cached_by_normalized_term(medication_service, mock_db):
+    mock_db.scan.side_effect = [{"Items": []}, {"Count": 3}, {"Items": []}]
+    first = await medication_service.list_medications(search="Aspirin")
+    await asyncio.gather(*medication_service._counting.values())
+    second = await medication_service.list_medications(search="  ASPIRIN ")
+    assert first.total is None and first.approximate_total
+    assert second.total == 3 and second.approximate_total
+    assert mock_db.scan.call_count == 3
+
+@pytest.mark.asyncio
+async def test_search_total_is_counted_once_and_not_billed_to_the_request(medication_service, mock_db):
+    from app import metrics
+    counted = asyncio.Event()
+
+    async def scan(**kwargs):
+        if kwargs.get("select") == "COUNT":
+            assert metrics.current_timings() is None
+            await counted.wait()
+            return {"Count": 3}
+        return {"Items": []}
+
+    mock_db.scan.side_effect = scan
+    token = metrics._request_timings.set(metrics.RequestTimings())
+    try:
+        await medication_service.list_medications(search="aspirin")
+        await medication_service.list_medications(search="Aspirin")
+    finally:
+        metrics._request_timings.reset(token)
+    assert len(medication_service._counting) == 1
+    counted.set()
+    await asyncio.gather(*medication_service._counting.values())
+    assert count_cache.get("aspirin") == 3
+    assert not medication_service._counting
+
+@pytest.mark.asyncio
+async def test_counter_item_is_not_listed(medication_service, mock_db):
+    mock_db.scan.return_value = {"Items": [{"id": COUNTER_KEY["id"], "item_count": 1}, make_medication("1", "Aspirin")]}
+    mock_db.get_item.return_value = {"item_count": 1}
+    result = await medication_service.list_medications()
+    assert [m.id for m in result.items] == ["1"]
+
+@pytest.mark.asyncio
+async def test_create_medication_increments_counter_and_invalidates(medication_service, mock_db):
+    count_cache.set("", 10)
+    count_cache.set("aspirin", 2)
+    mock_db.get_item.return_value = {"id": COUNTER_KEY["id"], "item_count": 10}
+    medication = MedicationCreate(
+        name="Aspirin", generic_name="Acetylsalicylic acid", description="Pain reliever",
+        dosage_forms=["tablet"], active_ingredients=["aspirin"],
+        manufacturer="Bayer", category="Analgesic"
+    )
+    result = await medication_service.create_medication(medication)
+    saved = mock_db.put_item.call_args[0][0]
+    assert saved["id"] == result.id
+    assert saved["name"] == "Aspirin"
+    mock_db.update_item.assert_awaited_once_with(COUNTER_KEY, "ADD item_count :one", {":one": 1})
+    assert len(count_cache) == 0
+
+@pytest.mark.asyncio
+async def test_create_medication_invalidates_cached_checks(mock_db):
+    result_cache = AsyncMock()
+    service = MedicationService(mock_db, result_cache=result_cache)
+    mock_db.get_item.return_value = {"id": COUNTER_KEY["id"], "item_count": 0}
+    await service.create_medication(make_create("Aspirin"))
+    result_cache.bump_version.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_create_medication_seeds_missing_counter_first(medication_service, mock_db):
+    mock_db.get_item.return_value = None
+    mock_db.scan.return_value = {"Count": 5}
+    await medication_service.create_medication(make_create("Aspirin"))
+    await medication_service.create_medication(make_create("Ibuprofen"))
+    assert mock_db.update_item.await_args_list[0].args == (
+        COUNTER_KEY,
+        "SET item_count = if_not_exists(item_count, :count)",
+        {":count": 5}
+    )
+    assert [call.args[1] for call in mock_db.update_item.await_args_list[1:]] == ["ADD item_count :one"] * 2
+    # Seeded once per instance
+    mock_db.get_item.assert_awaited_once_with(COUNTER_KEY)
+    mock_db.scan.assert_awaited_once_with(select="COUNT")
+
+@pytest.mark.asyncio
+async def test_total_counts_medications_written_before_first_create():
+    with mock_aws():
+        boto3.client("dynamodb", region_name=settings.AWS_REGION).create_table(
+            TableName=settings.MEDICATIONS_TABLE,
+            KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "id", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST"
+        )
+        db = DynamoDB(settings.MEDICATIONS_TABLE)
+        for i in range(5):
+            await db.put_item(make_medication(str(i), f"Medication {i}"))
+        service = MedicationService(db)
+        await service.create_medication(make_create("Aspirin"))
+        result = await service.list_medications()
+        db.close()
+    assert len(result.items) == 6
+    assert result.total == 6
+    assert not result.approximate_total
+
+@pytest.mark.asyncio
+async def test_iter_medications_follows_cursors(medication_service, mock_db):
+    """Test that an export walks every page without counting the catalog"""
+    mock_db.scan.side_effect = [
+        {"Items": [make_medication(str(i), f"Med {i}") for i in range(3)]},
+        {"Items": [make_medication("2", "Med 2")]}
+    ]
+    exported = [m.id async for m in medication_service.iter_medications(page_size=2)]
+    assert exported == ["0", "1", "2"]
+    assert mock_db.scan.call_count == 2
+    assert mock_db.scan.call_args.kwargs["exclusive_start_key"] == {"id": "1"}
+    mock_db.get_item.assert_not_called()
+
+def test_iter_medications_rejects_bad_cursor_eagerly(medication_service):
+    with pytest.raises(InvalidCursor):
+        medication_service.iter_medications(cursor="not-a-cursor")
+
+@pytest.mark.asyncio
+async def test_list_medications_fields_projects_attributes(medication_service, mock_db):
+    mock_db.scan.return_value = {"Items": [{"id": "1", "name": "Aspirin", "generic_name": "aspirin"}]}
+    medications, *_ = await medication_service.list_medications(fields=["name", "generic_name"], with_total=False)
+    mock_db.scan.assert_called_once_with(limit=51, projection=["id", "name", "generic_name"])
+    assert medications[0].model_dump(exclude_unset=True) == {"id": "1", "name": "Aspirin", "generic_name": "aspirin"}
+
+@pytest.mark.asyncio
+async def test_list_medications_fields_with_search_index(mock_db, loaded_index):
+    service = MedicationService(mock_db, search_index=loaded_index)
+    mock_db.batch_get_item.return_value = [{"id": "3", "name": "Coumadin"}]
+    medications, *_ = await service.list_medications(search="coumadin", fields=["name"])
+    mock_db.batch_get_item.assert_awaited_once_with([{"id": "3"}], projection=["id", "name"])
+    assert medications[0].name == "Coumadin"
+
+@pytest.mark.asyncio
+async def test_list_medications_unknown_fields(medication_service, mock_db):
+    with pytest.raises(ValueError, match="Unknown fields: dose"):
+        await medication_service.list_medications(fields=["name", "dose"])
+    mock_db.scan.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_get_medication_fields(medication_service, mock_db):
+    mock_db.get_item.return_value = {"id": "1", "name": "Aspirin"}
+    medication = await medication_service.get_medication("1", ["name"])
+    mock_db.get_item.assert_awaited_once_with({"id": "1"}, projection=["id", "name"])
+    assert medication.model_dump(exclude_unset=True) == {"id": "1", "name": "Aspirin"}
+
+@pytest.mark.asyncio
+async def test_find_by_name_queries_name_index(medication_service, mock_db):
+    mock_db.query.return_value = {"Items": [make_medication("1", "Aspirin")]}
+    medications = await medication_service.find_by_name("  ASPIRIN ")
+    mock_db.query.assert_awaited_once_with(
+        key_condition_expression="name_normalized = :name",
+        expression_values={":name": "aspirin"},
+        index_name="name-index"
+    )
+    assert [m.id for m in medications] == ["1"]
+
+@pytest.mark.asyncio
+async def test_create_medication_stores_normalized_names(medication_service, mock_db):
+    mock_db.get_item.return_value = {"id": COUNTER_KEY["id"], "item_count": 0}
+    await medication_service.create_medication(MedicationCreate(
+        name="Baby Aspirin",
+        generic_name="Acetylsalicylic Acid",
+        description="Pain reliever",
+        dosage_forms=["tablet"],
+        active_ingredients=["aspirin"],
+        manufacturer="Test Manufacturer",
+        category="Analgesic"
+    ))
+    item = mock_db.put_item.call_args.args[0]
+    assert item["name_normalized"] == "baby aspirin"
+    assert item["generic_name_normalized"] == "acetylsalicylic acid"
+
+@pytest.mark.asyncio
+async def test_get_medication_reads_through_cache(medication_service, mock_db):
+    mock_db.get_item.return_value = make_medication("1", "Aspirin")
+    first = await medication_service.get_medication("1")
+    second = await medication_service.get_medication("1")
+    assert first is second
+    mock_db.get_item.assert_awaited_once_with({"id": "1"})
+
+    entry = await medication_service.get_medication_entry("1")
+    assert json.loads(entry.body)["name"] == "Aspirin"
+    assert entry.etag.startswith('"')
+    assert entry.last_modified == datetime(2024, 1, 1, tzinfo=UTC)
+
+@pytest.mark.asyncio
+async def test_get_medication_fields_served_from_cache(medication_service, mock_db):
+    mock_db.get_item.return_value = make_medication("1", "Aspirin")
+    await medication_service.get_medication("1")
+    medication = await medication_service.get_medication("1", ["name"])
+    assert medication.model_dump(exclude_unset=True) == {"id": "1", "name": "Aspirin"}
+    mock_db.get_item.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_get_medication_caches_not_found(medication_service, mock_db):
+    mock_db.get_item.return_value = None
+    assert await medication_service.get_medication("missing") is None
+    assert await medication_service.get_medication("missing") is None
+    assert await medication_service.get_medication("missing", ["name"]) is None
+    mock_db.get_item.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_counter_item_is_not_a_medication(medication_service, mock_db):
+    assert await medication_service.get_medication(COUNTER_KEY["id"]) is None
+    mock_db.get_item.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_invalidate_drops_cached_medication(medication_service, mock_db):
+    mock_db.get_item.return_value = None
+    await medication_service.get_medication("1")
+    MedicationService.invalidate("1")
+    mock_db.get_item.return_value = make_medication("1", "Aspirin")
+    medication = await medication_service.get_medication("1")
+    assert medication.name == "Aspirin"
+
+@pytest.mark.asyncio
+async def test_medication_cache_entries_expire(medication_service, mock_db):
+    mock_db.get_item.return_value = make_medication("1", "Aspirin")
+    now = [0.0]
+    with patch.object(medication_cache, "_clock", lambda: now[0]):
+        await medication_service.get_medication("1")
+        now[0] += medication_cache.ttl + 1
+        await medication_service.get_medication("1")
+    assert mock_db.get_item.await_count == 2
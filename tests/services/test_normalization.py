@@ -0,0 +1,88 @@
+import pytest
+from unittest.mock import AsyncMock
+from app.services.normalization import COMMON_SYNONYMS, NameResolver, name_resolver, normalize_term
+
+
+def test_normalize_term():
+    assert normalize_term("  Tylenol   PM ") == "tylenol pm"
+    assert normalize_term("ＡＳＰＩＲＩＮ") == "aspirin"
+
+
+class TestNameResolver:
+
+    @pytest.fixture
+    def resolver(self):
+        resolver = NameResolver()
+        resolver.add_medication("Coumadin", "Warfarin", ["warfarin sodium"])
+        resolver.add_medication("Tylenol", "Acetaminophen", ["acetaminophen"])
+        resolver.add_medication("Vicodin", "Hydrocodone/Acetaminophen", ["hydrocodone", "acetaminophen"])
+        return resolver
+
+    @pytest.mark.parametrize("name", ["Aspirin", "  ASPIRIN ", "aspirin", "ASA", "Acetylsalicylic  Acid"])
+    def test_spellings_resolve_to_one_name(self, resolver, name):
+        assert resolver.resolve(name) == "aspirin"
+
+    def test_unicode_is_normalized(self, resolver):
+        """Test that compatibility forms and non-breaking spaces fold away"""
+        assert resolver.resolve("Ｗａｒｆａｒｉｎ") == "warfarin"
+        assert resolver.resolve("vitamin K") == "vitamin k"
+
+    def test_brand_resolves_to_generic(self, resolver):
+        assert resolver.resolve("Coumadin") == "warfarin"
+        assert resolver.resolve("warfarin sodium") == "warfarin"
+        assert resolver.resolve("TYLENOL") == resolver.resolve("Paracetamol") == "acetaminophen"
+
+    def test_combination_ingredients_are_not_aliased(self, resolver):
+        """Test that a combination product does not swallow its ingredients"""
+        assert resolver.resolve("Vicodin") == "hydrocodone/acetaminophen"
+        assert resolver.resolve("hydrocodone") == "hydrocodone"
+        assert resolver.resolve("acetaminophen") == "acetaminophen"
+
+    def test_unknown_name_resolves_to_itself(self, resolver):
+        assert resolver.resolve("  Some New Drug ") == "some new drug"
+
+    def test_synonym_chains_collapse(self):
+        resolver = NameResolver(synonyms={})
+        resolver.add_synonym("Paracetamol", "Acetaminophen")
+        resolver.add_synonym("Panadol", "paracetamol")
+        assert resolver.resolve("Panadol") == "acetaminophen"
+
+    def test_canonical_names_are_never_remapped(self):
+        """Test that a later product whose generic is a salt keeps existing keys reachable"""
+        resolver = NameResolver(synonyms={})
+        resolver.add_medication("Coumadin", "Warfarin", ["Warfarin"])
+        resolver.add_medication("Jantoven", "Warfarin Sodium", ["Warfarin"])
+        assert resolver.resolve("warfarin") == "warfarin"
+        assert resolver.resolve("Coumadin") == "warfarin"
+        assert resolver.resolve("Jantoven") == "warfarin sodium"
+
+    def test_first_mapping_for_an_alias_wins(self):
+        resolver = NameResolver(synonyms={})
+        resolver.add_synonym("Panadol", "Acetaminophen")
+        resolver.add_synonym("Panadol", "Ibuprofen")
+        assert resolver.resolve("Panadol") == "acetaminophen"
+
+    @pytest.mark.asyncio
+    async def test_load_builds_from_catalog(self):
+        resolver = NameResolver()
+        db = AsyncMock()
+        db.scan.side_effect = [
+            {
+                "Items": [
+                    {"id": "1", "name": "Coumadin", "generic_name": "Warfarin", "active_ingredients": ["warfarin"]},
+                    {"medication1": "aspirin", "medication2": "warfarin"}
+                ],
+                "LastEvaluatedKey": {"id": "1"}
+            },
+            {"Items": [{"id": "2", "name": "Advil", "generic_name": "Ibuprofen"}]}
+        ]
+        await resolver.load(db)
+        assert resolver.loaded
+        assert resolver.resolve("Coumadin") == "warfarin"
+        assert resolver.resolve("Advil") == "ibuprofen"
+        assert resolver.resolve("ASA") == "aspirin"
+        assert db.scan.call_count == 2
+
+    def test_singleton_knows_common_synonyms(self):
+        for alias, canonical in COMMON_SYNONYMS.items():
+            assert name_resolver.resolve(alias) == canonical
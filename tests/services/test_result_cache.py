@@ -0,0 +1,156 @@
+import os
+import subprocess
+import sys
+import pytest
+from unittest.mock import AsyncMock, Mock
+from app.cache import MemoryBackend, RedisBackend
+from app.models.records import InteractionRecord
+from app.models.schemas import InteractionCheckResponse
+from app.services.normalization import NameResolver
+from app.services.result_cache import InteractionResultCache, build_backend
+
+
+class FakeRedis:
+    """Local stand-in for redis.asyncio.Redis: bytes values, integer counters"""
+
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, px=None):
+        self.data[key] = value
+        self.expiry[key] = px
+
+    async def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, b"0")) + 1).encode()
+        return int(self.data[key])
+
+
+INTERACTION = InteractionRecord.from_item({
+    "id": "1",
+    "medication1": "aspirin",
+    "medication2": "warfarin",
+    "severity": "high",
+    "description": "Increased risk of bleeding",
+    "created_at": "2024-01-01T00:00:00Z",
+    "updated_at": "2024-01-01T00:00:00Z"
+})
+
+
+@pytest.fixture(params=["memory", "redis"])
+def cache(request):
+    backend = MemoryBackend(maxsize=100) if request.param == "memory" else RedisBackend(FakeRedis())
+    return InteractionResultCache(backend, resolver=NameResolver(), ttl=60)
+
+
+@pytest.mark.asyncio
+async def test_hit_for_any_spelling_and_order(cache):
+    compute = AsyncMock(return_value=[INTERACTION])
+    first = await cache.check(["Warfarin", "Aspirin"], compute)
+    second = await cache.check(["asa", " WARFARIN "], compute)
+    compute.assert_awaited_once()
+    assert (first.hit, second.hit) == (False, True)
+    assert second.body == first.body
+    assert second.etag == first.etag
+    assert cache.stats()["hit_ratio"] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_bump_version_invalidates(cache):
+    compute = AsyncMock(return_value=[INTERACTION])
+    await cache.check(["aspirin", "warfarin"], compute)
+    await cache.bump_version()
+    compute.return_value = []
+    result = await cache.check(["aspirin", "warfarin"], compute)
+    assert not result.hit
+    assert b'"has_interactions":false' in result.body
+    assert compute.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_result_computed_across_a_write_is_not_served():
+    """Test that a result started before a write is stored under the old version"""
+    cache = InteractionResultCache(MemoryBackend(), resolver=NameResolver())
+
+    async def compute(medications):
+        await cache.bump_version()
+        return [INTERACTION]
+
+    await cache.check(["aspirin", "warfarin"], compute)
+    result = await cache.check(["aspirin", "warfarin"], AsyncMock(return_value=[]))
+    assert not result.hit
+
+
+@pytest.mark.asyncio
+async def test_redis_entries_expire_with_ttl():
+    redis = FakeRedis()
+    cache = InteractionResultCache(RedisBackend(redis), resolver=NameResolver(), ttl=30)
+    await cache.check(["aspirin", "warfarin"], AsyncMock(return_value=[]))
+    assert list(redis.expiry.values()) == [30000]
+
+
+@pytest.mark.asyncio
+async def test_backend_failure_falls_back_to_compute():
+    backend = AsyncMock()
+    backend.counter.side_effect = ConnectionError("redis down")
+    cache = InteractionResultCache(backend, resolver=NameResolver())
+    result = await cache.check(["aspirin", "warfarin"], AsyncMock(return_value=[INTERACTION]))
+    assert not result.hit
+    assert b"aspirin" in result.body
+    backend.set.assert_not_called()
+    assert cache.stats()["errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_disabled_cache_always_computes():
+    cache = InteractionResultCache(None, resolver=NameResolver())
+    compute = AsyncMock(return_value=[])
+    await cache.check(["aspirin", "warfarin"], compute)
+    await cache.check(["aspirin", "warfarin"], compute)
+    await cache.bump_version()
+    assert compute.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_records_serialize_like_the_response_model():
+    cache = InteractionResultCache(None, resolver=NameResolver())
+    sourced = INTERACTION.with_sources(("excedrin", "warfarin"))
+    result = await cache.check(["aspirin", "warfarin"], AsyncMock(return_value=[INTERACTION, sourced]))
+    assert result.body == InteractionCheckResponse(
+        interactions=[INTERACTION.to_response(), sourced.to_response()],
+        has_interactions=True
+    ).model_dump_json().encode()
+
+
+def test_build_backend():
+    assert isinstance(build_backend("memory"), MemoryBackend)
+    assert build_backend("none") is None
+    with pytest.raises(ValueError):
+        build_backend("memcached")
+
+
+@pytest.mark.asyncio
+async def test_backend_is_built_on_first_use():
+    factory = Mock(return_value=MemoryBackend())
+    cache = InteractionResultCache(resolver=NameResolver(), backend_factory=factory)
+    factory.assert_not_called()
+    compute = AsyncMock(return_value=[INTERACTION])
+    await cache.check(["aspirin", "warfarin"], compute)
+    await cache.check(["aspirin", "warfarin"], compute)
+    factory.assert_called_once_with()
+    assert compute.await_count == 1
+
+
+def test_importing_the_app_does_not_import_redis():
+    env = dict(os.environ, INTERACTION_CACHE_BACKEND="redis")
+    code = "import sys, app.main; assert 'redis' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], env=env, check=True)
+
+
+def test_redis_backend_names_the_missing_package(monkeypatch):
+    monkeypatch.setitem(sys.modules, "redis", None)
+    with pytest.raises(ImportError, match="pip install redis"):
+        RedisBackend.from_url("redis://localhost:6379/0")
@@ -0,0 +1,94 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from app.services.search_index import MedicationSearchIndex
+
+
+@pytest.fixture
+def index():
+    index = MedicationSearchIndex()
+    index.add("1", "Aspirin", "Acetylsalicylic acid")
+    index.add("2", "Bayer Aspirin Plus", "Aspirin")
+    index.add("3", "Coumadin", "Warfarin")
+    index.add("4", "Baby Aspirin", "Acetylsalicylic acid")
+    index.add("5", "Asmanex", "Mometasone")
+    return index
+
+
+def test_search_ranks_exact_prefix_word_substring(index):
+    ids, total = index.search("aspirin")
+    assert total == 3
+    # Exact name, exact generic, then word prefix
+    assert ids == ["1", "2", "4"]
+
+
+def test_search_substring_matches(index):
+    ids, total = index.search("salicyl")
+    assert sorted(ids) == ["1", "4"]
+    assert total == 2
+
+
+def test_search_is_case_insensitive(index):
+    assert index.search("WARFARIN")[0] == ["3"]
+
+
+def test_search_short_query_uses_prefixes(index):
+    ids, total = index.search("as")
+    assert set(ids) == {"1", "2", "4", "5"}
+    assert total == 4
+
+
+def test_search_no_match(index):
+    assert index.search("zzz") == ([], 0)
+    assert index.search("   ") == ([], 0)
+
+
+def test_search_paginates_over_matches(index):
+    first, total = index.search("aspirin", offset=0, limit=2)
+    second, _ = index.search("aspirin", offset=2, limit=2)
+    assert total == 3
+    assert first == ["1", "2"]
+    assert second == ["4"]
+
+
+def test_add_replaces_and_remove_deletes(index):
+    index.add("3", "Jantoven", "Warfarin")
+    assert index.search("coumadin") == ([], 0)
+    assert index.search("jantoven")[0] == ["3"]
+    index.remove("3")
+    assert index.search("warfarin") == ([], 0)
+    assert index.search("ja") == ([], 0)
+    assert len(index) == 4
+
+
+@pytest.mark.asyncio
+async def test_load_skips_non_medication_items():
+    mock_db = AsyncMock()
+    mock_db.scan.side_effect = [
+        {"Items": [{"id": "1", "name": "Aspirin", "generic_name": "Aspirin"}], "LastEvaluatedKey": {"id": "1"}},
+        {"Items": [{"medication1": "Aspirin", "medication2": "Warfarin"}]}
+    ]
+    index = MedicationSearchIndex()
+    await index.load(mock_db)
+    assert index.loaded
+    assert len(index) == 1
+    assert index.search("asp")[0] == ["1"]
+
+
+@pytest.mark.asyncio
+async def test_reload_periodically_picks_up_other_instances_writes():
+    mock_db = AsyncMock()
+    mock_db.scan.side_effect = [
+        RuntimeError("throttled"),
+        {"Items": [{"id": "1", "name": "Aspirin", "generic_name": "Aspirin"}]},
+    ]
+    index = MedicationSearchIndex()
+    index.build([])
+    reloader = asyncio.create_task(index.reload_periodically(mock_db, 0))
+    # A failed reload keeps the old index and the loop going
+    for _ in range(100):
+        if len(index):
+            break
+        await asyncio.sleep(0)
+    reloader.cancel()
+    assert index.search("aspirin")[0] == ["1"]
@@ -0,0 +1,83 @@
+import pytest
+from app.cache import MemoryBackend, TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_get_and_set():
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.get("missing") is None
+    assert cache.get("missing", "default") == "default"
+
+
+def test_lru_eviction():
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_entries_expire():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=30, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=5)
+    clock.now += 10
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    clock.now += 30
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_no_ttl_never_expires():
+    clock = FakeClock()
+    cache = TTLCache(clock=clock)
+    cache.set("a", 1)
+    clock.now += 10 ** 9
+    assert cache.get("a") == 1
+
+
+def test_invalidate_and_clear():
+    cache = TTLCache()
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.invalidate("a") is True
+    assert cache.invalidate("a") is False
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_stats():
+    cache = TTLCache(maxsize=1)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("b")
+    cache.set("b", 2)
+    assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 1, "size": 1, "hit_ratio": 0.5}
+    assert TTLCache().stats()["hit_ratio"] == 0.0
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_counters_survive_eviction():
+    backend = MemoryBackend(maxsize=1)
+    assert await backend.counter("version") == 0
+    assert await backend.incr("version") == 1
+    await backend.set("a", b"1")
+    await backend.set("b", b"2")
+    assert await backend.get("a") is None
+    assert await backend.get("b") == b"2"
+    assert await backend.counter("version") == 1
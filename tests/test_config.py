@@ -47,7 +47,8 @@ def test_environment_variables():
 def test_medications_table_default():
     """Test medications table default value"""
     settings = Settings()
-    assert settings.MEDICATIONS_TABLE == "medications"
+    assert settings.MEDICATIONS_TABLE == "matrixmeds-medications"
+    assert settings.MEDICATIONS_NAME_INDEX == "name-index"
 
 def test_interactions_table_default():
     """Test interactions table default value"""
@@ -4,21 +4,26 @@ from app.config import settings
 
 client = TestClient(app)
 
+
 def test_health_check():
     response = client.get("/health")
     assert response.status_code == 200
     assert response.json() == {"status": "healthy"}
 
+
 def test_api_docs():
     response = client.get("/docs")
     assert response.status_code == 200
 
+
 def test_api_title():
     assert app.title == "MatrixMeds API"
 
+
 def test_api_version():
     assert app.version == "1.0.0"
 
+
 def test_cors_middleware():
     # Test CORS headers
     response = client.options(
@@ -28,10 +33,49 @@ def test_cors_middleware():
     assert "access-control-allow-origin" in response.headers
     assert response.headers["access-control-allow-origin"] == settings.CORS_ORIGINS[0]
 
+
 def test_cors_middleware_invalid_origin():
     # Test CORS headers with invalid origin
     response = client.options(
         "/health",
         headers={"Origin": "http://invalid-origin.com"}
     )
-    assert response.headers["access-control-allow-origin"] == "*" 
\ No newline at end of file
+    assert response.headers["access-control-allow-origin"] == "*"
+
+
+def test_lambda_handler_starts_app_once(monkeypatch):
+    """Test that the lifespan runs on the first invocation only, not per request"""
+    import asyncio
+    from unittest.mock import AsyncMock, MagicMock
+    from app import main
+    # Mangum installs an event loop when it is built; stand in for it
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    mock_lifespan = MagicMock()
+    mock_lifespan.return_value.__aenter__ = AsyncMock()
+    mock_mangum = MagicMock(return_value={"statusCode": 200})
+    monkeypatch.setattr(main, "lifespan", mock_lifespan)
+    monkeypatch.setattr(main, "_mangum", mock_mangum)
+    monkeypatch.setattr(main, "_container_lifespan", None)
+    for _ in range(3):
+        assert main.lambda_handler({}, None) == {"statusCode": 200}
+    mock_lifespan.assert_called_once_with(app)
+    mock_lifespan.return_value.__aenter__.assert_awaited_once()
+    assert mock_mangum.call_count == 3
+    asyncio.set_event_loop(None)
+    loop.close()
+
+
+def test_responses_carry_server_timing():
+    response = client.get("/health")
+    assert response.headers["server-timing"].startswith("total;dur=")
+
+
+def test_metrics_endpoint():
+    client.get("/health")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'matrixmeds_request_seconds_count{method="GET",endpoint="health_check",status="200"}' in response.text
+    assert "# TYPE matrixmeds_interaction_cache_hit_ratio gauge" in response.text
+    assert "matrixmeds_token_cache_size " in response.text
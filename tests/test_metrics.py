@@ -0,0 +1,100 @@
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app import metrics
+from app.metrics import Counter, Histogram, InstrumentationMiddleware, RequestTimings
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("test_seconds", "Test", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "a")
+    histogram.observe(0.5, "a")
+    histogram.observe(5, "a")
+    assert histogram.render() == [
+        "# HELP test_seconds Test",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{route="a",le="0.1"} 1',
+        'test_seconds_bucket{route="a",le="1.0"} 2',
+        'test_seconds_bucket{route="a",le="+Inf"} 3',
+        'test_seconds_sum{route="a"} 5.55',
+        'test_seconds_count{route="a"} 3',
+    ]
+
+
+def test_counter_escapes_labels():
+    counter = Counter("test_total", "Test", ("name",))
+    counter.inc('say "hi"\\', amount=2)
+    assert counter.render()[-1] == 'test_total{name="say \\"hi\\"\\\\"} 2'
+
+
+def test_consumed_capacity_units():
+    assert metrics.consumed_capacity_units(None) == 0
+    assert metrics.consumed_capacity_units({"TableName": "t", "CapacityUnits": 0.5}) == 0.5
+    assert metrics.consumed_capacity_units([{"CapacityUnits": 1}, {"CapacityUnits": 2.5}]) == 3.5
+
+
+def test_server_timing_header():
+    timings = RequestTimings()
+    timings.add("auth", 0.002)
+    timings.add("serialize", 0.001)
+    timings.add("serialize", 0.001)
+    timings.dynamodb_calls = 3
+    timings.dynamodb_seconds = 0.012
+    timings.consumed_capacity = 1.5
+    assert timings.server_timing(0.02) == (
+        'total;dur=20.000, dynamodb;dur=12.000;desc="3 calls / 1.5 CU", '
+        'auth;dur=2.000, serialize;dur=2.000;desc="2 calls"'
+    )
+
+
+@pytest.mark.asyncio
+async def test_spans_outside_a_request_only_feed_histograms():
+    @metrics.timed("test.outside")
+    async def work():
+        return 42
+
+    assert await work() == 42
+    assert metrics.current_timings() is None
+    assert metrics.SPAN_SECONDS.count("test.outside") == 1
+
+
+def make_app(server_timing=True):
+    app = FastAPI()
+    app.add_middleware(InstrumentationMiddleware, server_timing=server_timing)
+
+    @metrics.timed("test.service")
+    async def service():
+        # Concurrent tasks see the same request
+        await asyncio.gather(*(asyncio.sleep(0) for _ in range(2)))
+        metrics.record_dynamodb_call("get_item", 0.004, {"CapacityUnits": 0.5})
+        metrics.record_dynamodb_call("query", 0.006, {"CapacityUnits": 1})
+
+    @app.get("/items/{item_id}")
+    async def get_test_item(item_id: str):
+        await service()
+        with metrics.span("serialize"):
+            return {"id": item_id}
+
+    return app
+
+
+def test_middleware_adds_server_timing():
+    response = TestClient(make_app()).get("/items/1")
+    assert response.status_code == 200
+    entries = [entry.split(";")[0] for entry in response.headers["server-timing"].split(", ")]
+    assert entries == ["total", "dynamodb", "test.service", "serialize"]
+    assert 'desc="2 calls / 1.5 CU"' in response.headers["server-timing"]
+
+
+def test_middleware_records_requests_by_endpoint():
+    before = metrics.REQUEST_SECONDS.count("GET", "get_test_item", "200")
+    client = TestClient(make_app(server_timing=False))
+    response = client.get("/items/1")
+    client.get("/items/2")
+    client.get("/missing")
+    assert "server-timing" not in response.headers
+    assert metrics.REQUEST_SECONDS.count("GET", "get_test_item", "200") == before + 2
+    assert metrics.REQUEST_SECONDS.count("GET", "unmatched", "404") >= 1
+    assert metrics.REQUEST_DYNAMODB_CALLS.count("get_test_item") >= 2
+    assert metrics.DYNAMODB_CONSUMED_CAPACITY.value("query") >= 2